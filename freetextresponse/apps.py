@@ -0,0 +1,22 @@
+"""
+Django application configuration of the freetextresponse XBlock
+"""
+from django.apps import AppConfig
+
+
+class FreeTextResponseConfig(AppConfig):
+    """
+    Configuration of the app holding the records of the staff tools
+    and duplicate detection
+    """
+
+    name = 'freetextresponse'
+    default_auto_field = 'django.db.models.BigAutoField'
+
+    def ready(self):
+        """
+        Registers the records, which the XBlock itself imports only
+        when the staff tools or duplicate detection are enabled
+        """
+        # pylint: disable=import-outside-toplevel,unused-import
+        from . import records  # noqa: F401
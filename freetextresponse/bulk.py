@@ -0,0 +1,221 @@
+"""
+Bulk operations run by staff on many learners' attempts
+
+A block instance can only change the state of its own learner, so an
+operation records its change for each target learner in a StaffChange
+row of their own, all created with the operation. The learner's state
+applies the processed changes the next time the learner loads the
+block, and keeps their ids until the following load marks them
+applied; a change is applied once, even when the request applying it
+fails to save the learner's state.
+
+Each request to the bulk_operation handler processes the next
+BULK_CHUNK_SIZE unprocessed changes of an operation, read by key: it
+updates the learners' records and marks the changes processed in one
+transaction, then publishes the learners' grades. Staff post the operation id
+again until the operation is done; an interrupted chunk is redone, and
+the learners whose grade was not published publish it themselves.
+"""
+import collections
+import itertools
+import uuid
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .caching import get_setting
+from .dashboard import FILTER_FIELDS
+from .dashboard import add_count_deltas
+from .dashboard import get_count_values
+from .dashboard import get_word_count_range
+from .dashboard import update_counts
+from .records import LearnerRecord
+from .records import StaffChange
+from .records import StaffOperation
+
+
+ACTIONS = ('reset', 'grant')
+FILTERS = ('max_attempts', 'zero_credit')
+BULK_CHUNK_SIZE = get_setting('BULK_CHUNK_SIZE', 100)
+
+
+def select_learners(usage_key, name, max_attempts):
+    """
+    Returns an iterator over the learners of the block's records
+    matching the named filter
+    """
+    records = LearnerRecord.objects.filter(usage_key=usage_key)
+    if name == 'max_attempts':
+        if not max_attempts:
+            return iter(())
+        records = records.filter(attempts__gte=max_attempts)
+    else:
+        records = records.filter(attempts__gt=0, score=0.0)
+    return records.order_by('student_id').values_list(
+        'student_id',
+        flat=True,
+    ).iterator(chunk_size=BULK_CHUNK_SIZE)
+
+
+@transaction.atomic
+def create_operation(usage_key, action, attempts, learners):
+    """
+    Creates and returns a new operation, with an unprocessed change for
+    each of the learners, inserted a chunk at a time
+    """
+    operation = StaffOperation.objects.create(
+        operation_id=uuid.uuid4().hex,
+        usage_key=usage_key,
+        action=action,
+        attempts=attempts,
+    )
+    learners = iter(learners)
+    while True:
+        chunk = list(itertools.islice(learners, BULK_CHUNK_SIZE))
+        if not chunk:
+            break
+        StaffChange.objects.bulk_create(
+            [
+                StaffChange(
+                    operation=operation,
+                    usage_key=usage_key,
+                    student_id=student_id,
+                )
+                for student_id in chunk
+            ],
+            ignore_conflicts=True,
+        )
+    operation.total = operation.changes.count()
+    operation.save(update_fields=['total'])
+    return operation
+
+
+def get_operation(usage_key, operation_id):
+    """
+    Returns the operation of the block with the given id, or None
+    """
+    return StaffOperation.objects.filter(
+        usage_key=usage_key,
+        operation_id=str(operation_id),
+    ).first()
+
+
+def describe_operation(operation):
+    """
+    Returns the progress of an operation
+    """
+    return {
+        'id': operation.operation_id,
+        'action': operation.action,
+        'attempts': operation.attempts,
+        'total': operation.total,
+        'processed': operation.processed,
+        'done': operation.processed >= operation.total,
+    }
+
+
+@transaction.atomic
+def process_next_changes(operation):
+    """
+    Updates the records of the learners of the operation's next chunk of
+    unprocessed changes, read by key, and marks the changes processed;
+    returns the user ids of the learners who have a record
+
+    The operation's row stays locked until the transaction ends, so
+    concurrent requests process distinct chunks.
+    """
+    locked = StaffOperation.objects.select_for_update().get(pk=operation.pk)
+    changes = dict(
+        StaffChange.objects.filter(
+            operation=operation,
+            processed=False,
+        ).order_by('pk').values_list('pk', 'student_id')[:BULK_CHUNK_SIZE]
+    )
+    if not changes:
+        operation.processed = locked.processed
+        return {}
+    StaffChange.objects.filter(pk__in=list(changes)).update(processed=True)
+    user_ids = update_records(operation, list(changes.values()))
+    operation.processed = locked.processed + len(changes)
+    operation.save(update_fields=['processed'])
+    return user_ids
+
+
+def mark_published(operation, student_ids):
+    """
+    Records that staff published the grades of the learners' changes
+    """
+    StaffChange.objects.filter(
+        operation=operation,
+        student_id__in=student_ids,
+    ).update(published=True)
+
+
+def update_records(operation, student_ids):
+    """
+    Updates the learners' records, and the block's counts, to match the
+    operation's change; returns the user ids of the learners who have
+    a record
+    """
+    records = LearnerRecord.objects.filter(
+        usage_key=operation.usage_key,
+        student_id__in=student_ids,
+    )
+    deltas = collections.Counter()
+    for score, attempts, word_range in records.values_list(
+            *FILTER_FIELDS.values()
+    ):
+        if operation.action == 'reset':
+            new = get_count_values(0.0, 0, get_word_count_range(0))
+        else:
+            new = get_count_values(
+                score,
+                max(attempts - operation.attempts, 0),
+                word_range,
+            )
+        add_count_deltas(
+            deltas,
+            get_count_values(score, attempts, word_range),
+            new,
+        )
+    if operation.action == 'reset':
+        records.update(
+            attempts=0,
+            score=0.0,
+            words=0,
+            word_range=get_word_count_range(0),
+            snippet='',
+            modified=timezone.now(),
+        )
+    else:
+        records.update(
+            attempts=Greatest(F('attempts') - operation.attempts, 0),
+            modified=timezone.now(),
+        )
+    update_counts(operation.usage_key, deltas)
+    return dict(records.values_list('student_id', 'user_id'))
+
+
+def get_pending_changes(usage_key, student_id):
+    """
+    Returns the processed changes of the learner not marked applied,
+    oldest first
+    """
+    return list(
+        StaffChange.objects.filter(
+            usage_key=usage_key,
+            student_id=student_id,
+            processed=True,
+            applied=False,
+        ).select_related('operation').order_by('operation_id')
+    )
+
+
+def mark_applied(change_ids):
+    """
+    Marks the changes applied, once the learner's state saved them
+    """
+    if change_ids:
+        StaffChange.objects.filter(pk__in=change_ids).update(applied=True)
@@ -0,0 +1,108 @@
+"""
+Process-wide caches shared by all XBlock instances
+"""
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+
+
+def get_setting(name, default):
+    """
+    Returns the FREETEXTRESPONSE_<name> Django setting, or the default
+    when it is not set or Django settings are not configured
+    """
+    # pylint: disable=import-outside-toplevel
+    from django.conf import settings
+    from django.core.exceptions import ImproperlyConfigured
+    try:
+        return getattr(settings, 'FREETEXTRESPONSE_' + name, default)
+    except ImproperlyConfigured:
+        return default
+
+
+def content_hash(*values):
+    """
+    Returns a stable hash of the given JSON-serializable values
+    """
+    payload = json.dumps(values, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class LRUCache(object):
+    """
+    A thread-safe least-recently-used cache with hit/miss/eviction counters
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key, factory):
+        """
+        Returns the cached value for key, building it with factory()
+        on a miss
+        """
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return value
+        # Build outside the lock; concurrent misses may build twice,
+        # but only one value is kept
+        value = factory()
+        with self._lock:
+            value = self._data.setdefault(key, value)
+            self._data.move_to_end(key)
+            self._evict()
+        return value
+
+    def resize(self, maxsize):
+        """
+        Changes the maximum size, evicting entries as needed
+        """
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def clear(self):
+        """
+        Removes every entry and resets the counters
+        """
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def info(self):
+        """
+        Returns the cache counters, for monitoring
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'currsize': len(self._data),
+                'maxsize': self.maxsize,
+            }
+
+    def _evict(self):
+        """
+        Drops the least recently used entries beyond maxsize
+        """
+        while len(self._data) > max(self.maxsize, 0):
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,214 @@
+"""
+Learner records, for the staff dashboard
+
+Each learner who submitted an answer has a LearnerRecord row of their
+latest submission, written on its own as they submit. The number of
+learners of each credit, attempt count and word count range is kept in
+LearnerCount rows, incremented and decremented as the records change,
+so the dashboard reads the counts of a block without counting its
+records. Pages of records are read newest first from a keyset cursor,
+the modification time and primary key of the last record of the
+previous page, so a page does not skip over the records before it.
+"""
+import collections
+import datetime
+
+from django.db import IntegrityError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .records import LearnerCount
+from .records import LearnerRecord
+
+
+DASHBOARD_PAGE_SIZE = 50
+MAX_DASHBOARD_PAGE_SIZE = 200
+# Lower bounds of the word count ranges
+WORD_COUNT_BUCKETS = (0, 1, 10, 25, 50, 100, 250, 500, 1000)
+FILTERS = ('credit', 'attempts', 'words')
+# Record field of each filter and count
+FILTER_FIELDS = {
+    'credit': 'score',
+    'attempts': 'attempts',
+    'words': 'word_range',
+}
+
+
+def get_word_count_range(words):
+    """
+    Returns the label of the word count range of the given count
+    """
+    label = ''
+    for index, lower in enumerate(WORD_COUNT_BUCKETS):
+        if words < lower:
+            break
+        if index + 1 < len(WORD_COUNT_BUCKETS):
+            upper = WORD_COUNT_BUCKETS[index + 1] - 1
+            label = str(lower) if upper == lower else f'{lower}-{upper}'
+        else:
+            label = f'{lower}+'
+    return label
+
+
+def get_count_values(score, attempts, word_range):
+    """
+    Returns the value of each count of a record's fields, given in the
+    order of FILTER_FIELDS
+    """
+    return {
+        'credit': str(float(score)),
+        'attempts': str(attempts),
+        'words': word_range,
+    }
+
+
+def add_count_deltas(deltas, old, new):
+    """
+    Adds to the deltas, a Counter by count name and value, the change
+    of a record's count values from the old ones, or None for a new
+    record, to the new ones
+    """
+    if old is None:
+        deltas['learners', ''] += 1
+    for name, value in new.items():
+        if old is not None and old[name] == value:
+            continue
+        if old is not None:
+            deltas[name, old[name]] -= 1
+        deltas[name, value] += 1
+
+
+def update_counts(usage_key, deltas):
+    """
+    Adds the deltas, a Counter by count name and value, to the block's
+    counts in the database
+    """
+    keys = sorted(key for key, delta in deltas.items() if delta)
+    LearnerCount.objects.bulk_create(
+        [
+            LearnerCount(usage_key=usage_key, name=name, value=value)
+            for name, value in keys
+            if deltas[name, value] > 0
+        ],
+        ignore_conflicts=True,
+    )
+    for name, value in keys:
+        LearnerCount.objects.filter(
+            usage_key=usage_key,
+            name=name,
+            value=value,
+        ).update(count=F('count') + deltas[name, value])
+
+
+@transaction.atomic
+def record_learner(usage_key, student_id, **values):
+    """
+    Creates or replaces the record of the learner's latest submission,
+    and updates the block's counts
+    """
+    values['word_range'] = get_word_count_range(values.get('words', 0))
+    values['modified'] = timezone.now()
+    records = LearnerRecord.objects.select_for_update().filter(
+        usage_key=usage_key,
+        student_id=student_id,
+    )
+    fields = FILTER_FIELDS.values()
+    row = records.values_list(*fields).first()
+    if row is None:
+        try:
+            with transaction.atomic():
+                LearnerRecord.objects.create(
+                    usage_key=usage_key,
+                    student_id=student_id,
+                    **values,
+                )
+        except IntegrityError:
+            # Another request created the record first
+            row = records.values_list(*fields).get()
+    old = None
+    if row is not None:
+        old = get_count_values(*row)
+        records.update(**values)
+    deltas = collections.Counter()
+    add_count_deltas(deltas, old, get_count_values(
+        values.get('score', 0.0),
+        values.get('attempts', 0),
+        values['word_range'],
+    ))
+    update_counts(usage_key, deltas)
+
+
+def get_filter(name, value):
+    """
+    Returns the record lookup of a dashboard filter
+    """
+    if name == 'credit':
+        value = float(value)
+    elif name == 'attempts':
+        value = int(value)
+    else:
+        value = str(value)
+    return {FILTER_FIELDS[name]: value}
+
+
+def get_total(counts, name, lookup):
+    """
+    Returns the number of learners matching the lookup of the named
+    filter, or all of them without a filter, from the block's counts
+    """
+    if name is None:
+        return counts['learners']
+    return counts[name].get(str(lookup[FILTER_FIELDS[name]]), 0)
+
+
+def parse_cursor(cursor):
+    """
+    Returns the modification time and primary key of a page cursor, or
+    None for the first page; raises ValueError when it is malformed
+    """
+    if not cursor:
+        return None
+    modified, pk = str(cursor).split(',')
+    return datetime.datetime.fromisoformat(modified), int(pk)
+
+
+def get_page(usage_key, lookup, cursor, limit):
+    """
+    Returns the records of a page of the block's learners matching the
+    lookup, newest first, from a parsed cursor, and the cursor of the
+    next page or None
+    """
+    records = LearnerRecord.objects.filter(usage_key=usage_key, **lookup)
+    if cursor is not None:
+        modified, pk = cursor
+        # A range on the indexed time, rather than a disjunction, so the
+        # page is read from the index
+        records = records.filter(modified__lte=modified).exclude(
+            modified=modified,
+            pk__gte=pk,
+        )
+    rows = list(records.order_by('-modified', '-pk')[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = f'{rows[-1].modified.isoformat()},{rows[-1].pk}'
+    return rows, next_cursor
+
+
+def get_counts(usage_key):
+    """
+    Returns the number of learners of each credit, attempt count and
+    word count range
+    """
+    counts = {'learners': 0}
+    counts.update({name: {} for name in FILTERS})
+    for name, value, count in LearnerCount.objects.filter(
+            usage_key=usage_key,
+            count__gt=0,
+    ).values_list('name', 'value', 'count'):
+        if name == 'learners':
+            counts['learners'] = count
+        else:
+            counts[name][value] = count
+    return counts
@@ -0,0 +1,147 @@
+"""
+Detect near-duplicate answers with MinHash signatures and LSH buckets
+
+An answer is reduced to the set of its word shingles (runs of
+SHINGLE_SIZE words) and summarized by a MinHash signature: for each of
+NUM_HASHES hash functions, the smallest hash of any shingle. Two
+signatures agree in about the same fraction of positions as the
+Jaccard similarity of the shingle sets.
+
+Signatures are split into BANDS bands; answers sharing any band land
+in the same bucket, so near duplicates are found by looking only at the
+bucket members instead of comparing every pair of answers. A bucket
+keeps at most MAX_BUCKET_SIZE members, so a common answer such as
+"I don't know" cannot make one bucket quadratic to compare; answers
+landing in a full bucket are still found similar to its members. The
+signatures and bucket members are stored by the signatures module.
+"""
+import base64
+import random
+import struct
+import zlib
+
+from .rules import tokenize
+
+
+NUM_HASHES = 32
+BANDS = 8
+SHINGLE_SIZE = 3
+DUPLICATE_THRESHOLD = 0.8
+MAX_BUCKET_SIZE = 100
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_SIGNATURE_FORMAT = f'<{NUM_HASHES}I'
+_random = random.Random(20240601)
+_PERMUTATIONS = tuple(
+    (_random.randrange(1, _PRIME), _random.randrange(0, _PRIME))
+    for _ in range(NUM_HASHES)
+)
+
+
+def shingles(answer):
+    """
+    Returns the set of word shingles of an answer
+    """
+    words = tokenize(answer)
+    if len(words) <= SHINGLE_SIZE:
+        return {' '.join(words)} if words else set()
+    return {
+        ' '.join(words[index:index + SHINGLE_SIZE])
+        for index in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def minhash_signature(answer):
+    """
+    Returns the MinHash signature of an answer as a tuple of integers,
+    or None when the answer has no words
+    """
+    hashes = [
+        zlib.crc32(shingle.encode('utf-8'))
+        for shingle in shingles(answer)
+    ]
+    if not hashes:
+        return None
+    return tuple(
+        min((multiplier * value + offset) % _PRIME for value in hashes)
+        & _MAX_HASH
+        for multiplier, offset in _PERMUTATIONS
+    )
+
+
+def encode_signature(signature):
+    """
+    Packs a signature into a compact string for storage
+    """
+    return base64.b64encode(
+        struct.pack(_SIGNATURE_FORMAT, *signature)
+    ).decode('ascii')
+
+
+def decode_signature(encoded):
+    """
+    Unpacks a signature stored by encode_signature
+    """
+    return struct.unpack(_SIGNATURE_FORMAT, base64.b64decode(encoded))
+
+
+def bucket_keys(signature):
+    """
+    Returns the LSH bucket of each band of the signature, by band
+    """
+    rows = NUM_HASHES // BANDS
+    keys = []
+    for band in range(BANDS):
+        digest = zlib.crc32(struct.pack(
+            f'<{rows}I',
+            *signature[band * rows:(band + 1) * rows],
+        ))
+        keys.append(f'{digest:08x}')
+    return keys
+
+
+def estimate_similarity(signature, other):
+    """
+    Returns the estimated Jaccard similarity of two signatures
+    """
+    return sum(
+        value == other_value
+        for value, other_value in zip(signature, other)
+    ) / NUM_HASHES
+
+
+def find_clusters(buckets, signatures, threshold=DUPLICATE_THRESHOLD):
+    """
+    Returns groups of students with near-identical answers, largest
+    first, from the members of the buckets and the students' signatures
+    """
+    parents = {}
+
+    def find(student_id):
+        """
+        Returns the representative of the student's group
+        """
+        parents.setdefault(student_id, student_id)
+        while parents[student_id] != student_id:
+            parents[student_id] = parents[parents[student_id]]
+            student_id = parents[student_id]
+        return student_id
+
+    for members in buckets:
+        for index, student_id in enumerate(members):
+            for other_id in members[index + 1:]:
+                if find(student_id) == find(other_id):
+                    continue
+                similarity = estimate_similarity(
+                    signatures[student_id],
+                    signatures[other_id],
+                )
+                if similarity >= threshold:
+                    parents[find(other_id)] = find(student_id)
+    groups = {}
+    for student_id in parents:
+        groups.setdefault(find(student_id), []).append(student_id)
+    return sorted(
+        (sorted(group) for group in groups.values() if len(group) > 1),
+        key=lambda group: (-len(group), group),
+    )
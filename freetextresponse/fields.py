@@ -0,0 +1,48 @@
+"""
+XBlock field types used by the FreeTextResponse XBlock
+"""
+import base64
+import zlib
+
+from xblock.fields import String
+
+from .caching import get_setting
+
+
+COMPRESSION_THRESHOLD = get_setting('COMPRESSION_THRESHOLD', 2048)
+
+
+class CompressedString(String):
+    """
+    A String stored zlib-compressed once it reaches `threshold` bytes
+
+    Long values are stored as {'zlib': <base64>}; shorter values and
+    values stored before compression are plain strings. Stored values
+    are only decompressed when the field is first read.
+    """
+
+    def __init__(self, *args, threshold=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if threshold is None:
+            threshold = COMPRESSION_THRESHOLD
+        self.threshold = threshold
+
+    def from_json(self, value):
+        if isinstance(value, dict) and 'zlib' in value:
+            value = zlib.decompress(
+                base64.b64decode(value['zlib'])
+            ).decode('utf-8')
+        return super().from_json(value)
+
+    def to_json(self, value):
+        value = super().to_json(value)
+        if isinstance(value, str):
+            encoded = value.encode('utf-8')
+            if len(encoded) >= self.threshold:
+                compressed = zlib.compress(encoded)
+                # Incompressible text stays plain
+                if len(compressed) * 4 // 3 < len(encoded):
+                    return {
+                        'zlib': base64.b64encode(compressed).decode('ascii'),
+                    }
+        return value
@@ -0,0 +1,122 @@
+"""
+Keep a compact, bounded history of a learner's attempts
+
+Each entry records when the attempt was made, its word count, credit
+and a hash of the answer. Only the current answer is stored in full:
+each entry's 'delta' turns the next newer text (the next entry's, or
+the current answer for the newest entry) back into the entry's own
+text. Entries whose 'delta' was dropped to save space keep their
+metadata, but their text, and that of older entries, is lost.
+"""
+from difflib import SequenceMatcher
+import hashlib
+import json
+import re
+
+
+MAX_ATTEMPT_HISTORY = 20
+MAX_ATTEMPT_HISTORY_BYTES = 8192
+# Words with their trailing whitespace, so that the tokens join back
+# into the exact text
+_TOKEN_RE = re.compile(r'\S+\s*|\s+')
+
+
+def answer_hash(answer):
+    """
+    Returns a short hash identifying the text of an answer
+    """
+    return hashlib.sha1(answer.encode('utf-8')).hexdigest()[:16]
+
+
+def make_delta(source, target):
+    """
+    Returns the edits turning source into target, as a list of
+    [start, end, replacement] over the word tokens of source
+    """
+    source_tokens = _TOKEN_RE.findall(source)
+    target_tokens = _TOKEN_RE.findall(target)
+    # Most edits touch one part of the answer; diffing only what lies
+    # between the common prefix and suffix keeps the matcher fast
+    prefix = 0
+    limit = min(len(source_tokens), len(target_tokens))
+    while prefix < limit and source_tokens[prefix] == target_tokens[prefix]:
+        prefix += 1
+    suffix = 0
+    while (
+            suffix < limit - prefix and
+            source_tokens[-1 - suffix] == target_tokens[-1 - suffix]
+    ):
+        suffix += 1
+    source_middle = source_tokens[prefix:len(source_tokens) - suffix]
+    target_middle = target_tokens[prefix:len(target_tokens) - suffix]
+    matcher = SequenceMatcher(None, source_middle, target_middle)
+    return [
+        [
+            prefix + start,
+            prefix + end,
+            ''.join(target_middle[target_start:target_end]),
+        ]
+        for tag, start, end, target_start, target_end
+        in matcher.get_opcodes()
+        if tag != 'equal'
+    ]
+
+
+def apply_delta(source, delta):
+    """
+    Applies the edits of make_delta to source
+    """
+    tokens = _TOKEN_RE.findall(source)
+    for start, end, replacement in reversed(delta):
+        tokens[start:end] = [replacement]
+    return ''.join(tokens)
+
+
+def get_entry_texts(history, current_answer):
+    """
+    Returns the text of each entry, oldest first, or None for entries
+    that can no longer be reconstructed
+    """
+    texts = []
+    text = current_answer
+    for entry in reversed(history):
+        if text is not None and 'delta' in entry:
+            text = apply_delta(text, entry['delta'])
+        else:
+            text = None
+        texts.append(text)
+    return texts[::-1]
+
+
+def trim_history(history):
+    """
+    Caps the history at MAX_ATTEMPT_HISTORY entries and, by dropping the
+    oldest deltas and then the oldest entries, at about
+    MAX_ATTEMPT_HISTORY_BYTES of JSON
+    """
+    history = history[-MAX_ATTEMPT_HISTORY:]
+    sizes = [_entry_size(entry) for entry in history]
+    total = sum(sizes)
+    for index, entry in enumerate(history):
+        if total <= MAX_ATTEMPT_HISTORY_BYTES:
+            break
+        if 'delta' in entry and index < len(history) - 1:
+            history[index] = {
+                key: value
+                for key, value in entry.items()
+                if key != 'delta'
+            }
+            size = _entry_size(history[index])
+            total -= sizes[index] - size
+            sizes[index] = size
+    while total > MAX_ATTEMPT_HISTORY_BYTES and len(history) > 1:
+        total -= sizes.pop(0)
+        history.pop(0)
+    return history
+
+
+def _entry_size(entry):
+    """
+    Returns the size of an entry as JSON
+    """
+    return len(json.dumps(entry, separators=(',', ':')))
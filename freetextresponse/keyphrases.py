@@ -0,0 +1,518 @@
+"""
+Compile instructor keyphrases into matcher artifacts
+"""
+import re
+from collections import deque
+
+from django.utils.translation import gettext_noop
+
+from .caching import LRUCache
+from .caching import content_hash
+from .caching import get_setting
+from .models import Credit
+from .stemming import stem_words
+
+
+ARTIFACT_VERSION = 2
+# Above this many phrases in all, Studio shows a warning
+KEYPHRASE_WARNING_THRESHOLD = 500
+# Above this many phrases per list, saving is refused
+MAX_KEYPHRASES = 10000
+
+
+def clean_keyphrases(phrases):
+    """
+    Strip whitespace and drop empty and exactly-duplicated phrases,
+    preserving the instructor's ordering and capitalization
+    """
+    cleaned = []
+    seen = set()
+    for phrase in phrases or []:
+        phrase = str(phrase).strip()
+        if phrase and phrase not in seen:
+            seen.add(phrase)
+            cleaned.append(phrase)
+    return cleaned
+
+
+def normalize_keyphrases(phrases):
+    """
+    Lowercase and strip the phrases, then drop empty
+    and duplicated ones
+    """
+    return clean_keyphrases(
+        str(phrase).lower()
+        for phrase in phrases or []
+    )
+
+
+def stem_keyphrases(phrases):
+    """
+    Reduce the phrases to the stems of their words, dropping the
+    duplicates
+
+    Stemmed phrases and answers are padded with spaces, so that
+    matching by substring matches whole words.
+    """
+    stemmed = {}
+    for phrase in phrases:
+        phrase = stem_phrase(phrase)
+        if phrase:
+            stemmed[phrase] = True
+    return list(stemmed)
+
+
+def stem_phrase(phrase):
+    """
+    Returns the stems of the words of the phrase, leaving out stop
+    words unless the phrase is made only of them
+    """
+    words = stem_words(phrase) or stem_words(phrase, keep_stop_words=True)
+    return _pad_words(words) if words else ''
+
+
+def stem_text(text):
+    """
+    Returns the stems of the words of the text, as matched against
+    stemmed phrases
+
+    The stems without the stop words are followed by all the stems,
+    so that phrases made only of stop words are matched too.
+    """
+    return (
+        _pad_words(stem_words(text)) +
+        _pad_words(stem_words(text, keep_stop_words=True))
+    )
+
+
+def _pad_words(words):
+    """
+    Joins the words with single spaces, with a space on each end
+    """
+    return ' ' + ' '.join(words) + ' '
+
+
+def prune_covered_keyphrases(phrases):
+    """
+    Drop every phrase that contains another phrase of the same list
+
+    Matching is by substring, so whenever the longer phrase is present
+    the shorter one is too; the longer one can never change the outcome.
+    """
+    automaton = _PhraseAutomaton(phrases)
+    return [
+        phrase
+        for phrase in phrases
+        if not automaton.contains_other(phrase)
+    ]
+
+
+class _PhraseAutomaton(object):
+    """
+    An Aho-Corasick automaton over a list of phrases, finding in a
+    single pass over a text whether it contains any of them
+    """
+
+    def __init__(self, phrases):
+        self.goto = [{}]
+        self.depth = [0]
+        self.terminal = [False]
+        for phrase in phrases:
+            node = 0
+            for char in phrase:
+                if char not in self.goto[node]:
+                    self.goto[node][char] = len(self.goto)
+                    self.goto.append({})
+                    self.depth.append(self.depth[node] + 1)
+                    self.terminal.append(False)
+                node = self.goto[node][char]
+            self.terminal[node] = bool(phrase)
+        self.fail = [0] * len(self.goto)
+        # Whether a phrase is a proper suffix of the node's text
+        self.has_suffix = [False] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                fail = self.fail[node]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                fail = self.goto[fail].get(char, 0)
+                self.fail[child] = fail
+                self.has_suffix[child] = (
+                    self.terminal[fail] or self.has_suffix[fail]
+                )
+                queue.append(child)
+
+    def contains_other(self, phrase):
+        """
+        Determines if a phrase other than the given one is a substring
+        of it, in time linear in its length
+        """
+        node = 0
+        for char in phrase:
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            if self.has_suffix[node]:
+                return True
+            if self.terminal[node] and self.depth[node] < len(phrase):
+                return True
+        return False
+
+
+def build_pattern(phrases):
+    """
+    Returns the source of a single regular expression that finds, at
+    every position of the answer, the longest phrase starting there
+
+    The phrases are laid out as a trie, so each position costs one walk
+    down the trie whatever the number of phrases.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    body = _trie_pattern(trie)
+    if not body:
+        return ''
+    # A lookahead, so that matches starting inside another one are found
+    return f'(?=({body}))'
+
+
+def _trie_pattern(node):
+    """
+    Returns the pattern matching the branches below a trie node,
+    preferring the longest one
+    """
+    branches = []
+    for char, child in sorted(node.items()):
+        if not char:
+            continue
+        chain = re.escape(char)
+        # Fold runs of single-child nodes into one literal
+        while len(child) == 1 and '' not in child:
+            char, child = next(iter(child.items()))
+            chain += re.escape(char)
+        branches.append(chain + _trie_pattern(child))
+    if not branches:
+        return ''
+    if len(branches) == 1:
+        body = branches[0]
+    else:
+        body = '(?:' + '|'.join(branches) + ')'
+    if '' in node:
+        # The phrase may end here; greedily try the longer ones first
+        body = f'(?:{body})?'
+    return body
+
+
+def _build_artifact(source, entries, **extra):
+    """
+    Build a matcher artifact from (phrase, value) entries
+    """
+    values = {}
+    for phrase, value in entries:
+        values[phrase] = max(value, values.get(phrase, value))
+    entries = sorted(values.items())
+    artifact = {
+        'version': ARTIFACT_VERSION,
+        'source': content_hash(source),
+        'key': content_hash(entries),
+        'entries': entries,
+        'pattern': build_pattern(values),
+    }
+    artifact.update(extra)
+    return artifact
+
+
+def compile_keyphrases(fullcredit_keyphrases, halfcredit_keyphrases,
+                       stemmed=False):
+    """
+    Build the precompiled matcher artifact for full and half credit
+    keyphrases
+    """
+    full = prune_covered_keyphrases(
+        _prepare_keyphrases(fullcredit_keyphrases, stemmed)
+    )
+    half = prune_covered_keyphrases(
+        _prepare_keyphrases(halfcredit_keyphrases, stemmed)
+    )
+    entries = [(phrase, Credit.full.value) for phrase in full]
+    entries += [(phrase, Credit.half.value) for phrase in half]
+    return _build_artifact(
+        keyphrases_source(
+            fullcredit_keyphrases,
+            halfcredit_keyphrases,
+            stemmed,
+        ),
+        entries,
+        full=full,
+        half=half,
+        stemmed=stemmed,
+    )
+
+
+def compile_credit_tiers(credit_tiers, stemmed=False):
+    """
+    Build the precompiled matcher artifact for credit tiers;
+    malformed tiers are skipped
+    """
+    entries = []
+    for credit, phrases in _iter_credit_tiers(credit_tiers):
+        phrases = prune_covered_keyphrases(
+            _prepare_keyphrases(phrases, stemmed)
+        )
+        entries += [(phrase, credit) for phrase in phrases]
+    return _build_artifact(
+        credit_tiers_source(credit_tiers, stemmed),
+        entries,
+        stemmed=stemmed,
+    )
+
+
+def compile_phrase_weights(phrase_weights, stemmed=False):
+    """
+    Build the precompiled matcher artifact for weighted phrases;
+    malformed weights are skipped
+    """
+    entries = []
+    if not isinstance(phrase_weights, dict):
+        phrase_weights = {}
+    for phrase, weight in phrase_weights.items():
+        phrase = str(phrase).strip().lower()
+        if stemmed:
+            phrase = stem_phrase(phrase)
+        if phrase and _is_number(weight):
+            entries.append((phrase, float(weight)))
+    return _build_artifact(
+        phrase_weights_source(phrase_weights, stemmed),
+        entries,
+        stemmed=stemmed,
+    )
+
+
+def compile_phrase_source(source):
+    """
+    Build the precompiled matcher artifact for any phrase source
+    """
+    kind = source[0]
+    stemmed = False
+    if kind == 'stemmed':
+        stemmed = True
+        source = source[1]
+        kind = source[0]
+    if kind == 'tiers':
+        return compile_credit_tiers(source[1], stemmed)
+    if kind == 'weighted':
+        return compile_phrase_weights(source[1], stemmed)
+    return compile_keyphrases(source[1], source[2], stemmed)
+
+
+def count_source_phrases(source):
+    """
+    Returns the number of phrases in the largest list of the source
+    """
+    kind = source[0]
+    if kind == 'stemmed':
+        return count_source_phrases(source[1])
+    if kind == 'tiers':
+        return sum(
+            len(phrases)
+            for _, phrases in _iter_credit_tiers(source[1])
+        )
+    if kind == 'weighted':
+        return len(source[1])
+    return max(len(source[1]), len(source[2]))
+
+
+def keyphrases_source(fullcredit_keyphrases, halfcredit_keyphrases,
+                      stemmed=False):
+    """
+    Returns the settings a keyphrase artifact is compiled from
+    """
+    return stemmed_source([
+        'keyphrases',
+        list(fullcredit_keyphrases or []),
+        list(halfcredit_keyphrases or []),
+    ], stemmed)
+
+
+def credit_tiers_source(credit_tiers, stemmed=False):
+    """
+    Returns the settings a credit tier artifact is compiled from
+    """
+    return stemmed_source(['tiers', credit_tiers or []], stemmed)
+
+
+def phrase_weights_source(phrase_weights, stemmed=False):
+    """
+    Returns the settings a weighted phrase artifact is compiled from
+    """
+    return stemmed_source(['weighted', phrase_weights or {}], stemmed)
+
+
+def stemmed_source(source, stemmed):
+    """
+    Marks the source as matched by word stems, if stemmed
+    """
+    if stemmed:
+        return ['stemmed', source]
+    return source
+
+
+def is_artifact_current(artifact, source):
+    """
+    Determines if the artifact was compiled from the given source
+    """
+    if not artifact or artifact.get('version') != ARTIFACT_VERSION:
+        return False
+    return artifact.get('source') == content_hash(source)
+
+
+def get_credit_tiers_error(credit_tiers):
+    """
+    Returns a message describing what is wrong with the credit tiers,
+    or an empty string; the message is translated by the caller
+    """
+    if not isinstance(credit_tiers, list):
+        return gettext_noop('Credit Tiers must be a list of tiers')
+    for tier in credit_tiers:
+        if not isinstance(tier, dict) \
+                or not _is_number(tier.get('credit')) \
+                or not isinstance(tier.get('phrases'), list):
+            return gettext_noop(
+                'Each Credit Tier must have a numeric "credit" '
+                'and a list of "phrases"'
+            )
+        if not 0 < tier['credit'] <= Credit.full.value:
+            return gettext_noop(
+                'Credit Tier credit must be greater than 0 and at most 1'
+            )
+    return ''
+
+
+def get_phrase_weights_error(phrase_weights):
+    """
+    Returns a message describing what is wrong with the phrase weights,
+    or an empty string; the message is translated by the caller
+    """
+    if not isinstance(phrase_weights, dict):
+        return gettext_noop('Phrase Weights must map phrases to weights')
+    for weight in phrase_weights.values():
+        if not _is_number(weight):
+            return gettext_noop('Phrase Weights must be numbers')
+        if not -Credit.full.value <= weight <= Credit.full.value:
+            return gettext_noop('Phrase Weights must be between -1 and 1')
+    return ''
+
+
+def _prepare_keyphrases(phrases, stemmed):
+    """
+    Normalize the phrases, and reduce them to stems if stemmed
+    """
+    phrases = normalize_keyphrases(phrases)
+    if stemmed:
+        phrases = stem_keyphrases(phrases)
+    return phrases
+
+
+def _iter_credit_tiers(credit_tiers):
+    """
+    Yields the (credit, phrases) of the well-formed credit tiers
+    """
+    if not isinstance(credit_tiers, list):
+        return
+    for tier in credit_tiers:
+        if isinstance(tier, dict) and _is_number(tier.get('credit')) \
+                and isinstance(tier.get('phrases'), list):
+            yield float(tier['credit']), tier['phrases']
+
+
+def _is_number(value):
+    """
+    Determines if the value is an int or a float, but not a bool
+    """
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def get_matcher(artifact):
+    """
+    Returns the shared matcher for the artifact
+
+    Blocks with identical normalized keyphrases, such as course reruns,
+    share a single matcher through a process-wide LRU cache.
+    """
+    return _matcher_cache.get_or_create(
+        artifact['key'],
+        lambda: KeyphraseMatcher(artifact),
+    )
+
+
+def matcher_cache_info():
+    """
+    Returns the hit/miss/eviction counters of the matcher cache
+    """
+    return _matcher_cache.info()
+
+
+class KeyphraseMatcher(object):
+    """
+    Find every phrase of the artifact in one pass over an answer
+    """
+
+    def __init__(self, artifact):
+        self.pattern = None
+        if artifact['pattern']:
+            self.pattern = re.compile(artifact['pattern'])
+        self.values = dict(artifact['entries'])
+        self.stemmed = artifact.get('stemmed', False)
+        self.max_value = max(self.values.values(), default=0.0)
+        # The scan only reports the longest phrase starting at each
+        # position; the shorter phrases starting there are its prefixes.
+        self.implied = {}
+        for phrase in self.values:
+            prefixes = frozenset(
+                phrase[:end]
+                for end in range(1, len(phrase) + 1)
+                if phrase[:end] in self.values
+            )
+            best = max(self.values[prefix] for prefix in prefixes)
+            self.implied[phrase] = (best, prefixes)
+
+    def best_value(self, answer):
+        """
+        Returns the highest value of the phrases present in the answer
+        """
+        best = 0.0
+        for phrase in self._scan(answer):
+            best = max(best, self.implied[phrase][0])
+            if best >= self.max_value:
+                break
+        return best
+
+    def total_value(self, answer):
+        """
+        Returns the sum of the values of the distinct phrases
+        present in the answer
+        """
+        found = set()
+        for phrase in self._scan(answer):
+            found |= self.implied[phrase][1]
+        return sum(self.values[phrase] for phrase in found)
+
+    def _scan(self, answer):
+        """
+        Yields the longest phrase starting at each matching position
+        """
+        if self.pattern is None:
+            return
+        if self.stemmed:
+            answer = stem_text(answer)
+        for match in self.pattern.finditer(answer.lower()):
+            yield match.group(1)
+
+
+_matcher_cache = LRUCache(get_setting('MATCHER_CACHE_SIZE', 1024))
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.19 on 2026-10-19 13:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaffOperation',
+            fields=[
+                ('id', models.BigAutoField(
+                    auto_created=True,
+                    primary_key=True,
+                    serialize=False,
+                    verbose_name='ID',
+                )),
+                ('operation_id', models.CharField(
+                    max_length=32,
+                    unique=True,
+                )),
+                ('usage_key', models.CharField(
+                    db_index=True,
+                    max_length=255,
+                )),
+                ('action', models.CharField(max_length=16)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('learners', models.JSONField(default=list)),
+                ('cursor', models.PositiveIntegerField(default=0)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StaffChange',
+            fields=[
+                ('id', models.BigAutoField(
+                    auto_created=True,
+                    primary_key=True,
+                    serialize=False,
+                    verbose_name='ID',
+                )),
+                ('usage_key', models.CharField(max_length=255)),
+                ('student_id', models.CharField(max_length=255)),
+                ('published', models.BooleanField(default=False)),
+                ('applied', models.BooleanField(default=False)),
+                ('operation', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='changes',
+                    to='freetextresponse.staffoperation',
+                )),
+            ],
+            options={
+                'indexes': [models.Index(
+                    fields=['usage_key', 'student_id', 'applied'],
+                    name='freetextres_usage_k_8229d4_idx',
+                )],
+                'unique_together': {('operation', 'student_id')},
+            },
+        ),
+    ]
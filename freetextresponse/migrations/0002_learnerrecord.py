@@ -0,0 +1,54 @@
+# Generated by Django 4.2.19 on 2026-10-19 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('freetextresponse', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LearnerRecord',
+            fields=[
+                ('id', models.BigAutoField(
+                    auto_created=True,
+                    primary_key=True,
+                    serialize=False,
+                    verbose_name='ID',
+                )),
+                ('usage_key', models.CharField(max_length=255)),
+                ('student_id', models.CharField(max_length=255)),
+                ('user_id', models.IntegerField(null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('score', models.FloatField(default=0.0)),
+                ('words', models.PositiveIntegerField(default=0)),
+                ('word_range', models.CharField(max_length=16)),
+                ('snippet', models.TextField(blank=True, default='')),
+                ('modified', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [
+                    models.Index(
+                        fields=['usage_key', 'modified'],
+                        name='freetextres_usage_k_279aa1_idx',
+                    ),
+                    models.Index(
+                        fields=['usage_key', 'score', 'modified'],
+                        name='freetextres_usage_k_ba96fc_idx',
+                    ),
+                    models.Index(
+                        fields=['usage_key', 'attempts', 'modified'],
+                        name='freetextres_usage_k_d78b99_idx',
+                    ),
+                    models.Index(
+                        fields=['usage_key', 'word_range', 'modified'],
+                        name='freetextres_usage_k_8203b4_idx',
+                    ),
+                ],
+                'unique_together': {('usage_key', 'student_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.19 on 2026-10-19 14:23
+
+from django.db import migrations, models
+
+
+def create_change_rows(apps, schema_editor):
+    """
+    Marks the recorded changes processed, and records the learners
+    the operations have not reached yet as unprocessed changes
+    """
+    StaffOperation = apps.get_model('freetextresponse', 'StaffOperation')
+    StaffChange = apps.get_model('freetextresponse', 'StaffChange')
+    StaffChange.objects.update(processed=True)
+    for operation in StaffOperation.objects.iterator():
+        StaffChange.objects.bulk_create(
+            [
+                StaffChange(
+                    operation=operation,
+                    usage_key=operation.usage_key,
+                    student_id=student_id,
+                )
+                for student_id in operation.learners[operation.cursor:]
+            ],
+            ignore_conflicts=True,
+        )
+        operation.total = len(set(operation.learners))
+        operation.cursor = StaffChange.objects.filter(
+            operation=operation,
+            processed=True,
+        ).count()
+        operation.save(update_fields=['total', 'cursor'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('freetextresponse', '0002_learnerrecord'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='staffchange',
+            name='processed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='staffoperation',
+            name='total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(create_change_rows, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='staffoperation',
+            name='learners',
+        ),
+        migrations.RenameField(
+            model_name='staffoperation',
+            old_name='cursor',
+            new_name='processed',
+        ),
+        migrations.AddIndex(
+            model_name='staffchange',
+            index=models.Index(
+                fields=['operation', 'processed'],
+                name='freetextres_operati_cac873_idx',
+            ),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.19 on 2026-10-19 14:25
+
+from django.db import migrations, models
+
+
+# Record field of each count
+COUNT_FIELDS = {
+    'learners': None,
+    'credit': 'score',
+    'attempts': 'attempts',
+    'words': 'word_range',
+}
+
+
+def count_records(apps, schema_editor):
+    """
+    Counts the existing learner records of each block
+    """
+    LearnerRecord = apps.get_model('freetextresponse', 'LearnerRecord')
+    LearnerCount = apps.get_model('freetextresponse', 'LearnerCount')
+    for name, field in COUNT_FIELDS.items():
+        fields = ['usage_key'] + ([field] if field else [])
+        rows = LearnerRecord.objects.order_by().values(*fields).annotate(
+            total=models.Count('pk'),
+        )
+        LearnerCount.objects.bulk_create(
+            [
+                LearnerCount(
+                    usage_key=row['usage_key'],
+                    name=name,
+                    value=str(row[field]) if field else '',
+                    count=row['total'],
+                )
+                for row in rows.iterator()
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('freetextresponse', '0003_staff_change_rows'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LearnerCount',
+            fields=[
+                ('id', models.BigAutoField(
+                    auto_created=True,
+                    primary_key=True,
+                    serialize=False,
+                    verbose_name='ID',
+                )),
+                ('usage_key', models.CharField(max_length=255)),
+                ('name', models.CharField(max_length=16)),
+                ('value', models.CharField(blank=True, max_length=32)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('usage_key', 'name', 'value')},
+            },
+        ),
+        migrations.RunPython(count_records, migrations.RunPython.noop),
+    ]
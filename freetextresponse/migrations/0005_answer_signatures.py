@@ -0,0 +1,52 @@
+# Generated by Django 4.2.19 on 2026-10-19 14:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('freetextresponse', '0004_learnercount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerSignature',
+            fields=[
+                ('id', models.BigAutoField(
+                    auto_created=True,
+                    primary_key=True,
+                    serialize=False,
+                    verbose_name='ID',
+                )),
+                ('usage_key', models.CharField(max_length=255)),
+                ('student_id', models.CharField(max_length=255)),
+                ('signature', models.CharField(max_length=255)),
+            ],
+            options={
+                'unique_together': {('usage_key', 'student_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AnswerBucket',
+            fields=[
+                ('id', models.BigAutoField(
+                    auto_created=True,
+                    primary_key=True,
+                    serialize=False,
+                    verbose_name='ID',
+                )),
+                ('usage_key', models.CharField(max_length=255)),
+                ('band', models.PositiveSmallIntegerField()),
+                ('bucket', models.CharField(max_length=8)),
+                ('student_id', models.CharField(max_length=255)),
+            ],
+            options={
+                'indexes': [models.Index(
+                    fields=['usage_key', 'bucket', 'band'],
+                    name='freetextres_usage_k_0898e2_idx',
+                )],
+                'unique_together': {('usage_key', 'student_id', 'band')},
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+"""
+Buffer the analytics events of a request and publish them in one batch
+"""
+import functools
+import time
+
+
+BATCH_EVENT_TYPE = 'edx.freetextresponse.events'
+
+
+def buffered_events(handler):
+    """
+    Decorate a handler so that the events it emits are published
+    together, in a single event, once it returns or raises
+    """
+    @functools.wraps(handler)
+    def wrapper(self, *args, **kwargs):
+        """
+        Runs the handler with an event buffer
+        """
+        self._event_buffer = []  # pylint: disable=protected-access
+        try:
+            return handler(self, *args, **kwargs)
+        finally:
+            self.flush_events()
+    return wrapper
+
+
+class EventBufferMixin(object):
+    """
+    Emit structured analytics events without a publish per event
+    """
+
+    _event_buffer = None
+
+    def emit_event(self, name, **data):
+        """
+        Records an event; outside a buffered handler it is
+        published at once
+        """
+        data['name'] = name
+        data['time'] = time.time()
+        if self._event_buffer is None:
+            self.runtime.publish(self, BATCH_EVENT_TYPE, {'events': [data]})
+        else:
+            self._event_buffer.append(data)
+
+    def flush_events(self):
+        """
+        Publishes the buffered events, if any, as one event
+        """
+        events, self._event_buffer = self._event_buffer, None
+        if events:
+            self.runtime.publish(self, BATCH_EVENT_TYPE, {'events': events})
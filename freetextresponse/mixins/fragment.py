@@ -5,16 +5,15 @@ Note: We should resume test coverage for all lines in this file once
 split into its own library.
 """
 from xblock.core import XBlock
-from xblock.utils.resources import ResourceLoader
 from web_fragments.fragment import Fragment
 
 
-loader = ResourceLoader(__name__)
-
-
 class XBlockFragmentBuilderMixin(object):
     """
     Create a default XBlock fragment builder
+
+    Classes using it provide a `loader`, a ResourceLoader of the
+    package holding the templates and public resources.
     """
     static_css = [
         'view.css',
@@ -83,8 +82,8 @@ class XBlockFragmentBuilderMixin(object):
                 url = item
                 fragment.add_css_url(url)
             else:
-                item = '../public/' + item
-                data = loader.load_unicode(item)
+                item = 'public/' + item
+                data = self.loader.load_unicode(item)
                 fragment.add_css(data)
         for item in js:
             item = 'public/' + item
@@ -1,13 +1,38 @@
 """
 Mixin workbench behavior into XBlocks
 """
-try:
-    from xblock.utils.resources import ResourceLoader
-except ModuleNotFoundError:
-    from xblockutils.resources import ResourceLoader
+import functools
+from xml.sax.saxutils import quoteattr
 
+from ..caching import get_setting
 
-loader = ResourceLoader(__name__)
+
+# Attribute sets cycled through by synthetic scenarios, so that their
+# blocks exercise the different rendering paths
+SYNTHETIC_BLOCK_VARIANTS = (
+    {},
+    {
+        'fullcredit_keyphrases': ['asdf'],
+        'halfcredit_keyphrases': ['fdsa'],
+    },
+    {'min_word_count': 2, 'max_attempts': 5},
+    {'display_other_student_responses': True},
+    {'display_correctness': False, 'submitted_message': 'Thanks'},
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_loader():
+    """
+    Returns the resource loader, imported only when the workbench
+    asks for scenarios
+    """
+    # pylint: disable=import-outside-toplevel
+    try:
+        from xblock.utils.resources import ResourceLoader
+    except ModuleNotFoundError:
+        from xblockutils.resources import ResourceLoader
+    return ResourceLoader(__name__)
 
 
 def _parse_title(title):
@@ -30,6 +55,49 @@ def _parse_scenarios(scenarios):
     return parsed_scenarios
 
 
+@functools.lru_cache(maxsize=None)
+def get_scenarios():
+    """
+    Returns the workbench scenarios, read from the scenario files and
+    generated once per process
+    """
+    scenarios = _parse_scenarios(
+        _get_loader().load_scenarios_from_path("../scenarios")
+    )
+    blocks = get_setting('SYNTHETIC_SCENARIO_BLOCKS', 0)
+    if blocks:
+        scenarios.append((
+            f'Free Text Response Synthetic {blocks}',
+            make_synthetic_scenario(blocks),
+        ))
+    return tuple(scenarios)
+
+
+def make_synthetic_scenario(blocks, units=1):
+    """
+    Returns the XML of a scenario with `units` units of `blocks`
+    FreeTextResponse blocks each, for rendering benchmarks
+    """
+    lines = ['<sequence_demo>']
+    for unit in range(units):
+        lines.append('    <vertical_demo>')
+        for block in range(blocks):
+            number = unit * blocks + block
+            variant = number % len(SYNTHETIC_BLOCK_VARIANTS)
+            attributes = dict(
+                SYNTHETIC_BLOCK_VARIANTS[variant],
+                display_name=f'Synthetic block {number + 1}',
+            )
+            attributes = ' '.join(
+                f'{name}={quoteattr(str(value))}'
+                for name, value in sorted(attributes.items())
+            )
+            lines.append(f'        <freetextresponse {attributes} />')
+        lines.append('    </vertical_demo>')
+    lines.append('</sequence_demo>')
+    return '\n'.join(lines)
+
+
 class XBlockWorkbenchMixin(object):
     """
     Provide a default test workbench for the XBlock
@@ -40,5 +108,4 @@ class XBlockWorkbenchMixin(object):
         """
         Gather scenarios to be displayed in the workbench
         """
-        scenarios = loader.load_scenarios_from_path("../scenarios")
-        return _parse_scenarios(scenarios)
+        return list(get_scenarios())
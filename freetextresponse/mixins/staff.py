@@ -0,0 +1,222 @@
+"""
+Staff tools: duplicate clusters, the dashboard and bulk operations
+
+The duplicate clusters, the dashboard and bulk operations store their
+records with the app's Django models, so their modules are imported
+only once duplicate detection or the staff tools are found enabled;
+the block loads without them.
+"""
+from xblock.core import XBlock
+from xblock.exceptions import JsonHandlerError
+
+from ..caching import get_setting
+from ..profiling import profiled
+
+
+class StaffToolsMixin(object):
+    """
+    Handlers for course staff, who see and change the state of
+    all the learners of a block
+    """
+
+    @XBlock.json_handler
+    @profiled
+    def duplicate_clusters(self, data, suffix=''):
+        # pylint: disable=unused-argument
+        """
+        Returns groups of students with near-identical answers, for staff
+        """
+        if not self.is_staff():
+            raise JsonHandlerError(403, self.gettext('Staff only'))
+        clusters = []
+        if self.detect_duplicates:
+            # pylint: disable=import-outside-toplevel
+            from ..signatures import get_clusters
+            clusters = get_clusters(str(self.scope_ids.usage_id))
+        result = {
+            'status': 'success',
+            'clusters': clusters,
+        }
+        return result
+
+    @XBlock.json_handler
+    @profiled
+    def dashboard(self, data, suffix=''):
+        # pylint: disable=unused-argument
+        """
+        Returns a page of the learners' latest answers, newest first,
+        and the number of learners by credit, attempts and word count,
+        for staff
+
+        The answers can be filtered by one of credit (such as 0.5),
+        attempts or words (a word count range such as "10-24"). Each
+        page returns the opaque cursor of the next one, or null. Only
+        learners who submitted since the staff tools were enabled, or
+        who loaded the block since, are listed.
+        """
+        self._check_staff_tools()
+        # pylint: disable=import-outside-toplevel
+        from .. import dashboard
+        filters = [name for name in dashboard.FILTERS if name in data]
+        if len(filters) > 1:
+            raise JsonHandlerError(
+                400,
+                self.gettext('Filter by only one of credit, attempts '
+                             'or words'),
+            )
+        try:
+            lookup = {}
+            if filters:
+                lookup = dashboard.get_filter(filters[0], data[filters[0]])
+            cursor = dashboard.parse_cursor(data.get('cursor'))
+            limit = int(data.get('limit') or dashboard.DASHBOARD_PAGE_SIZE)
+        except (TypeError, ValueError) as error:
+            raise JsonHandlerError(
+                400,
+                self.gettext('Invalid dashboard query'),
+            ) from error
+        limit = min(max(limit, 1), dashboard.MAX_DASHBOARD_PAGE_SIZE)
+        usage_key = str(self.scope_ids.usage_id)
+        rows, next_cursor = dashboard.get_page(
+            usage_key,
+            lookup,
+            cursor,
+            limit,
+        )
+        counts = dashboard.get_counts(usage_key)
+        result = {
+            'status': 'success',
+            'counts': counts,
+            'total': dashboard.get_total(
+                counts,
+                filters[0] if filters else None,
+                lookup,
+            ),
+            'answers': [
+                {
+                    'student_id': row.student_id,
+                    'credit': row.score,
+                    'attempts': row.attempts,
+                    'words': row.words,
+                    'time': int(row.modified.timestamp()),
+                    'snippet': row.snippet,
+                }
+                for row in rows
+            ],
+            'cursor': next_cursor,
+        }
+        return result
+
+    @XBlock.json_handler
+    @profiled
+    def bulk_operation(self, data, suffix=''):
+        # pylint: disable=unused-argument
+        """
+        Resets the answers of, or grants extra attempts to, many learners
+        at once, for staff
+
+        The learners are given as a list of student ids or as a filter of
+        the learner records: those who used up their attempts
+        (max_attempts) or who submitted without credit (zero_credit).
+        Each request processes one chunk of learners; posting the
+        operation id processes the next one, until the operation is done.
+        """
+        self._check_staff_tools()
+        # pylint: disable=import-outside-toplevel
+        from .. import bulk
+        operation_id = data.get('operation_id')
+        if operation_id:
+            operation = self._get_staff_operation(operation_id)
+        else:
+            operation = self._create_staff_operation(data)
+        self._run_staff_operation(operation)
+        result = {
+            'status': 'success',
+            'operation': bulk.describe_operation(operation),
+        }
+        return result
+
+    def _check_staff_tools(self):
+        """
+        Rejects the request unless it comes from staff and the staff
+        tools are enabled
+        """
+        if not self.is_staff():
+            raise JsonHandlerError(403, self.gettext('Staff only'))
+        if not get_setting('STAFF_TOOLS', False):
+            raise JsonHandlerError(
+                404,
+                self.gettext('The staff tools are not enabled'),
+            )
+
+    def _get_staff_operation(self, operation_id):
+        """
+        Returns the staff operation with the given id
+        """
+        # pylint: disable=import-outside-toplevel
+        from .. import bulk
+        operation = bulk.get_operation(
+            str(self.scope_ids.usage_id),
+            operation_id,
+        )
+        if operation is None:
+            raise JsonHandlerError(404, self.gettext('Unknown operation'))
+        return operation
+
+    def _create_staff_operation(self, data):
+        """
+        Creates a staff operation from the posted data
+        """
+        # pylint: disable=import-outside-toplevel
+        from .. import bulk
+        action = data.get('action')
+        attempts = data.get('attempts', 0)
+        if action not in bulk.ACTIONS:
+            raise JsonHandlerError(400, self.gettext('Unknown action'))
+        if action == 'grant' and (
+                not isinstance(attempts, int) or
+                isinstance(attempts, bool) or
+                attempts < 1
+        ):
+            raise JsonHandlerError(
+                400,
+                self.gettext('The attempts to grant must be a positive '
+                             'whole number'),
+            )
+        if data.get('filter') in bulk.FILTERS:
+            learners = bulk.select_learners(
+                str(self.scope_ids.usage_id),
+                data['filter'],
+                self.max_attempts,
+            )
+        elif isinstance(data.get('learners'), list):
+            learners = [str(learner) for learner in data['learners']]
+        else:
+            raise JsonHandlerError(
+                400,
+                self.gettext('Give a list of learners or a filter'),
+            )
+        return bulk.create_operation(
+            str(self.scope_ids.usage_id),
+            action,
+            attempts if action == 'grant' else 0,
+            learners,
+        )
+
+    def _run_staff_operation(self, operation):
+        """
+        Processes the operation's next chunk of learners and publishes
+        the grades of those with a record
+        """
+        # pylint: disable=import-outside-toplevel
+        from .. import bulk
+        # Learners without a record, or whose grade was not published,
+        # publish their grade when they apply the change
+        user_ids = bulk.process_next_changes(operation)
+        if operation.action == 'reset':
+            published = []
+            for student_id, user_id in sorted(user_ids.items()):
+                if user_id is not None:
+                    self.publish_grade(0.0, user_id=user_id)
+                    published.append(student_id)
+            bulk.mark_published(operation, published)
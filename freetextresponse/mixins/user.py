@@ -1,7 +1,6 @@
 """
 Extend XBlock with additional user functionality
 """
-from six import text_type
 
 
 # pylint: disable=too-few-public-methods
@@ -18,5 +17,11 @@ class MissingDataFetcherMixin(object):
             # pylint:disable=E1101
         else:
             student_id = self.scope_ids.user_id or ''
-            student_id = text_type(student_id)
+            student_id = str(student_id)
         return student_id
+
+    def is_staff(self):
+        """
+        Determines if the current user is course staff
+        """
+        return bool(getattr(self.runtime, 'user_is_staff', False))
@@ -1,18 +1,48 @@
 """
 Handle data access logic for the XBlock
 """
+from collections import namedtuple
+import contextlib
 from enum import Enum
+import html
+import time
+import uuid
+
+from django.core.cache import cache
 from django.db import IntegrityError
 from django.utils.translation import gettext_lazy as _
 from xblock.fields import Boolean
+from xblock.fields import Dict
 from xblock.fields import Float
 from xblock.fields import Integer
 from xblock.fields import List
 from xblock.fields import Scope
 from xblock.fields import String
 
+from .caching import content_hash
+from .caching import get_setting
+from .duplicates import minhash_signature
+from .fields import CompressedString
+from .history import answer_hash
+from .history import apply_delta
+from .history import get_entry_texts
+from .history import make_delta
+from .history import trim_history
+
 
 MAX_RESPONSES = 3
+MAX_RESPONSE_POOL = 100
+MAX_SNIPPET_LENGTH = 1000
+MAX_INDEX_SNIPPET_LENGTH = 200
+MAX_SUBMISSION_NONCES = 5
+MAX_NONCE_LENGTH = 64
+STATE_CONFLICT_CHECK = get_setting('STATE_CONFLICT_CHECK', False)
+STATE_CONFLICT_RETRIES = get_setting('STATE_CONFLICT_RETRIES', 2)
+# Seconds after which the lock of a request that died is released
+STATE_LOCK_TIMEOUT = get_setting('STATE_LOCK_TIMEOUT', 10)
+# Seconds the latest state version of a learner is kept in the cache,
+# longer than any request can hold state it read
+STATE_VERSION_TIMEOUT = 3600
 
 
 class FreeTextResponseModelMixin(object):
@@ -28,13 +58,45 @@ class FreeTextResponseModelMixin(object):
         'display_correctness',
         'min_word_count',
         'max_word_count',
+        'grading_mode',
+        'phrase_match_mode',
         'fullcredit_keyphrases',
         'halfcredit_keyphrases',
+        'fullcredit_rule',
+        'halfcredit_rule',
+        'credit_tiers',
+        'phrase_weights',
+        'reference_answers',
+        'fullcredit_similarity',
+        'halfcredit_similarity',
         'submitted_message',
         'display_other_student_responses',
+        'detect_duplicates',
+        'keep_attempt_history',
         'saved_message',
     ]
 
+    credit_tiers = List(
+        display_name=_('Credit Tiers'),
+        help=_(
+            'When grading by credit tiers, a list of tiers such as '
+            '{"credit": 0.75, "phrases": ["phrase one", "phrase two"]}. '
+            'An answer receives the highest credit of the tiers '
+            'whose phrases it contains'
+        ),
+        default=[],
+        scope=Scope.settings,
+    )
+    detect_duplicates = Boolean(
+        display_name=_('Detect Duplicate Answers'),
+        help=_(
+            'Index the answers so that staff can find groups of '
+            'near-identical answers, and keep near-identical answers '
+            'out of the other student responses'
+        ),
+        default=False,
+        scope=Scope.settings,
+    )
     display_correctness = Boolean(
         display_name=_('Display Correctness?'),
         help=_(
@@ -77,6 +139,47 @@ class FreeTextResponseModelMixin(object):
         default=[],
         scope=Scope.settings,
     )
+    fullcredit_rule = String(
+        display_name=_('Full-Credit Rule'),
+        help=_(
+            'When grading by rules, the rule a student\'s answer must '
+            'satisfy to receive full credit. Combine words, "quoted '
+            'phrases", /regular expressions/ and NEAR(word, word, '
+            'distance) with AND, OR, NOT and parentheses'
+        ),
+        default='',
+        scope=Scope.settings,
+    )
+    fullcredit_similarity = Float(
+        display_name=_('Full-Credit Similarity'),
+        help=_(
+            'When grading by similarity, the lowest similarity to a '
+            'reference answer, between 0 and 1, that receives full credit'
+        ),
+        default=0.8,
+        values={'min': 0, 'max': 1, 'step': 0.05},
+        scope=Scope.settings,
+    )
+    grading_mode = String(
+        display_name=_('Grading Mode'),
+        help=_(
+            'This selects whether answers are graded by key phrases, '
+            'rules, credit tiers, weighted phrases or similarity to '
+            'reference answers'
+        ),
+        default='keyphrases',
+        values=[
+            {'display_name': _('Key Phrases'), 'value': 'keyphrases'},
+            {'display_name': _('Rules'), 'value': 'rules'},
+            {'display_name': _('Credit Tiers'), 'value': 'tiers'},
+            {'display_name': _('Weighted Phrases'), 'value': 'weighted'},
+            {
+                'display_name': _('Similarity to Reference Answers'),
+                'value': 'similarity',
+            },
+        ],
+        scope=Scope.settings,
+    )
     halfcredit_keyphrases = List(
         display_name=_('Half-Credit Key Phrases'),
         help=_(
@@ -87,6 +190,39 @@ class FreeTextResponseModelMixin(object):
         default=[],
         scope=Scope.settings,
     )
+    halfcredit_rule = String(
+        display_name=_('Half-Credit Rule'),
+        help=_(
+            'When grading by rules, the rule a student\'s answer must '
+            'satisfy to receive half credit'
+        ),
+        default='',
+        scope=Scope.settings,
+    )
+    halfcredit_similarity = Float(
+        display_name=_('Half-Credit Similarity'),
+        help=_(
+            'When grading by similarity, the lowest similarity to a '
+            'reference answer, between 0 and 1, that receives half credit'
+        ),
+        default=0.5,
+        values={'min': 0, 'max': 1, 'step': 0.05},
+        scope=Scope.settings,
+    )
+    keep_attempt_history = Boolean(
+        display_name=_('Keep Attempt History'),
+        help=_(
+            'Keep a short history of each student\'s attempts, '
+            'with the changes between them'
+        ),
+        default=False,
+        scope=Scope.settings,
+    )
+    keyphrase_matcher = Dict(
+        default={},
+        scope=Scope.settings,
+        help=_('Keyphrases precompiled when the settings are saved'),
+    )
     max_attempts = Integer(
         display_name=_('Maximum Number of Attempts'),
         help=_(
@@ -117,6 +253,35 @@ class FreeTextResponseModelMixin(object):
         values={'min': 1},
         scope=Scope.settings,
     )
+    phrase_match_mode = String(
+        display_name=_('Phrase Matching'),
+        help=_(
+            'This selects whether key phrases, credit tiers and weighted '
+            'phrases match the exact text of the answer, or the stems of '
+            'its words, so that a phrase also matches other forms of its '
+            'words (connect, connected, connection) and common words '
+            'such as "the" are ignored. Forms that do not share a stem, '
+            'such as photosynthesis and photosynthetic, must each be '
+            'listed'
+        ),
+        default='exact',
+        values=[
+            {'display_name': _('Exact Text'), 'value': 'exact'},
+            {'display_name': _('Word Stems'), 'value': 'stemmed'},
+        ],
+        scope=Scope.settings,
+    )
+    phrase_weights = Dict(
+        display_name=_('Phrase Weights'),
+        help=_(
+            'When grading by weighted phrases, a mapping of phrases to '
+            'weights such as {"phrase one": 0.5, "phrase two": 0.25}. '
+            'An answer receives the sum of the weights of the phrases '
+            'it contains, up to full credit'
+        ),
+        default={},
+        scope=Scope.settings,
+    )
     prompt = String(
         display_name=_('Prompt'),
         help=_(
@@ -127,6 +292,20 @@ class FreeTextResponseModelMixin(object):
         scope=Scope.settings,
         multiline_editor=True,
     )
+    reference_answers = List(
+        display_name=_('Reference Answers'),
+        help=_(
+            'When grading by similarity, a list of model answers '
+            'that student answers are compared to'
+        ),
+        default=[],
+        scope=Scope.settings,
+    )
+    reference_vectors = Dict(
+        default={},
+        scope=Scope.settings,
+        help=_('Reference answers precomputed when the settings are saved'),
+    )
     submitted_message = String(
         display_name=_('Submission Received Message'),
         help=_(
@@ -158,15 +337,35 @@ class FreeTextResponseModelMixin(object):
         ),
         scope=Scope.settings,
     )
+    applied_staff_changes = List(
+        default=[],
+        scope=Scope.user_state,
+    )
+    attempt_history = List(
+        default=[],
+        scope=Scope.user_state,
+    )
     count_attempts = Integer(
         default=0,
         scope=Scope.user_state,
     )
+    learner_recorded = Boolean(
+        default=False,
+        scope=Scope.user_state,
+    )
+    recent_submission_nonces = List(
+        default=[],
+        scope=Scope.user_state,
+    )
     score = Float(
         default=0.0,
         scope=Scope.user_state,
     )
-    student_answer = String(
+    state_version = Integer(
+        default=0,
+        scope=Scope.user_state,
+    )
+    student_answer = CompressedString(
         default='',
         scope=Scope.user_state,
     )
@@ -188,17 +387,298 @@ class FreeTextResponseModelMixin(object):
             if response['student_id'] == student_id:
                 del self.displayable_answers[index]
                 break
+        if self._has_duplicate_in_pool(student_id):
+            return
 
         self.displayable_answers.append({
             'student_id': student_id,
-            'answer': self.student_answer,
+            'snippet': make_answer_snippet(self.student_answer),
         })
 
         # Want to store extra response so student can still see
-        # MAX_RESPONSES answers if their answer is in the pool.
-        response_index = -(MAX_RESPONSES+1)
+        # MAX_RESPONSE_POOL answers if their answer is in the pool.
+        response_index = -(MAX_RESPONSE_POOL+1)
         self.displayable_answers = self.displayable_answers[response_index:]
 
+    def _has_duplicate_in_pool(self, student_id):
+        """
+        Determines if another student's answer in the pool is a near
+        duplicate of the student's answer
+        """
+        if not self.detect_duplicates:
+            return False
+        # pylint: disable=import-outside-toplevel
+        from .signatures import find_similar
+        others = {
+            response['student_id']
+            for response in self.displayable_answers
+        }
+        others.discard(student_id)
+        return bool(find_similar(
+            str(self.scope_ids.usage_id),
+            minhash_signature(self.student_answer),
+            others,
+        ))
+
+    def index_student_answer(self):
+        """
+        Indexes the signature of the student's answer, replacing the
+        signature of their previous answer
+        """
+        if not self.detect_duplicates:
+            return
+        # The signatures are stored with the app's models, which load
+        # only when duplicate detection is enabled
+        # pylint: disable=import-outside-toplevel
+        from .signatures import index_answer
+        index_answer(
+            str(self.scope_ids.usage_id),
+            self.get_student_id(),
+            minhash_signature(self.student_answer),
+        )
+
+    def index_learner(self):
+        """
+        Records the learner's latest submission for the staff dashboard,
+        when the staff tools are enabled
+        """
+        if not get_setting('STAFF_TOOLS', False):
+            return
+        # The staff tools' records need the app's models, which load
+        # only when the staff tools are enabled
+        # pylint: disable=import-outside-toplevel
+        from .dashboard import record_learner
+        record_learner(
+            str(self.scope_ids.usage_id),
+            self.get_student_id(),
+            user_id=self.scope_ids.user_id,
+            attempts=self.count_attempts,
+            score=self.score,
+            words=len(self.student_answer.split()),
+            snippet=make_answer_snippet(
+                self.student_answer,
+                MAX_INDEX_SNIPPET_LENGTH,
+            ),
+        )
+        self.learner_recorded = True
+
+    def backfill_learner_record(self):
+        """
+        Records the learner's latest submission if they submitted before
+        the staff tools were enabled
+
+        Learners who submitted before and do not load the block again
+        have no record.
+        """
+        if self.count_attempts and not self.learner_recorded:
+            self.index_learner()
+
+    def apply_staff_changes(self):
+        """
+        Applies the staff changes pending for the learner; returns
+        whether there were any
+
+        The ids of the applied changes are saved with the learner's
+        state, and the changes are marked applied on the next load.
+        """
+        if not get_setting('STAFF_TOOLS', False):
+            return False
+        # pylint: disable=import-outside-toplevel
+        from .bulk import get_pending_changes
+        from .bulk import mark_applied
+        applied = self.applied_staff_changes
+        pending = get_pending_changes(
+            str(self.scope_ids.usage_id),
+            self.get_student_id(),
+        )
+        saved = [change.pk for change in pending if change.pk in applied]
+        mark_applied(saved)
+        changes = [change for change in pending if change.pk not in applied]
+        for change in changes:
+            operation = change.operation
+            if operation.action == 'reset':
+                self.student_answer = ''
+                self.count_attempts = 0
+                self.score = 0.0
+                # The deltas of the history lead back from the answer
+                self.attempt_history = []
+                if not change.published:
+                    self._publish_score()
+            else:
+                self.count_attempts = max(
+                    self.count_attempts - operation.attempts,
+                    0,
+                )
+        if saved or changes:
+            self.applied_staff_changes = [
+                change_id for change_id in applied if change_id not in saved
+            ] + [change.pk for change in changes]
+        return bool(changes)
+
+    def record_attempt(self, previous_answer):
+        """
+        Adds the submitted answer, which replaced previous_answer,
+        to the attempt history
+        """
+        if not self.keep_attempt_history:
+            return
+        history = self._rebase_history(previous_answer)
+        history.append({
+            'time': int(time.time()),
+            'words': len(self.student_answer.split()),
+            'credit': self.score,
+            'hash': answer_hash(self.student_answer),
+            'delta': [],
+        })
+        self.attempt_history = trim_history(history)
+
+    def rebase_attempt_history(self, previous_answer):
+        """
+        Keeps the attempts reconstructible after a draft replaced
+        previous_answer
+        """
+        if not self.keep_attempt_history or not self.attempt_history:
+            return
+        if self.student_answer != previous_answer:
+            history = self._rebase_history(previous_answer)
+            self.attempt_history = trim_history(history)
+
+    def _rebase_history(self, previous_answer):
+        """
+        Returns a copy of the history whose newest delta applies to the
+        current answer instead of previous_answer
+        """
+        history = [dict(entry) for entry in self.attempt_history]
+        if history and 'delta' in history[-1]:
+            text = apply_delta(previous_answer, history[-1]['delta'])
+            history[-1]['delta'] = make_delta(self.student_answer, text)
+        return history
+
+    def get_attempts(self):
+        """
+        Returns the attempts, oldest first, with their answers when
+        they can still be reconstructed
+        """
+        texts = get_entry_texts(self.attempt_history, self.student_answer)
+        return [
+            {
+                'time': entry['time'],
+                'words': entry['words'],
+                'credit': entry['credit'],
+                'hash': entry['hash'],
+                'answer': text,
+            }
+            for entry, text in zip(self.attempt_history, texts)
+        ]
+
+    def is_duplicate_submission(self, nonce):
+        """
+        Determines if a submission with this nonce was already processed
+        """
+        return bool(nonce) and nonce in self.recent_submission_nonces
+
+    def record_submission_nonce(self, nonce):
+        """
+        Remember the nonce of a processed submission, keeping only the
+        MAX_SUBMISSION_NONCES most recent ones
+        """
+        if not nonce:
+            return
+        nonces = self.recent_submission_nonces + [nonce]
+        self.recent_submission_nonces = nonces[-MAX_SUBMISSION_NONCES:]
+
+    def has_unsaved_user_state(self):
+        """
+        Determines if the user state was changed since it was read
+        or saved
+        """
+        # pylint: disable=protected-access
+        return any(
+            self.fields[name].scope == Scope.user_state
+            for name in self._get_fields_to_save()
+        )
+
+    @contextlib.contextmanager
+    def lock_user_state(self):
+        """
+        Holds the learner's state lock, shared by every process through
+        the Django cache; yields whether it was acquired
+
+        Waits for the lock STATE_CONFLICT_RETRIES times. A lock is
+        released after STATE_LOCK_TIMEOUT seconds if its request died.
+        """
+        key = self._get_state_cache_key('lock')
+        token = uuid.uuid4().hex
+        acquired = False
+        for retry in range(STATE_CONFLICT_RETRIES + 1):
+            if retry:
+                time.sleep(0.05 * retry)
+            acquired = cache.add(key, token, STATE_LOCK_TIMEOUT)
+            if acquired:
+                break
+        try:
+            yield acquired
+        finally:
+            if acquired and cache.get(key) == token:
+                cache.delete(key)
+
+    def is_user_state_stale(self):
+        """
+        Determines if another request saved the state after this
+        request read it
+
+        The version of every commit is also kept in the Django cache,
+        as the runtime may serve the state from a per-request cache.
+        """
+        latest = max(
+            cache.get(self._get_state_cache_key('version')) or 0,
+            self._get_stored_state_version(),
+        )
+        return latest > self.state_version
+
+    def commit_user_state(self):
+        """
+        Saves the user state with the next version; call it while
+        holding the state lock
+        """
+        self.state_version += 1
+        self.save()
+        cache.set(
+            self._get_state_cache_key('version'),
+            self.state_version,
+            STATE_VERSION_TIMEOUT,
+        )
+
+    def _get_state_cache_key(self, name):
+        """
+        Returns the cache key of the learner's state lock or version
+        """
+        learner = content_hash(
+            str(self.scope_ids.usage_id),
+            self.get_student_id(),
+        )
+        return f'freetextresponse.state.{name}.{learner}'
+
+    def reload_user_state(self):
+        """
+        Discard unsaved and cached user state, so it is read again
+        """
+        # pylint: disable=protected-access
+        for field in self.fields.values():
+            if field.scope == Scope.user_state:
+                field._del_cached_value(self)
+                self._dirty_fields.pop(field, None)
+
+    def _get_stored_state_version(self):
+        """
+        Returns the state version as saved, bypassing the field cache
+        """
+        # pylint: disable=protected-access
+        try:
+            return self._field_data.get(self, 'state_version')
+        except KeyError:
+            return self.fields['state_version'].default
+
     def max_score(self):
         """
         Returns the configured number of possible points for this component.
@@ -216,15 +696,27 @@ class FreeTextResponseModelMixin(object):
         """
         credit = self._determine_credit()
         self.score = credit.value
+        self._publish_score()
+
+    def _publish_score(self):
+        """
+        Publishes the user's current score
+        """
+        self.publish_grade(self.score)
+
+    def publish_grade(self, value, user_id=None):
+        """
+        Publishes a score; staff publish the scores of other learners
+        by giving their user_id
+        """
+        event = {
+            'value': value,
+            'max_value': Credit.full.value
+        }
+        if user_id is not None:
+            event['user_id'] = user_id
         try:
-            self.runtime.publish(
-                self,
-                'grade',
-                {
-                    'value': self.score,
-                    'max_value': Credit.full.value
-                }
-            )
+            self.runtime.publish(self, 'grade', event)
         except IntegrityError:
             pass
 
@@ -238,3 +730,47 @@ class Credit(Enum):
     zero = 0.0  # pylint: disable=invalid-name
     half = 0.5  # pylint: disable=invalid-name
     full = 1.0  # pylint: disable=invalid-name
+
+
+class PartialCredit(namedtuple('PartialCredit', ['value'])):
+    # pylint: disable=too-few-public-methods
+    """
+    Credit between the fixed levels of the Credit enumeration,
+    awarded when grading by credit tiers or weighted phrases
+    """
+    name = 'partial'
+
+
+def credit_for_value(value):
+    """
+    Returns the Credit level with the given value, or a PartialCredit
+    """
+    for credit in Credit:
+        if credit.value == value:
+            return credit
+    return PartialCredit(value)
+
+
+def make_answer_snippet(answer, max_length=MAX_SNIPPET_LENGTH):
+    """
+    Returns the answer as escaped HTML, shortened to max_length
+    characters, for display to other students or staff
+    """
+    answer = ''.join(
+        character
+        for character in answer.strip()
+        if character.isprintable() or character in '\n\t'
+    )
+    if len(answer) > max_length:
+        answer = answer[:max_length].rstrip() + '\u2026'
+    return html.escape(answer)
+
+
+def get_answer_snippet(response):
+    """
+    Returns the display snippet of a response pool entry; entries stored
+    before snippets were introduced keep the raw answer instead
+    """
+    if 'snippet' in response:
+        return response['snippet']
+    return make_answer_snippet(response['answer'])
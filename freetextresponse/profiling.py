@@ -0,0 +1,123 @@
+"""
+Profile a sample of handler and view calls
+
+Set FREETEXTRESPONSE_PROFILE_SAMPLE_RATE to the fraction of calls to
+profile, between 0 (the default, no profiling) and 1 (every call).
+Each sampled call writes a cProfile dump (`.prof`, readable with
+pstats or snakeviz) and, unless FREETEXTRESPONSE_PROFILE_MEMORY is
+False, a tracemalloc snapshot of the allocations made during the call
+(`.tracemalloc`, readable with tracemalloc.Snapshot.load) to
+FREETEXTRESPONSE_PROFILE_DIR. Only the newest
+FREETEXTRESPONSE_PROFILE_MAX_FILES files are kept.
+"""
+import cProfile
+import functools
+import itertools
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from .caching import get_setting
+
+
+log = logging.getLogger(__name__)
+# Only one profiler can run in a process at a time
+_capture_lock = threading.Lock()
+_capture_numbers = itertools.count()
+
+
+def profiled(func):
+    """
+    Decorate a handler or view so that a sample of its calls
+    are profiled
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        """
+        Runs the call, profiling it if it is sampled
+        """
+        sample_rate = get_setting('PROFILE_SAMPLE_RATE', 0.0)
+        if not sample_rate or random.random() >= sample_rate:
+            return func(*args, **kwargs)
+        # Calls sampled while another one is profiled run unprofiled
+        # pylint: disable=consider-using-with
+        if not _capture_lock.acquire(blocking=False):
+            return func(*args, **kwargs)
+        try:
+            return _capture(func, args, kwargs)
+        finally:
+            _capture_lock.release()
+    return wrapper
+
+
+def get_profile_dir():
+    """
+    Returns the directory the profiles are written to
+    """
+    return get_setting(
+        'PROFILE_DIR',
+        os.path.join(tempfile.gettempdir(), 'freetextresponse-profiles'),
+    )
+
+
+def _capture(func, args, kwargs):
+    """
+    Runs the call under cProfile and tracemalloc, and writes
+    what they captured
+    """
+    trace_memory = get_setting('PROFILE_MEMORY', True)
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(func, *args, **kwargs)
+    finally:
+        snapshot = tracemalloc.take_snapshot() if trace_memory else None
+        if started_tracing:
+            tracemalloc.stop()
+        try:
+            _write_capture(func.__name__, profile, snapshot)
+        except OSError:
+            log.exception('Cannot write the profile of %s', func.__name__)
+
+
+def _write_capture(name, profile, snapshot):
+    """
+    Writes the profile and the snapshot, then removes the oldest files
+    """
+    directory = get_profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    timestamp = time.strftime('%Y%m%d-%H%M%S')
+    number = next(_capture_numbers)
+    prefix = os.path.join(
+        directory,
+        f'{timestamp}-{os.getpid()}-{number:06d}-{name}',
+    )
+    profile.dump_stats(prefix + '.prof')
+    if snapshot is not None:
+        snapshot.dump(prefix + '.tracemalloc')
+    _rotate(directory, get_setting('PROFILE_MAX_FILES', 100))
+
+
+def _rotate(directory, max_files):
+    """
+    Removes all but the newest max_files captured files
+    """
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith(('.prof', '.tracemalloc')):
+            try:
+                entries.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                continue
+    entries.sort()
+    for _, path in entries[:max(len(entries) - max_files, 0)]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
@@ -10,7 +10,9 @@ function FreeTextResponseView(runtime, element) {
     'use strict';
 
     var $ = window.jQuery;
+    var AUTOSAVE_DELAY = 2000;
     var $element = $(element);
+    var $problem = $element.find('.freetextresponse');
     var $xblocksContainer = $('#seq_content');
     var buttonHide = $element.find('.hide-button');
     var buttonHideTextHide = $('.hide', buttonHide);
@@ -23,9 +25,22 @@ function FreeTextResponseView(runtime, element) {
     var userAlertMessage = $element.find('.user_alert');
     var textareaStudentAnswer = $element.find('.student_answer');
     var textareaParent = textareaStudentAnswer.parent();
+    var responsesContent = $element.find('.responses-content');
     var responseList = $element.find('.response-list');
+    var buttonMoreResponses = $element.find('.more-responses');
     var url = runtime.handlerUrl(element, 'submit');
     var urlSave = runtime.handlerUrl(element, 'save_reponse');
+    var urlResponses = runtime.handlerUrl(element, 'get_other_responses');
+    var responsesCursor = null;
+    var responsesLoaded = false;
+    var minWordCount = $problem.data('min-word-count');
+    var maxWordCount = $problem.data('max-word-count');
+    var invalidWordCountMessage = $problem.data('invalid-word-count');
+    var savedMessage = $problem.data('saved-message');
+    var autosaveTimer = null;
+    var lastSavedAnswer;
+    var rejectedSubmitPending = false;
+    var submissionNonce = null;
     var xblockId = $element.attr('data-usage-id');
     var cachedAnswerId = xblockId + '_cached_answer';
     var problemProgressId = xblockId + '_problem_progress';
@@ -36,6 +51,7 @@ function FreeTextResponseView(runtime, element) {
         problemProgress.text($xblocksContainer.data(problemProgressId));
         usedAttemptsFeedback.text($xblocksContainer.data(usedAttemptsFeedbackId));
     }
+    lastSavedAnswer = textareaStudentAnswer.val();
 
     // POLYFILL notify if it does not exist. Like in the xblock workbench.
     runtime.notify = runtime.notify || function () {
@@ -56,7 +72,44 @@ function FreeTextResponseView(runtime, element) {
     }
 
     /**
-     * Convert list of responses to an html string
+     * Check the word count the way the server does: words are separated by whitespace
+     * @param {string} answer - the student answer
+     * @returns {boolean} whether the word count is within the limits
+     */
+    function isWordCountValid(answer) {
+        var wordCount = answer.split(/\s+/).filter(function (word) {
+            return word.length > 0;
+        }).length;
+        return minWordCount <= wordCount && wordCount <= maxWordCount;
+    }
+
+    /**
+     * Return the nonce identifying the current submission; retries and
+     * double clicks reuse it until the answer changes or the submission succeeds
+     * @returns {string} the nonce
+     */
+    function getSubmissionNonce() {
+        if (submissionNonce === null) {
+            submissionNonce = Date.now().toString(36) + Math.random().toString(36).slice(2);
+        }
+        return submissionNonce;
+    }
+
+    /**
+     * Cache the student answer and progress for when the unit is shown again
+     * @param {string} answer - the student answer
+     * @param {Object} response - a jQuery HTTP response
+     * @returns {undefined} nothing
+     */
+    function cacheAnswer(answer, response) {
+        $xblocksContainer.data(cachedAnswerId, answer);
+        $xblocksContainer.data(problemProgressId, response.problem_progress);
+        $xblocksContainer.data(usedAttemptsFeedbackId, response.used_attempts_feedback);
+    }
+
+    /**
+     * Convert list of responses to an html string; the snippets
+     * are escaped by the server when the responses are stored
      * @param {Array} responses - a list of Responses
      * @returns {string} a string of HTML to add to the page
      */
@@ -64,14 +117,41 @@ function FreeTextResponseView(runtime, element) {
         var html = '';
         var noResponsesText = responseList.data('noresponse');
         responses.forEach(function (item) {
-            html += '<li class="other-student-responses">' + item.answer + '</li>';
+            html += '<li class="other-student-responses">' + item.snippet + '</li>';
         });
         html = html || '<li class="no-response">' + noResponsesText + '</li>';
         return html;
     }
 
     /**
-     * Display responses, if applicable
+     * Fetch a page of other students' responses
+     * @param {string|null} cursor - where the page starts, or null for the first page
+     * @returns {undefined} nothing
+     */
+    function loadResponses(cursor) {
+        $.ajax(urlResponses, {
+            type: 'POST',
+            data: JSON.stringify({
+                cursor: cursor,
+            }),
+            success: function loadResponsesOnSuccess(response) {
+                if (cursor === null) {
+                    responseList.html(getStudentResponsesHtml(response.responses));
+                } else if (response.responses.length) {
+                    responseList.append(getStudentResponsesHtml(response.responses));
+                }
+                responsesCursor = response.cursor;
+                buttonMoreResponses.toggle(responsesCursor !== null);
+            },
+            error: function loadResponsesOnError() {
+                responsesLoaded = false;
+                runtime.notify('error', {});
+            },
+        });
+    }
+
+    /**
+     * Display the responses box, if applicable
      * @param {Object} response - a jQuery HTTP response
      * @returns {undefined} nothing
      */
@@ -80,18 +160,95 @@ function FreeTextResponseView(runtime, element) {
             $element.find('.responses-box').addClass('hidden');
             return;
         }
-        var responseHTML = getStudentResponsesHtml(response.other_responses);
-        responseList.html(responseHTML);
+
+        // The answer changed, so the responses are fetched again
+        responsesLoaded = responsesContent.is(':visible');
+        if (responsesLoaded) {
+            loadResponses(null);
+        }
         $element.find('.responses-box').removeClass('hidden');
     }
 
     buttonHide.on('click', function () {
-        responseList.toggle();
+        responsesContent.toggle();
         buttonHideTextHide.toggle();
         buttonHideTextShow.toggle();
+        if (!responsesLoaded) {
+            responsesLoaded = true;
+            loadResponses(null);
+        }
+    });
+
+    buttonMoreResponses.on('click', function () {
+        loadResponses(responsesCursor);
+        return false;
     });
 
+    /**
+     * Save the answer as a draft
+     * @param {string} answer - the student answer
+     * @param {Function} onSuccess - called with the jQuery HTTP response
+     * @param {Function} onError - called when the request fails
+     * @returns {undefined} nothing
+     */
+    function saveAnswer(answer, onSuccess, onError) {
+        var rejectedSubmit = rejectedSubmitPending;
+
+        rejectedSubmitPending = false;
+        $.ajax(urlSave, {
+            type: 'POST',
+            data: JSON.stringify({
+                // eslint-disable-next-line camelcase
+                student_answer: answer,
+                // eslint-disable-next-line camelcase
+                rejected_submit: rejectedSubmit,
+            }),
+            success: function saveAnswerOnSuccess(response) {
+                lastSavedAnswer = answer;
+                cacheAnswer(answer, response);
+                onSuccess(response);
+            },
+            error: function saveAnswerOnError() {
+                rejectedSubmitPending = rejectedSubmitPending || rejectedSubmit;
+                onError();
+            },
+        });
+    }
+
+    /**
+     * Save the draft if it changed since the last save, unless saving is closed
+     * @returns {undefined} nothing
+     */
+    function autosave() {
+        var answer = textareaStudentAnswer.val();
+
+        autosaveTimer = null;
+        if (answer === lastSavedAnswer || !buttonSave.length || buttonSave.hasClass('nodisplay')) {
+            return;
+        }
+        saveAnswer(answer, function autosaveOnSuccess(response) {
+            buttonSubmit.addClass(response.nodisplay_class);
+            buttonSave.addClass(response.nodisplay_class);
+        }, $.noop);
+    }
+
     buttonSubmit.on('click', function () {
+        var answer = textareaStudentAnswer.val();
+
+        if (!isWordCountValid(answer)) {
+            submissionReceivedMessage.text('');
+            userAlertMessage.text(invalidWordCountMessage);
+
+            // The next save of the draft reports the refused submission;
+            // an unchanged draft is not sent again
+            rejectedSubmitPending = true;
+            if (answer !== lastSavedAnswer) {
+                clearTimeout(autosaveTimer);
+                autosave();
+            }
+            return false;
+        }
+        clearTimeout(autosaveTimer);
         buttonSubmit.text(buttonSubmit[0].dataset.checking);
         runtime.notify('submit', {
             message: 'Submitting...',
@@ -101,11 +258,13 @@ function FreeTextResponseView(runtime, element) {
             type: 'POST',
             data: JSON.stringify({
                 // eslint-disable-next-line camelcase
-                student_answer: $element.find('.student_answer').val(),
+                student_answer: answer,
                 // eslint-disable-next-line camelcase
                 can_record_response: $element.find('.messageCheckbox').prop('checked'),
+                nonce: getSubmissionNonce(),
             }),
             success: function buttonSubmitOnSuccess(response) {
+                submissionNonce = null;
                 usedAttemptsFeedback.text(response.used_attempts_feedback);
                 buttonSubmit.addClass(response.nodisplay_class);
                 problemProgress.text(response.problem_progress);
@@ -115,10 +274,8 @@ function FreeTextResponseView(runtime, element) {
                 buttonSave.addClass(response.nodisplay_class);
                 setClassForTextAreaParent(response.indicator_class);
                 displayResponsesIfAnswered(response);
-
-                $xblocksContainer.data(cachedAnswerId, $element.find('.student_answer').val());
-                $xblocksContainer.data(problemProgressId, response.problem_progress);
-                $xblocksContainer.data(usedAttemptsFeedbackId, response.used_attempts_feedback);
+                lastSavedAnswer = answer;
+                cacheAnswer(answer, response);
 
                 runtime.notify('submit', {
                     state: 'end',
@@ -132,41 +289,43 @@ function FreeTextResponseView(runtime, element) {
     });
 
     buttonSave.on('click', function () {
+        var answer = textareaStudentAnswer.val();
+
+        clearTimeout(autosaveTimer);
+        if (answer === lastSavedAnswer) {
+            submissionReceivedMessage.text('');
+            userAlertMessage.text(savedMessage);
+            return false;
+        }
         buttonSave.text(buttonSave[0].dataset.checking);
         runtime.notify('save', {
             message: 'Saving...',
             state: 'start',
         });
-        $.ajax(urlSave, {
-            type: 'POST',
-            data: JSON.stringify({
-                // eslint-disable-next-line camelcase
-                student_answer: $element.find('.student_answer').val(),
-            }),
-            success: function buttonSaveOnSuccess(response) {
-                buttonSubmit.addClass(response.nodisplay_class);
-                buttonSave.addClass(response.nodisplay_class);
-                usedAttemptsFeedback.text(response.used_attempts_feedback);
-                problemProgress.text(response.problem_progress);
-                submissionReceivedMessage.text(response.submitted_message);
-                buttonSave.text(buttonSave[0].dataset.value);
-                userAlertMessage.text(response.user_alert);
-
-                $xblocksContainer.data(cachedAnswerId, $element.find('.student_answer').val());
-                $xblocksContainer.data(problemProgressId, response.problem_progress);
-                $xblocksContainer.data(usedAttemptsFeedbackId, response.used_attempts_feedback);
+        saveAnswer(answer, function buttonSaveOnSuccess(response) {
+            buttonSubmit.addClass(response.nodisplay_class);
+            buttonSave.addClass(response.nodisplay_class);
+            usedAttemptsFeedback.text(response.used_attempts_feedback);
+            problemProgress.text(response.problem_progress);
+            submissionReceivedMessage.text(response.submitted_message);
+            buttonSave.text(buttonSave[0].dataset.value);
+            userAlertMessage.text(response.user_alert);
 
-                runtime.notify('save', {
-                    state: 'end',
-                });
-            },
-            error: function buttonSaveOnError() {
-                runtime.notify('error', {});
-            },
+            runtime.notify('save', {
+                state: 'end',
+            });
+        }, function buttonSaveOnError() {
+            runtime.notify('error', {});
         });
         return false;
     });
 
+    textareaStudentAnswer.on('input', function () {
+        submissionNonce = null;
+        clearTimeout(autosaveTimer);
+        autosaveTimer = setTimeout(autosave, AUTOSAVE_DELAY);
+    });
+
     textareaStudentAnswer.on('keydown', function () {
 
         // Reset Messages
@@ -0,0 +1,140 @@
+"""
+Database records of the staff tools and duplicate detection, one row
+per learner
+
+XBlock fields shared by the learners of a block are stored in a single
+row, which every request rewrites whole; these records are written and
+read one learner, or one page of learners, at a time.
+"""
+from django.db import models
+
+
+class StaffOperation(models.Model):
+    """
+    A bulk operation run by staff on the learners of a block
+    """
+
+    operation_id = models.CharField(max_length=32, unique=True)
+    usage_key = models.CharField(max_length=255, db_index=True)
+    action = models.CharField(max_length=16)
+    attempts = models.PositiveIntegerField(default=0)
+    # Number of target learners, and of those whose change was processed
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+
+    objects = models.Manager()
+
+
+class StaffChange(models.Model):
+    """
+    The change a staff operation makes to the state of one learner,
+    applied the next time the learner loads the block once staff
+    processed it
+    """
+
+    operation = models.ForeignKey(
+        StaffOperation,
+        on_delete=models.CASCADE,
+        related_name='changes',
+    )
+    usage_key = models.CharField(max_length=255)
+    student_id = models.CharField(max_length=255)
+    # Whether staff updated the learner's record for the change
+    processed = models.BooleanField(default=False)
+    # Whether staff published the learner's grade for the change
+    published = models.BooleanField(default=False)
+    applied = models.BooleanField(default=False)
+
+    objects = models.Manager()
+
+    class Meta:
+        unique_together = (('operation', 'student_id'),)
+        indexes = [
+            models.Index(fields=['usage_key', 'student_id', 'applied']),
+            models.Index(fields=['operation', 'processed']),
+        ]
+
+
+class LearnerRecord(models.Model):
+    """
+    The latest submission of a learner, listed and counted by the staff
+    dashboard
+    """
+
+    usage_key = models.CharField(max_length=255)
+    student_id = models.CharField(max_length=255)
+    user_id = models.IntegerField(null=True)
+    attempts = models.PositiveIntegerField(default=0)
+    score = models.FloatField(default=0.0)
+    words = models.PositiveIntegerField(default=0)
+    # Label of the word count range, such as "10-24"
+    word_range = models.CharField(max_length=16)
+    snippet = models.TextField(default='', blank=True)
+    modified = models.DateTimeField()
+
+    objects = models.Manager()
+
+    class Meta:
+        unique_together = (('usage_key', 'student_id'),)
+        indexes = [
+            models.Index(fields=['usage_key', 'modified']),
+            models.Index(fields=['usage_key', 'score', 'modified']),
+            models.Index(fields=['usage_key', 'attempts', 'modified']),
+            models.Index(fields=['usage_key', 'word_range', 'modified']),
+        ]
+
+
+class LearnerCount(models.Model):
+    """
+    The number of learners of a block whose record has a value of a
+    dashboard count, such as a credit of 0.5, kept up to date as the
+    records change so the dashboard does not count the records
+    """
+
+    usage_key = models.CharField(max_length=255)
+    # Name of the count, such as "credit", or "learners" for all
+    name = models.CharField(max_length=16)
+    value = models.CharField(max_length=32, blank=True)
+    count = models.IntegerField(default=0)
+
+    objects = models.Manager()
+
+    class Meta:
+        unique_together = (('usage_key', 'name', 'value'),)
+
+
+class AnswerSignature(models.Model):
+    """
+    The MinHash signature of a learner's latest answer, for finding
+    near-duplicate answers
+    """
+
+    usage_key = models.CharField(max_length=255)
+    student_id = models.CharField(max_length=255)
+    signature = models.CharField(max_length=255)
+
+    objects = models.Manager()
+
+    class Meta:
+        unique_together = (('usage_key', 'student_id'),)
+
+
+class AnswerBucket(models.Model):
+    """
+    The LSH bucket of a band of a learner's answer signature; learners
+    sharing a bucket have possibly near-duplicate answers
+    """
+
+    usage_key = models.CharField(max_length=255)
+    band = models.PositiveSmallIntegerField()
+    bucket = models.CharField(max_length=8)
+    student_id = models.CharField(max_length=255)
+
+    objects = models.Manager()
+
+    class Meta:
+        unique_together = (('usage_key', 'student_id', 'band'),)
+        indexes = [
+            models.Index(fields=['usage_key', 'bucket', 'band']),
+        ]
@@ -0,0 +1,336 @@
+"""
+Compile and evaluate boolean grading rules
+
+A rule combines terms with AND, OR, NOT and parentheses:
+
+    photosynthesis AND (light OR sun) AND NOT "dark reaction"
+
+Operands are single words, "quoted phrases", /regular expressions/
+and NEAR(operand, operand, distance), which matches when both words or
+phrases start within the given number of words of each other.
+Words and phrases match whole words, ignoring case.
+"""
+import re
+
+from .caching import LRUCache
+from .caching import content_hash
+from .caching import get_setting
+
+
+_TOKEN_RE = re.compile(r'\w+')
+_RULE_TOKEN_RE = re.compile(
+    r'\s*(?:'
+    r'(?P<paren>[(),])'
+    r'|"(?P<phrase>[^"]*)"'
+    r'|/(?P<regex>(?:\\.|[^/\\])*)/'
+    r'|(?P<word>[^\s()",/]+)'
+    r')'
+)
+_KEYWORDS = ('AND', 'OR', 'NOT', 'NEAR')
+
+
+class RuleSyntaxError(ValueError):
+    """
+    Raised when a rule cannot be compiled
+    """
+
+
+def tokenize(text):
+    """
+    Split text into lowercased words
+    """
+    return _TOKEN_RE.findall(text.lower())
+
+
+class AnswerIndex(object):
+    """
+    A student answer tokenized once, shared by every rule evaluated on it
+    """
+
+    def __init__(self, answer):
+        self.text = answer.lower()
+        self.tokens = _TOKEN_RE.findall(self.text)
+        self.positions = {}
+        for position, token in enumerate(self.tokens):
+            self.positions.setdefault(token, []).append(position)
+
+    def phrase_positions(self, words):
+        """
+        Returns the positions where the sequence of words starts
+        """
+        positions = self.positions.get(words[0], [])
+        if len(words) == 1:
+            return positions
+        size = len(words)
+        return [
+            position
+            for position in positions
+            if tuple(self.tokens[position:position + size]) == words
+        ]
+
+
+class _Words(object):
+    """
+    Leaf matching a word or a sequence of words
+    """
+
+    def __init__(self, words):
+        self.words = words
+
+    def positions(self, index):
+        """
+        Returns the positions where the words start
+        """
+        return index.phrase_positions(self.words)
+
+    def __call__(self, index):
+        return bool(self.positions(index))
+
+
+class _Regex(object):
+    """
+    Leaf matching a regular expression anywhere in the answer
+    """
+
+    def __init__(self, source):
+        try:
+            self.pattern = re.compile(source, re.IGNORECASE)
+        except re.error as error:
+            raise RuleSyntaxError(
+                f'Invalid regular expression /{source}/'
+            ) from error
+
+    def __call__(self, index):
+        return self.pattern.search(index.text) is not None
+
+
+class _Near(object):
+    """
+    Leaf matching two words or phrases within a distance of each other
+    """
+
+    def __init__(self, left, right, distance):
+        self.left = left
+        self.right = right
+        self.distance = distance
+
+    def __call__(self, index):
+        left = self.left.positions(index)
+        right = self.right.positions(index)
+        i = j = 0
+        # Both position lists are sorted; walk them together
+        while i < len(left) and j < len(right):
+            if abs(left[i] - right[j]) <= self.distance:
+                return True
+            if left[i] < right[j]:
+                i += 1
+            else:
+                j += 1
+        return False
+
+
+class RulePlan(object):
+    """
+    A rule compiled into leaf matchers and a postfix boolean program
+    """
+
+    def __init__(self, leaves, program):
+        self.leaves = leaves
+        self.program = program
+
+    def evaluate(self, index):
+        """
+        Determines if the tokenized answer satisfies the rule
+        """
+        results = [leaf(index) for leaf in self.leaves]
+        stack = []
+        for operator, operand in self.program:
+            if operator == 'leaf':
+                stack.append(results[operand])
+            elif operator == 'not':
+                stack.append(not stack.pop())
+            else:
+                values = stack[-operand:]
+                del stack[-operand:]
+                stack.append(
+                    all(values) if operator == 'and' else any(values)
+                )
+        return stack.pop()
+
+
+class _Parser(object):
+    """
+    Recursive-descent parser emitting a RulePlan
+    """
+
+    def __init__(self, text):
+        self.tokens = _scan(text)
+        self.position = 0
+        self.leaves = []
+        self.program = []
+
+    def parse(self):
+        """
+        Parses the whole rule
+        """
+        self._parse_or()
+        if self._peek() is not None:
+            raise RuleSyntaxError(f'Unexpected "{self._peek()[1]}"')
+        return RulePlan(self.leaves, self.program)
+
+    def _peek(self):
+        """
+        Returns the current token, or None at the end
+        """
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def _next(self):
+        """
+        Consumes and returns the current token
+        """
+        token = self._peek()
+        if token is None:
+            raise RuleSyntaxError('Unexpected end of rule')
+        self.position += 1
+        return token
+
+    def _accept(self, kind, value=None):
+        """
+        Consumes the current token if it matches
+        """
+        token = self._peek()
+        if token and token[0] == kind and value in (None, token[1]):
+            self.position += 1
+            return True
+        return False
+
+    def _expect(self, kind, value):
+        """
+        Consumes the current token, which must match
+        """
+        if not self._accept(kind, value):
+            raise RuleSyntaxError(f'Expected "{value}"')
+
+    def _parse_or(self):
+        """
+        Parses operands joined by OR
+        """
+        count = 1
+        self._parse_and()
+        while self._accept('keyword', 'OR'):
+            self._parse_and()
+            count += 1
+        if count > 1:
+            self.program.append(('or', count))
+
+    def _parse_and(self):
+        """
+        Parses operands joined by AND
+        """
+        count = 1
+        self._parse_not()
+        while self._accept('keyword', 'AND'):
+            self._parse_not()
+            count += 1
+        if count > 1:
+            self.program.append(('and', count))
+
+    def _parse_not(self):
+        """
+        Parses an optionally negated operand
+        """
+        if self._accept('keyword', 'NOT'):
+            self._parse_not()
+            self.program.append(('not', None))
+        else:
+            self._parse_atom()
+
+    def _parse_atom(self):
+        """
+        Parses a group, NEAR(), regular expression, word or phrase
+        """
+        if self._accept('paren', '('):
+            self._parse_or()
+            self._expect('paren', ')')
+            return
+        if self._accept('keyword', 'NEAR'):
+            self._expect('paren', '(')
+            left = self._parse_words()
+            self._expect('paren', ',')
+            right = self._parse_words()
+            self._expect('paren', ',')
+            kind, value = self._next()
+            if kind != 'word' or not value.isdigit():
+                raise RuleSyntaxError('NEAR distance must be a number')
+            self._expect('paren', ')')
+            self._add_leaf(_Near(left, right, int(value)))
+            return
+        token = self._peek()
+        if token and token[0] == 'regex':
+            self.position += 1
+            self._add_leaf(_Regex(token[1]))
+            return
+        self._add_leaf(self._parse_words())
+
+    def _parse_words(self):
+        """
+        Parses a word or a quoted phrase
+        """
+        kind, value = self._next()
+        if kind not in ('word', 'phrase'):
+            raise RuleSyntaxError(f'Unexpected "{value}"')
+        words = tuple(tokenize(value))
+        if not words:
+            raise RuleSyntaxError(f'"{value}" contains no words')
+        return _Words(words)
+
+    def _add_leaf(self, leaf):
+        """
+        Adds a leaf matcher to the plan
+        """
+        self.program.append(('leaf', len(self.leaves)))
+        self.leaves.append(leaf)
+
+
+def _scan(text):
+    """
+    Split rule text into (kind, value) tokens
+    """
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _RULE_TOKEN_RE.match(text, position)
+        if not match:
+            raise RuleSyntaxError(f'Unexpected "{text[position:]}"')
+        position = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'word' and value in _KEYWORDS:
+            kind = 'keyword'
+        tokens.append((kind, value))
+    return tokens
+
+
+def compile_rule(text):
+    """
+    Compile rule text into a RulePlan; raises RuleSyntaxError
+    """
+    if not text or not text.strip():
+        raise RuleSyntaxError('Rule is empty')
+    return _Parser(text).parse()
+
+
+def get_rule_plan(text):
+    """
+    Returns the shared compiled plan for the rule text
+    """
+    return _plan_cache.get_or_create(
+        content_hash(text),
+        lambda: compile_rule(text),
+    )
+
+
+_plan_cache = LRUCache(get_setting('RULE_CACHE_SIZE', 1024))
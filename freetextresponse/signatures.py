@@ -0,0 +1,136 @@
+"""
+Answer signatures, for duplicate detection
+
+Each learner whose answer was indexed has an AnswerSignature row of
+their latest answer's signature and an AnswerBucket row for each of its
+bands, written on their own as they submit, so a submission replaces
+only the learner's rows instead of the index of the whole block.
+"""
+import itertools
+
+from django.db import transaction
+from django.db.models import Count
+
+from .duplicates import DUPLICATE_THRESHOLD
+from .duplicates import MAX_BUCKET_SIZE
+from .duplicates import bucket_keys
+from .duplicates import decode_signature
+from .duplicates import encode_signature
+from .duplicates import estimate_similarity
+from .duplicates import find_clusters
+from .records import AnswerBucket
+from .records import AnswerSignature
+
+
+def _get_bucket_rows(usage_key, signature):
+    """
+    Returns the bucket rows of the block in any bucket of the signature
+
+    The rows are looked up by bucket alone, which reads them from the
+    index in one range per bucket; a row of another band with the same
+    bucket is a rare extra candidate.
+    """
+    return AnswerBucket.objects.filter(
+        usage_key=usage_key,
+        bucket__in=bucket_keys(signature),
+    )
+
+
+@transaction.atomic
+def index_answer(usage_key, student_id, signature):
+    """
+    Replaces the signature of the learner's answer, or removes it when
+    the signature is None; a bucket gets the learner while it has fewer
+    than MAX_BUCKET_SIZE members
+    """
+    signatures = AnswerSignature.objects.filter(
+        usage_key=usage_key,
+        student_id=student_id,
+    )
+    encoded = signature and encode_signature(signature)
+    if signatures.values_list('signature', flat=True).first() == encoded:
+        return
+    AnswerBucket.objects.filter(
+        usage_key=usage_key,
+        student_id=student_id,
+    ).delete()
+    if signature is None:
+        signatures.delete()
+        return
+    if not signatures.update(signature=encoded):
+        AnswerSignature.objects.create(
+            usage_key=usage_key,
+            student_id=student_id,
+            signature=encoded,
+        )
+    sizes = {
+        (band, bucket): size
+        for band, bucket, size in _get_bucket_rows(
+            usage_key,
+            signature,
+        ).order_by().values_list('band', 'bucket').annotate(
+            size=Count('pk'),
+        )
+    }
+    AnswerBucket.objects.bulk_create([
+        AnswerBucket(
+            usage_key=usage_key,
+            band=band,
+            bucket=bucket,
+            student_id=student_id,
+        )
+        for band, bucket in enumerate(bucket_keys(signature))
+        if sizes.get((band, bucket), 0) < MAX_BUCKET_SIZE
+    ])
+
+
+def find_similar(usage_key, signature, student_ids,
+                 threshold=DUPLICATE_THRESHOLD):
+    """
+    Returns those of the students sharing a bucket with the signature
+    whose signatures are at least `threshold` similar to it
+    """
+    if signature is None or not student_ids:
+        return set()
+    members = _get_bucket_rows(usage_key, signature).values('student_id')
+    rows = AnswerSignature.objects.filter(
+        usage_key=usage_key,
+        student_id__in=list(student_ids),
+    ).filter(student_id__in=members).values_list('student_id', 'signature')
+    return {
+        student_id
+        for student_id, encoded in rows
+        if estimate_similarity(
+            signature,
+            decode_signature(encoded),
+        ) >= threshold
+    }
+
+
+def get_clusters(usage_key, threshold=DUPLICATE_THRESHOLD):
+    """
+    Returns groups of the block's students with near-identical answers,
+    largest first
+    """
+    rows = AnswerBucket.objects.filter(usage_key=usage_key).order_by(
+        'bucket',
+        'band',
+        'pk',
+    ).values_list('bucket', 'band', 'student_id')
+    buckets = []
+    for _, members in itertools.groupby(
+            rows.iterator(),
+            key=lambda row: row[:2],
+    ):
+        members = [row[2] for row in members]
+        if len(members) > 1:
+            buckets.append(members)
+    students = {student_id for members in buckets for student_id in members}
+    signatures = {
+        student_id: decode_signature(encoded)
+        for student_id, encoded in AnswerSignature.objects.filter(
+            usage_key=usage_key,
+        ).values_list('student_id', 'signature').iterator()
+        if student_id in students
+    }
+    return find_clusters(buckets, signatures, threshold)
@@ -0,0 +1,159 @@
+"""
+Grade answers by their TF-IDF cosine similarity to reference answers
+
+The vocabulary, inverse document frequencies and reference term counts
+are computed when the settings are saved. Answers are short, so they are
+graded with sparse vectors held in dicts, which only visit the words of
+the answer.
+"""
+from collections import Counter
+import math
+
+from .caching import LRUCache
+from .caching import content_hash
+from .caching import get_setting
+from .rules import tokenize
+
+
+ARTIFACT_VERSION = 1
+
+
+def compile_reference_answers(reference_answers):
+    """
+    Build the precomputed reference artifact persisted with the settings
+    """
+    documents = [
+        Counter(tokenize(str(answer)))
+        for answer in reference_answers or []
+        if str(answer).strip()
+    ]
+    documents = [document for document in documents if document]
+    frequencies = Counter()
+    for document in documents:
+        frequencies.update(document.keys())
+    vocabulary = sorted(frequencies)
+    index = {token: position for position, token in enumerate(vocabulary)}
+    count = len(documents)
+    artifact = {
+        'version': ARTIFACT_VERSION,
+        'source': content_hash(list(reference_answers or [])),
+        'vocabulary': vocabulary,
+        'idf': [
+            _idf(count, frequencies[token])
+            for token in vocabulary
+        ],
+        'oov_idf': _idf(count, 0),
+        'references': [
+            sorted(
+                [index[token], term_count]
+                for token, term_count in document.items()
+            )
+            for document in documents
+        ],
+    }
+    artifact['key'] = content_hash(
+        artifact['vocabulary'],
+        artifact['references'],
+    )
+    return artifact
+
+
+def is_artifact_current(artifact, reference_answers):
+    """
+    Determines if the artifact was compiled from the reference answers
+    """
+    if not artifact or artifact.get('version') != ARTIFACT_VERSION:
+        return False
+    return artifact.get('source') == content_hash(
+        list(reference_answers or [])
+    )
+
+
+def get_reference_model(artifact):
+    """
+    Returns the shared reference model for the artifact
+    """
+    return _model_cache.get_or_create(
+        artifact['key'],
+        lambda: ReferenceModel(artifact),
+    )
+
+
+def _idf(document_count, document_frequency):
+    """
+    Returns the smoothed inverse document frequency of a term
+    """
+    return math.log((1 + document_count) / (1 + document_frequency)) + 1
+
+
+def _term_frequency(count):
+    """
+    Returns the sublinear term frequency of a term count
+    """
+    return 1 + math.log(count)
+
+
+class ReferenceModel(object):
+    """
+    Reference answers as L2-normalized TF-IDF vectors held in dicts
+    """
+
+    def __init__(self, artifact):
+        self.index = {
+            token: position
+            for position, token in enumerate(artifact['vocabulary'])
+        }
+        self.idf = artifact['idf']
+        self.oov_idf = artifact['oov_idf']
+        self.references = []
+        for reference in artifact['references']:
+            vector = {
+                position: _term_frequency(count) * self.idf[position]
+                for position, count in reference
+            }
+            norm = math.sqrt(sum(weight ** 2 for weight in vector.values()))
+            self.references.append({
+                position: weight / norm
+                for position, weight in vector.items()
+            } if norm else {})
+
+    def similarity(self, answer):
+        """
+        Returns the highest cosine similarity between the answer
+        and a reference answer
+        """
+        if not self.references:
+            return 0.0
+        weights, unknown = _answer_weights(self, answer)
+        norm = math.sqrt(
+            sum(weight ** 2 for weight in weights.values()) + unknown
+        )
+        if not norm:
+            return 0.0
+        return max(
+            sum(
+                reference.get(position, 0.0) * weight
+                for position, weight in weights.items()
+            )
+            for reference in self.references
+        ) / norm
+
+
+def _answer_weights(model, answer):
+    """
+    Returns the TF-IDF weights of the answer's words by vocabulary
+    position, and the sum of the squared weights of the other words
+    """
+    weights = {}
+    # Words outside the reference vocabulary only lengthen the vector
+    unknown = 0.0
+    for token, count in Counter(tokenize(answer)).items():
+        position = model.index.get(token)
+        if position is None:
+            unknown += (_term_frequency(count) * model.oov_idf) ** 2
+        else:
+            weights[position] = _term_frequency(count) * model.idf[position]
+    return weights, unknown
+
+
+_model_cache = LRUCache(get_setting('REFERENCE_CACHE_SIZE', 256))
@@ -0,0 +1,226 @@
+"""
+Reduce English words to their stems with the Porter stemming algorithm
+
+Words sharing a stem, such as "connect", "connected" and "connection",
+are treated as one word; common words that carry no meaning, such as
+"the" and "of", can be left out.
+
+M.F. Porter, An algorithm for suffix stripping, Program 14(3), 1980
+"""
+import functools
+
+from .rules import tokenize
+
+
+# Negations change the meaning of a phrase, so they are not stop words
+STOP_WORDS = frozenset((
+    'a', 'about', 'above', 'after', 'again', 'against', 'all', 'am', 'an',
+    'and', 'any', 'are', 'as', 'at', 'be', 'because', 'been', 'before',
+    'being', 'below', 'between', 'both', 'but', 'by', 'can', 'did', 'do',
+    'does', 'doing', 'down', 'during', 'each', 'few', 'for', 'from',
+    'further', 'had', 'has', 'have', 'having', 'he', 'her', 'here',
+    'hers', 'herself', 'him', 'himself', 'his', 'how', 'i', 'if', 'in',
+    'into', 'is', 'it', 'its', 'itself', 'just', 'me', 'more', 'most',
+    'my', 'myself', 'now', 'of', 'off', 'on', 'once',
+    'only', 'or', 'other', 'our', 'ours', 'ourselves', 'out', 'over',
+    'own', 'same', 'she', 'should', 'so', 'some', 'such', 'than', 'that',
+    'the', 'their', 'theirs', 'them', 'themselves', 'then', 'there',
+    'these', 'they', 'this', 'those', 'through', 'to', 'too', 'under',
+    'until', 'up', 'very', 'was', 'we', 'were', 'what', 'when', 'where',
+    'which', 'while', 'who', 'whom', 'why', 'will', 'with', 'you', 'your',
+    'yours', 'yourself', 'yourselves',
+))
+_STEP2_SUFFIXES = {
+    'ational': 'ate', 'tional': 'tion', 'enci': 'ence', 'anci': 'ance',
+    'izer': 'ize', 'abli': 'able', 'alli': 'al', 'entli': 'ent',
+    'eli': 'e', 'ousli': 'ous', 'ization': 'ize', 'ation': 'ate',
+    'ator': 'ate', 'alism': 'al', 'iveness': 'ive', 'fulness': 'ful',
+    'ousness': 'ous', 'aliti': 'al', 'iviti': 'ive', 'biliti': 'ble',
+}
+_STEP3_SUFFIXES = {
+    'icate': 'ic', 'ative': '', 'alize': 'al', 'iciti': 'ic',
+    'ical': 'ic', 'ful': '', 'ness': '',
+}
+_STEP4_SUFFIXES = dict.fromkeys((
+    'al', 'ance', 'ence', 'er', 'ic', 'able', 'ible', 'ant', 'ement',
+    'ment', 'ent', 'ou', 'ism', 'ate', 'iti', 'ous', 'ive', 'ize',
+), '')
+
+
+def stem_words(text, keep_stop_words=False):
+    """
+    Returns the stems of the words of the text, leaving out stop words
+    unless keep_stop_words
+    """
+    return [
+        stem(word)
+        for word in tokenize(text)
+        if keep_stop_words or word not in STOP_WORDS
+    ]
+
+
+@functools.lru_cache(maxsize=65536)
+def stem(word):
+    """
+    Returns the stem of a lowercase word
+    """
+    if len(word) <= 2 or not word.isalpha():
+        return word
+    word = _step1a(word)
+    word = _step1b(word)
+    word = _step1c(word)
+    word = _replace_suffix(word, _STEP2_SUFFIXES, 0)
+    word = _replace_suffix(word, _STEP3_SUFFIXES, 0)
+    word = _step4(word)
+    word = _step5(word)
+    return word
+
+
+def _is_consonant(word, index):
+    """
+    Determines if the letter at index is a consonant; "y" is one
+    unless it follows a consonant
+    """
+    char = word[index]
+    if char in 'aeiou':
+        return False
+    if char == 'y':
+        return index == 0 or not _is_consonant(word, index - 1)
+    return True
+
+
+def _measure(stem_):
+    """
+    Returns the number of vowel-consonant sequences in the stem
+    """
+    measure = 0
+    after_vowel = False
+    for index in range(len(stem_)):
+        is_vowel = not _is_consonant(stem_, index)
+        if after_vowel and not is_vowel:
+            measure += 1
+        after_vowel = is_vowel
+    return measure
+
+
+def _has_vowel(stem_):
+    """
+    Determines if the stem contains a vowel
+    """
+    return any(
+        not _is_consonant(stem_, index)
+        for index in range(len(stem_))
+    )
+
+
+def _ends_double_consonant(word):
+    """
+    Determines if the word ends with a doubled consonant
+    """
+    return (
+        len(word) >= 2 and
+        word[-1] == word[-2] and
+        _is_consonant(word, len(word) - 1)
+    )
+
+
+def _ends_cvc(word):
+    """
+    Determines if the word ends with consonant-vowel-consonant,
+    the last consonant not being "w", "x" or "y"
+    """
+    return (
+        len(word) >= 3 and
+        _is_consonant(word, len(word) - 3) and
+        not _is_consonant(word, len(word) - 2) and
+        _is_consonant(word, len(word) - 1) and
+        word[-1] not in 'wxy'
+    )
+
+
+def _replace_suffix(word, suffixes, min_measure):
+    """
+    Replaces the longest of the suffixes ending the word, if what
+    precedes it has more than min_measure vowel-consonant sequences
+    """
+    for length in range(min(len(word), 7), 0, -1):
+        suffix = word[-length:]
+        if suffix in suffixes:
+            stem_ = word[:-length]
+            if _measure(stem_) > min_measure:
+                return stem_ + suffixes[suffix]
+            return word
+    return word
+
+
+def _step1a(word):
+    """
+    Removes plurals
+    """
+    if word.endswith('sses') or word.endswith('ies'):
+        return word[:-2]
+    if word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def _step1b(word):
+    """
+    Removes -ed and -ing
+    """
+    if word.endswith('eed'):
+        if _measure(word[:-3]) > 0:
+            word = word[:-1]
+        return word
+    for suffix in ('ed', 'ing'):
+        if word.endswith(suffix) and _has_vowel(word[:-len(suffix)]):
+            return _tidy_step1b(word[:-len(suffix)])
+    return word
+
+
+def _tidy_step1b(word):
+    """
+    Restores the "e" or undoubles the consonant that the removed
+    suffix leaves out of place
+    """
+    if word.endswith(('at', 'bl', 'iz')):
+        return word + 'e'
+    if _ends_double_consonant(word) and word[-1] not in 'lsz':
+        return word[:-1]
+    if _measure(word) == 1 and _ends_cvc(word):
+        return word + 'e'
+    return word
+
+
+def _step1c(word):
+    """
+    Turns a final "y" into "i" when the rest of the word has a vowel
+    """
+    if word.endswith('y') and _has_vowel(word[:-1]):
+        return word[:-1] + 'i'
+    return word
+
+
+def _step4(word):
+    """
+    Removes the remaining suffixes from long stems
+    """
+    if word.endswith('ion'):
+        stem_ = word[:-3]
+        if _measure(stem_) > 1 and stem_.endswith(('s', 't')):
+            return stem_
+        return word
+    return _replace_suffix(word, _STEP4_SUFFIXES, 1)
+
+
+def _step5(word):
+    """
+    Removes a final "e" and undoubles a final "ll" on long stems
+    """
+    if word.endswith('e'):
+        measure = _measure(word[:-1])
+        if measure > 1 or (measure == 1 and not _ends_cvc(word[:-1])):
+            word = word[:-1]
+    if _measure(word) > 1 and word.endswith('ll'):
+        word = word[:-1]
+    return word
@@ -0,0 +1,287 @@
+"""
+In-process load test for the FreeTextResponse handlers
+
+Simulated learners work through a number of blocks on the XBlock SDK
+WorkbenchRuntime, so no LMS or other service is needed::
+
+    python -m freetextresponse.tests.loadtest --learners 200 --blocks 4
+
+Every learner renders each block, saves a draft and submits an answer,
+with a fresh block instance for every request, as the LMS does.
+
+With thread workers all requests share one key store, so learners of
+the same block race on the shared response pool (`displayable_answers`)
+and the report shows how many pool writes were lost. Process workers
+each own a shard of the blocks with its own key store, like separate
+LMS processes with separate caches; they measure CPU-bound throughput.
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+import math
+import os
+import random
+import sys
+import time
+
+
+OPERATIONS = ('student_view', 'save_reponse', 'submit')
+ANSWERS = (
+    'Photosynthesis turns light into chemical energy',
+    'Plants use photosynthesis to make sugar from sunlight',
+    'Plants make food from sunlight',
+    'I do not know',
+)
+BLOCK_SETTINGS = {
+    'display_other_student_responses': True,
+    'fullcredit_keyphrases': ['photosynthesis'],
+    'halfcredit_keyphrases': ['sunlight'],
+    'max_attempts': 0,
+    'min_word_count': 1,
+}
+
+
+def run(learners=100, blocks=4, workers=4, pool='thread', seed=0):
+    """
+    Runs the load test and returns its report
+    """
+    _setup_django()
+    started = time.perf_counter()
+    if pool == 'process':
+        shards = [
+            (list(range(blocks))[shard::workers], learners, 1, seed)
+            for shard in range(min(workers, blocks))
+        ]
+        with ProcessPoolExecutor(len(shards)) as executor:
+            results = list(executor.map(_run_shard, *zip(*shards)))
+    else:
+        results = [_run_shard(list(range(blocks)), learners, workers, seed)]
+    elapsed = time.perf_counter() - started
+    return _merge_results(results, elapsed, pool, workers)
+
+
+def format_report(report):
+    """
+    Formats a report as text
+    """
+    lines = [
+        f"{report['requests']} requests in {report['elapsed']:.2f}s "
+        f"with {report['workers']} {report['pool']} workers: "
+        f"{report['throughput']:.1f} requests/s",
+        f"{'operation':<14}{'count':>8}{'errors':>8}"
+        f"{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}",
+    ]
+    for operation in OPERATIONS:
+        stats = report['operations'][operation]
+        lines.append(
+            f"{operation:<14}{stats['count']:>8}{stats['errors']:>8}"
+            f"{stats['p50']:>10.2f}{stats['p90']:>10.2f}"
+            f"{stats['p99']:>10.2f}{stats['max']:>10.2f}"
+        )
+    contention = report['displayable_answers']
+    lines.append(
+        f"displayable_answers: {contention['expected']} expected entries, "
+        f"{contention['entries']} stored, {contention['lost']} lost writes"
+    )
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    """
+    Runs the load test from the command line
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--learners', type=int, default=100)
+    parser.add_argument('--blocks', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument(
+        '--pool',
+        choices=('thread', 'process'),
+        default='thread',
+    )
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    report = run(
+        learners=args.learners,
+        blocks=args.blocks,
+        workers=args.workers,
+        pool=args.pool,
+        seed=args.seed,
+    )
+    print(format_report(report))
+
+
+def _setup_django():
+    """
+    Configures Django, which the workbench runtime needs
+    """
+    # pylint: disable=import-outside-toplevel
+    import django
+    os.environ.setdefault(
+        'DJANGO_SETTINGS_MODULE',
+        'freetextresponse.settings',
+    )
+    django.setup()
+
+
+def _run_shard(block_numbers, learners, workers, seed):
+    """
+    Runs every learner session against the blocks sharing one key store,
+    and returns the raw latencies and pool statistics
+    """
+    _setup_django()
+    shard = _Shard(len(block_numbers), seed)
+    with ThreadPoolExecutor(workers) as executor:
+        sessions = list(executor.map(shard.session, range(learners)))
+    expected, entries = shard.count_pool_entries(learners)
+    return {
+        'timings': [timing for timings in sessions for timing in timings],
+        'expected': expected,
+        'entries': entries,
+    }
+
+
+class _Shard(object):
+    """
+    Blocks sharing one key store, and the learners working on them
+    """
+
+    def __init__(self, blocks, seed):
+        # pylint: disable=import-outside-toplevel
+        from workbench.runtime import WorkbenchRuntime
+        from xblock.runtime import DictKeyValueStore
+
+        self.key_store = DictKeyValueStore()
+        self.seed = seed
+        id_generator = WorkbenchRuntime().id_generator
+        self.usages = []
+        for _ in range(blocks):
+            def_id = id_generator.create_definition('freetextresponse')
+            self.usages.append((def_id, id_generator.create_usage(def_id)))
+
+    def make_block(self, learner, usage):
+        """
+        Creates the block instance of one request
+        """
+        # pylint: disable=import-outside-toplevel
+        from xblock.fields import ScopeIds
+        from freetextresponse.xblocks import FreeTextResponse
+        from .tests_utils import make_xblock
+
+        return make_xblock(
+            'freetextresponse',
+            FreeTextResponse,
+            BLOCK_SETTINGS,
+            key_store=self.key_store,
+            scope_ids=ScopeIds(
+                f'learner-{learner}', 'freetextresponse', *usage
+            ),
+        )
+
+    def session(self, learner):
+        """
+        Works through every block as one learner,
+        returning (operation, latency, status) timings
+        """
+        # pylint: disable=import-outside-toplevel
+        from .tests_utils import make_request
+
+        randomizer = random.Random(self.seed * 1000003 + learner)
+        timings = []
+        for usage in randomizer.sample(self.usages, len(self.usages)):
+            data = {
+                'student_answer': randomizer.choice(ANSWERS),
+                'can_record_response': True,
+            }
+            for operation in OPERATIONS:
+                block = self.make_block(learner, usage)
+                started = time.perf_counter()
+                if operation == 'student_view':
+                    block.student_view()
+                    status = 200
+                else:
+                    # Like Runtime.handle, without the workbench patches
+                    # that put the block past due
+                    response = getattr(block, operation)(make_request(data))
+                    block.save()
+                    status = response.status_code  # pylint: disable=no-member
+                timings.append(
+                    (operation, time.perf_counter() - started, status)
+                )
+        return timings
+
+    def count_pool_entries(self, learners):
+        """
+        Returns the number of response pool entries expected from the
+        learners' final scores, and the number stored
+        """
+        # pylint: disable=import-outside-toplevel
+        from freetextresponse.models import Credit
+        from freetextresponse.models import MAX_RESPONSE_POOL
+
+        expected = entries = 0
+        for usage in self.usages:
+            credited = sum(
+                self.make_block(learner, usage).score == Credit.full.value
+                for learner in range(learners)
+            )
+            expected += min(credited, MAX_RESPONSE_POOL + 1)
+            entries += len(self.make_block(None, usage).displayable_answers)
+        return expected, entries
+
+
+def _merge_results(results, elapsed, pool, workers):
+    """
+    Combines the raw results of the shards into a report
+    """
+    operations = {}
+    for operation in OPERATIONS:
+        latencies = sorted(
+            latency * 1000
+            for result in results
+            for name, latency, _ in result['timings']
+            if name == operation
+        )
+        operations[operation] = {
+            'count': len(latencies),
+            'errors': sum(
+                status >= 400
+                for result in results
+                for name, _, status in result['timings']
+                if name == operation
+            ),
+            'p50': _percentile(latencies, 50),
+            'p90': _percentile(latencies, 90),
+            'p99': _percentile(latencies, 99),
+            'max': latencies[-1] if latencies else 0.0,
+        }
+    requests = sum(stats['count'] for stats in operations.values())
+    expected = sum(result['expected'] for result in results)
+    entries = sum(result['entries'] for result in results)
+    return {
+        'pool': pool,
+        'workers': workers,
+        'elapsed': elapsed,
+        'requests': requests,
+        'throughput': requests / elapsed if elapsed else 0.0,
+        'operations': operations,
+        'displayable_answers': {
+            'expected': expected,
+            'entries': entries,
+            'lost': max(expected - entries, 0),
+        },
+    }
+
+
+def _percentile(values, percent):
+    """
+    Returns the nearest-rank percentile of sorted values
+    """
+    if not values:
+        return 0.0
+    rank = math.ceil(percent / 100 * len(values))
+    return values[max(rank, 1) - 1]
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
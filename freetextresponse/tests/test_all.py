@@ -11,8 +11,18 @@ from mock import MagicMock
 from xblock.validation import ValidationMessage
 from django.db import IntegrityError
 
+from freetextresponse.caching import LRUCache
+from freetextresponse.keyphrases import KEYPHRASE_WARNING_THRESHOLD
+from freetextresponse.keyphrases import MAX_KEYPHRASES
+from freetextresponse.keyphrases import compile_keyphrases
+from freetextresponse.keyphrases import KeyphraseMatcher
+from freetextresponse.keyphrases import compile_credit_tiers
+from freetextresponse.keyphrases import get_matcher
+from freetextresponse.keyphrases import matcher_cache_info
+from freetextresponse.keyphrases import prune_covered_keyphrases
 from freetextresponse.models import Credit
-from freetextresponse.views import _is_at_least_one_phrase_present  # noqa
+from freetextresponse.similarity import ReferenceModel
+from freetextresponse.similarity import compile_reference_answers
 from freetextresponse.xblocks import FreeTextResponse
 
 from .tests_utils import make_xblock
@@ -30,6 +40,15 @@ class TestData(object):
     max_word_count = 0
     min_word_count = 0
     submitted_message = None
+    fullcredit_keyphrases = []
+    halfcredit_keyphrases = []
+    fullcredit_rule = ''
+    halfcredit_rule = ''
+    credit_tiers = []
+    phrase_weights = {}
+    grading_mode = 'keyphrases'
+    fullcredit_similarity = 0.8
+    halfcredit_similarity = 0.5
 
 
 class TestRequest(object):
@@ -107,6 +126,136 @@ class FreetextResponseXblockTestCase(unittest.TestCase):
             validation_list[0].text,
         )
 
+    def test_validate_field_data_too_many_keyphrases(self):
+        # pylint: disable=invalid-name
+        """
+        Checks that validate_field_data refuses oversized keyphrase lists
+        """
+        test_data = TestData()
+        test_data.max_word_count = 1
+        test_data.min_word_count = 1
+        test_data.submitted_message = 's'
+        test_data.halfcredit_keyphrases = [
+            str(index) for index in range(MAX_KEYPHRASES + 1)
+        ]
+        validation = set()
+        self.xblock.validate_field_data(validation, test_data)
+        self.assertEqual(
+            [
+                'Half-Credit Key Phrases cannot have more than '
+                f'{MAX_KEYPHRASES} entries'
+            ],
+            [message.text for message in validation],
+        )
+
+    def test_validate_warns_about_large_keyphrase_sets(self):
+        # pylint: disable=invalid-name
+        """
+        Checks that Studio validation warns about very large
+        keyphrase sets without blocking the save
+        """
+        self.assertTrue(self.xblock.validate().empty)
+        self.xblock.fullcredit_keyphrases = [
+            f'phrase {index}x'
+            for index in range(KEYPHRASE_WARNING_THRESHOLD + 1)
+        ]
+        messages = self.xblock.validate().messages
+        self.assertEqual(1, len(messages))
+        self.assertEqual(ValidationMessage.WARNING, messages[0].type)
+
+    def test_compile_keyphrases(self):
+        """
+        Checks that compiled keyphrases are normalized, deduplicated
+        and pruned of phrases covered by another phrase of their tier
+        """
+        artifact = compile_keyphrases(
+            ['Cell Wall', ' cell wall ', '', 'the cell wall', 'nucleus'],
+            ['wall', 'cell', 'cell wall'],
+        )
+        self.assertEqual(['cell wall', 'nucleus'], artifact['full'])
+        self.assertEqual(['wall', 'cell'], artifact['half'])
+
+    def test_prune_covered_keyphrases(self):
+        """
+        Checks that phrases containing another phrase are dropped,
+        wherever in them it appears
+        """
+        self.assertEqual(
+            ['ab', 'ca', 'bcd', 'ab', 'zcdz'],
+            prune_covered_keyphrases(
+                ['xabx', 'ab', 'ca', 'bcd', 'bca', 'ab', 'zcdz'],
+            ),
+        )
+        phrases = [f'{index:04d} ' + 'word ' * 30 for index in range(2000)]
+        self.assertEqual(phrases, prune_covered_keyphrases(phrases))
+
+    def test_clean_studio_edits(self):
+        """
+        Checks that saving in Studio cleans the keyphrase lists
+        and stores the precompiled matcher
+        """
+        data = {
+            'fullcredit_keyphrases': ['Mitosis', ' Mitosis', '', 'mitosis'],
+        }
+        self.xblock.clean_studio_edits(data)
+        self.assertEqual(
+            ['Mitosis', 'mitosis'],
+            data['fullcredit_keyphrases'],
+        )
+        self.assertEqual(['mitosis'], data['keyphrase_matcher']['full'])
+        self.assertEqual([], data['keyphrase_matcher']['half'])
+
+    def test_determine_credit_uses_compiled_keyphrases(self):
+        # pylint: disable=invalid-name, protected-access
+        """
+        Checks that grading uses the matcher compiled on save,
+        and ignores it once the keyphrases have changed
+        """
+        self.xblock.fullcredit_keyphrases = ['mitosis']
+        self.xblock.student_answer = 'Meiosis'
+        self.assertEqual(Credit.zero, self.xblock._determine_credit())
+        artifact = compile_keyphrases(['meiosis'], [])
+        artifact['source'] = compile_keyphrases(['mitosis'], [])['source']
+        self.xblock.keyphrase_matcher = artifact
+        self.assertEqual(Credit.full, self.xblock._determine_credit())
+        self.xblock.fullcredit_keyphrases = ['mitosis', 'anaphase']
+        self.assertEqual(Credit.zero, self.xblock._determine_credit())
+
+    def test_matcher_cache_shared_between_blocks(self):
+        # pylint: disable=invalid-name
+        """
+        Checks that blocks with identical normalized keyphrases
+        share one cached matcher
+        """
+        first = get_matcher(compile_keyphrases(['Osmosis'], ['water']))
+        before = matcher_cache_info()
+        second = get_matcher(compile_keyphrases([' osmosis'], ['Water']))
+        after = matcher_cache_info()
+        self.assertIs(first, second)
+        self.assertEqual(before['hits'] + 1, after['hits'])
+        self.assertEqual(before['misses'], after['misses'])
+
+    def test_lru_cache_eviction(self):
+        """
+        Checks that the LRU cache evicts the least recently used entry
+        """
+        cache = LRUCache(2)
+        cache.get_or_create('a', lambda: 1)
+        cache.get_or_create('b', lambda: 2)
+        cache.get_or_create('a', lambda: 0)
+        cache.get_or_create('c', lambda: 3)
+        self.assertEqual(2, cache.get_or_create('b', lambda: 2))
+        self.assertEqual(
+            {
+                'hits': 1,
+                'misses': 4,
+                'evictions': 2,
+                'currsize': 2,
+                'maxsize': 2,
+            },
+            cache.info(),
+        )
+
     def test_initialization_variables(self):
         """
         Checks that instance variables are initialized correctly
@@ -156,6 +305,28 @@ class FreetextResponseXblockTestCase(unittest.TestCase):
             student_view_html
         )
 
+    def test_student_view_word_count_limits(self):
+        """
+        Checks that the student view passes the word count limits
+        and messages that view.js checks answers against
+        """
+        self.xblock.min_word_count = 2
+        self.xblock.max_word_count = 5
+        student_view_html = self.xblock.student_view().content
+        self.assertIn('data-min-word-count="2"', student_view_html)
+        self.assertIn('data-max-word-count="5"', student_view_html)
+        self.assertIn(
+            'data-invalid-word-count="Invalid Word Count. '
+            'Your response must be between 2 and 5 words."',
+            student_view_html,
+        )
+        self.assertIn(
+            f'data-saved-message="{self.xblock.saved_message}"'.replace(
+                '"Submit"', '&quot;Submit&quot;',
+            ),
+            student_view_html,
+        )
+
     def test_build_fragment_prompt_html(self):
         """
         Checks that build_fragment allows html in the prompt variable
@@ -229,6 +400,176 @@ class FreetextResponseXblockTestCase(unittest.TestCase):
         credit = Credit[test_data['credit']]
         self.assertEqual(credit, self.xblock._determine_credit())
 
+    @ddt.file_data(path.join(tests_dir, 'rule_credit.json'))
+    def test_determine_rule_credit(self, **test_data):
+        # pylint: disable=protected-access
+        """
+        Tests determine_credit when grading by rules
+        """
+        self.xblock.grading_mode = 'rules'
+        self.xblock.fullcredit_keyphrases = ['not', 'used']
+        self.xblock.fullcredit_rule = test_data['fullcredit_rule']
+        self.xblock.halfcredit_rule = test_data['halfcredit_rule']
+        self.xblock.student_answer = test_data['student_answer']
+        credit = Credit[test_data['credit']]
+        self.assertEqual(credit, self.xblock._determine_credit())
+
+    @ddt.data(
+        ('light AND', 'Unexpected end of rule'),
+        ('(light', 'Expected ")"'),
+        ('NEAR(a, b, c)', 'NEAR distance must be a number'),
+        ('/(/', 'Invalid regular expression /(/'),
+    )
+    @ddt.unpack
+    def test_validate_field_data_invalid_rule(self, rule, error):
+        # pylint: disable=invalid-name
+        """
+        Checks that validate_field_data refuses rules that do not compile
+        """
+        test_data = TestData()
+        test_data.max_word_count = 1
+        test_data.min_word_count = 1
+        test_data.submitted_message = 's'
+        test_data.fullcredit_rule = rule
+        validation = set()
+        self.xblock.validate_field_data(validation, test_data)
+        self.assertEqual(
+            [f'Full-Credit Rule is invalid: {error}'],
+            [message.text for message in validation],
+        )
+
+    @ddt.file_data(path.join(tests_dir, 'phrase_credit.json'))
+    def test_determine_phrase_credit(self, **test_data):
+        # pylint: disable=protected-access
+        """
+        Tests determine_credit when grading by credit tiers
+        or weighted phrases
+        """
+        self.xblock.grading_mode = test_data['grading_mode']
+        self.xblock.credit_tiers = test_data['credit_tiers']
+        self.xblock.phrase_weights = test_data['phrase_weights']
+        self.xblock.student_answer = test_data['student_answer']
+        self.assertEqual(
+            test_data['value'],
+            self.xblock._determine_credit().value,
+        )
+
+    def test_matcher_agrees_with_substring_search(self):
+        # pylint: disable=invalid-name
+        """
+        Checks the single-pass matcher against a naive search of
+        every phrase, on phrases that overlap and prefix each other
+        """
+        phrases = ['a', 'ab', 'abc', 'bc', 'cab', 'ca', 'b c', 'c.']
+        tiers = [
+            {'credit': (index + 1) / 10, 'phrases': [phrase]}
+            for index, phrase in enumerate(phrases)
+        ]
+        matcher = KeyphraseMatcher(compile_credit_tiers(tiers))
+        for answer in ['abc', 'cab', 'xbc', 'b c.', 'c', 'ca', 'zzz', '']:
+            present = [
+                tier['credit']
+                for tier in tiers
+                if tier['phrases'][0] in answer
+            ]
+            self.assertEqual(
+                max(present, default=0.0),
+                matcher.best_value(answer),
+            )
+            self.assertAlmostEqual(
+                sum(present),
+                matcher.total_value(answer),
+            )
+
+    @ddt.data(
+        ({'credit_tiers': {}}, 'Credit Tiers must be a list of tiers'),
+        (
+            {'credit_tiers': [{'credit': '1', 'phrases': []}]},
+            'Each Credit Tier must have a numeric "credit" '
+            'and a list of "phrases"',
+        ),
+        (
+            {'credit_tiers': [{'credit': 1.5, 'phrases': []}]},
+            'Credit Tier credit must be greater than 0 and at most 1',
+        ),
+        ({'phrase_weights': []}, 'Phrase Weights must map phrases to weights'),
+        ({'phrase_weights': {'a': 'b'}}, 'Phrase Weights must be numbers'),
+        (
+            {'phrase_weights': {'a': 2}},
+            'Phrase Weights must be between -1 and 1',
+        ),
+    )
+    @ddt.unpack
+    def test_validate_field_data_phrase_settings(self, settings, error):
+        # pylint: disable=invalid-name
+        """
+        Checks that validate_field_data refuses malformed credit tiers
+        and phrase weights
+        """
+        test_data = TestData()
+        test_data.max_word_count = 1
+        test_data.min_word_count = 1
+        test_data.submitted_message = 's'
+        for key, value in settings.items():
+            setattr(test_data, key, value)
+        validation = set()
+        self.xblock.validate_field_data(validation, test_data)
+        self.assertEqual(
+            [error],
+            [message.text for message in validation],
+        )
+
+    @ddt.data(
+        ('Plants turn light into chemical energy', Credit.full),
+        ('Plants use light to make energy', Credit.half),
+        ('The mitochondria is the powerhouse of the cell', Credit.zero),
+    )
+    @ddt.unpack
+    def test_determine_similarity_credit(self, student_answer, credit):
+        # pylint: disable=protected-access
+        """
+        Tests determine_credit when grading by similarity
+        to reference answers
+        """
+        self.xblock.grading_mode = 'similarity'
+        self.xblock.fullcredit_similarity = 0.8
+        self.xblock.halfcredit_similarity = 0.3
+        self.xblock.reference_answers = [
+            'Plants turn light into chemical energy',
+            'Photosynthesis stores the energy of sunlight in sugar',
+        ]
+        self.xblock.student_answer = student_answer
+        self.assertEqual(credit, self.xblock._determine_credit())
+
+    def test_reference_model_similarity(self):
+        """
+        Checks the cosine similarity bounds of the reference model
+        """
+        model = ReferenceModel(compile_reference_answers([
+            'the cell wall is rigid',
+            '',
+            'membranes are flexible',
+        ]))
+        self.assertAlmostEqual(
+            1.0,
+            model.similarity('The cell wall is RIGID.'),
+        )
+        self.assertEqual(0.0, model.similarity('unrelated words only'))
+        self.assertEqual(0.0, model.similarity(''))
+        self.assertTrue(0 < model.similarity('a rigid wall of bricks') < 1)
+
+    def test_clean_studio_edits_reference_answers(self):
+        # pylint: disable=invalid-name
+        """
+        Checks that saving in Studio precomputes the reference vectors
+        """
+        data = {'reference_answers': ['Cells divide', 'cells grow']}
+        self.xblock.clean_studio_edits(data)
+        artifact = data['reference_vectors']
+        self.assertEqual(['cells', 'divide', 'grow'], artifact['vocabulary'])
+        self.assertEqual([[[0, 1], [1, 1]], [[0, 1], [2, 1]]],
+                         artifact['references'])
+
     @ddt.data(Credit.zero, Credit.half, Credit.full)
     def test_compute_score(self, credit):
         # pylint: disable=protected-access
@@ -264,50 +605,6 @@ class FreetextResponseXblockTestCase(unittest.TestCase):
         self.xblock._determine_credit = MagicMock(return_value=Credit.zero)
         self.xblock._compute_score()
 
-    def test_is_at_least_one_phrase_present(self):
-        # pylint: disable=invalid-name, protected-access
-        """
-        Tests _is_at_least_one_phrase_present
-        Helper method to match student response
-        with given phrase list
-        """
-        keyphrases_list = [
-            'do dict phrase',
-            're dict phrase',
-            'mi dict phrase',
-            'fa dict phrase'
-        ]
-        answer = keyphrases_list[1]
-        answer = 'ajhsdfhjaefhaf ' + answer + 'jkfbaufebn;  fuqv'
-        self.assertTrue(
-            _is_at_least_one_phrase_present(
-                keyphrases_list,
-                answer,
-            ),
-        )
-
-    def test_not_is_at_least_one_phrase_present(self):
-        # pylint: disable=invalid-name, protected-access
-        """
-        Tests _is_at_least_one_phrase_present
-        Helper method to match student response
-        with given phrase list
-        """
-        keyphrases_list = [
-            'do dict phrase',
-            're dict phrase',
-            'mi dict phrase',
-            'fa dict phrase'
-        ]
-        answer = 'so dict phrase'
-        answer = 'ajhsdfhjaefhaf ' + answer + 'jkfbaufebn;  fuqv'
-        self.assertFalse(
-            _is_at_least_one_phrase_present(
-                keyphrases_list,
-                answer,
-            ),
-        )
-
     @ddt.file_data(path.join(tests_dir, 'word_count_valid.json'))
     def test_word_count_valid(self, **test_data):
         # pylint: disable=protected-access
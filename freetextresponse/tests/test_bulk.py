@@ -0,0 +1,263 @@
+"""
+Tests for the staff bulk operations
+"""
+from django.test import TestCase
+from django.test import override_settings
+from mock import patch
+from xblock.exceptions import JsonHandlerError
+
+from freetextresponse.records import LearnerRecord
+from freetextresponse.records import StaffOperation
+from freetextresponse.xblocks import FreeTextResponse
+
+from .tests_utils import LearnerBlocksMixin
+from .tests_utils import make_request
+
+
+@override_settings(FREETEXTRESPONSE_STAFF_TOOLS=True)
+class BulkOperationTestCase(LearnerBlocksMixin, TestCase):
+    """
+    Tests for resetting answers and granting attempts in bulk
+    """
+
+    xblock_cls = FreeTextResponse
+    attributes = {'max_attempts': 2, 'fullcredit_keyphrases': ['light']}
+
+    def setUp(self):
+        """
+        Creates a block on which four learners submitted answers
+        """
+        self.create_usage()
+        for learner, answers in (
+                (1, ['dark', 'light']),
+                (2, ['dark', 'dark']),
+                (3, ['light']),
+                (4, ['dark']),
+        ):
+            for answer in answers:
+                self.submit(learner, answer)
+
+    def run_operation(self, data, xblock=None):
+        """
+        Runs a chunk of a bulk operation as staff; returns the block
+        and the progress of the operation
+        """
+        # pylint: disable=no-member
+        xblock = xblock or self.make_block('staff', staff=True)
+        response = xblock.bulk_operation(make_request(data))
+        return xblock, response.json['operation']
+
+    def get_grades(self, xblock):
+        """
+        Returns the user ids and values of the grades the block published
+        """
+        return [
+            (call[0][2].get('user_id'), call[0][2]['value'])
+            for call in xblock.runtime.publish.call_args_list
+            if call[0][1] == 'grade'
+        ]
+
+    def test_staff_only(self):
+        """
+        Checks that learners cannot run bulk operations, and that
+        they need the staff tools
+        """
+        # pylint: disable=no-member
+        request = {'action': 'reset', 'learners': ['2']}
+        response = self.make_block(1).bulk_operation(make_request(request))
+        self.assertEqual(403, response.status_code)
+        with override_settings(FREETEXTRESPONSE_STAFF_TOOLS=False):
+            response = self.make_block('staff', staff=True).bulk_operation(
+                make_request(request),
+            )
+        self.assertEqual(404, response.status_code)
+
+    def test_invalid_operations(self):
+        """
+        Checks that malformed operations are rejected
+        """
+        # pylint: disable=no-member
+        for data in (
+                {'action': 'delete', 'learners': ['1']},
+                {'action': 'grant', 'attempts': 0, 'learners': ['1']},
+                {'action': 'reset'},
+        ):
+            xblock = self.make_block('staff', staff=True)
+            response = xblock.bulk_operation(make_request(data))
+            self.assertEqual(400, response.status_code)
+
+    def test_reset_zero_credit(self):
+        """
+        Checks that resetting the learners without credit publishes
+        their grades once and resets their state when they return
+        """
+        xblock, operation = self.run_operation({
+            'action': 'reset',
+            'filter': 'zero_credit',
+        })
+        self.assertEqual(2, operation['total'])
+        self.assertTrue(operation['done'])
+        self.assertEqual([(2, 0.0), (4, 0.0)], self.get_grades(xblock))
+        learner = self.make_block(2)
+        learner.student_view()
+        self.assertEqual('', learner.student_answer)
+        self.assertEqual(0, learner.count_attempts)
+        self.assertEqual([], self.get_grades(learner))
+        untouched = self.make_block(1)
+        untouched.student_view()
+        self.assertEqual('light', untouched.student_answer)
+
+    def test_grant_max_attempts(self):
+        """
+        Checks that granting attempts to the learners who used them up
+        lets them submit again
+        """
+        xblock, operation = self.run_operation({
+            'action': 'grant',
+            'attempts': 1,
+            'filter': 'max_attempts',
+        })
+        self.assertEqual(2, operation['total'])
+        self.assertEqual([], self.get_grades(xblock))
+        learner = self.submit(2, 'light')
+        self.assertEqual(2, learner.count_attempts)
+        self.assertEqual(1.0, learner.score)
+        record = LearnerRecord.objects.get(
+            usage_key=str(self.usage.usage_id),
+            student_id='2',
+        )
+        self.assertEqual(
+            (2, 2, 1.0),
+            (record.user_id, record.attempts, record.score),
+        )
+        # Applied once, however often the learner returns
+        for _ in range(2):
+            learner = self.make_block(2)
+            learner.student_view()
+            learner.save()
+            self.assertEqual(2, learner.count_attempts)
+        self.assertEqual([], learner.applied_staff_changes)
+
+    def test_one_chunk_per_request(self):
+        """
+        Checks that each request processes one chunk of learners
+        """
+        with patch('freetextresponse.bulk.BULK_CHUNK_SIZE', 2):
+            _, operation = self.run_operation({
+                'action': 'grant',
+                'attempts': 1,
+                'learners': ['1', '2', '3'],
+            })
+            self.assertEqual((2, False), (
+                operation['processed'],
+                operation['done'],
+            ))
+            for _ in range(2):
+                _, operation = self.run_operation({
+                    'operation_id': operation['id'],
+                })
+                self.assertEqual((3, True), (
+                    operation['processed'],
+                    operation['done'],
+                ))
+
+    def test_unprocessed_changes_wait(self):
+        """
+        Checks that learners apply a change only once staff processed
+        it, and that repeated learners are targeted once
+        """
+        with patch('freetextresponse.bulk.BULK_CHUNK_SIZE', 1):
+            _, operation = self.run_operation({
+                'action': 'reset',
+                'learners': ['1', '3', '1'],
+            })
+            self.assertEqual((2, 1), (
+                operation['total'],
+                operation['processed'],
+            ))
+            waiting = self.make_block(3)
+            waiting.student_view()
+            self.assertEqual('light', waiting.student_answer)
+            self.run_operation({'operation_id': operation['id']})
+        reset = self.make_block(3)
+        reset.student_view()
+        self.assertEqual('', reset.student_answer)
+
+    def test_resume(self):
+        """
+        Checks that a chunk interrupted while publishing grades is not
+        processed again, and that learners whose grade was not published
+        publish it themselves
+        """
+        xblock = self.make_block('staff', staff=True)
+        xblock.runtime.publish.side_effect = [None, RuntimeError]
+        with patch('freetextresponse.bulk.BULK_CHUNK_SIZE', 2):
+            with self.assertRaises(RuntimeError):
+                self.run_operation({
+                    'action': 'reset',
+                    'learners': ['1', '2', '3'],
+                }, xblock)
+            xblock = self.make_block('staff', staff=True)
+            operation = self.get_operations()[0]
+            self.assertEqual(2, operation.processed)
+            for _ in range(2):
+                _, progress = self.run_operation({
+                    'operation_id': operation.operation_id,
+                }, xblock)
+        self.assertEqual(3, progress['processed'])
+        self.assertEqual([(3, 0.0)], self.get_grades(xblock))
+        for learner in (1, 2):
+            block = self.make_block(learner)
+            block.student_view()
+            self.assertEqual(0, block.count_attempts)
+            self.assertEqual([(None, 0.0)], self.get_grades(block))
+
+    def test_concurrent_submit(self):
+        """
+        Checks that a learner submitting while staff reset another
+        learner does not lose the other learner's change
+        """
+        bob = self.make_block(2)
+        self.run_operation({'action': 'reset', 'learners': ['1']})
+        bob.submit(make_request({'student_answer': 'light'}))
+        bob.save()
+        alice = self.make_block(1)
+        alice.student_view()
+        self.assertEqual(('', 0), (alice.student_answer, alice.count_attempts))
+
+    def test_learner_without_record(self):
+        """
+        Checks that a learner who has no record publishes their grade
+        when they apply a reset
+        """
+        learner = self.make_block(5)
+        learner.student_answer = 'light'
+        learner.count_attempts = 1
+        learner.score = 1.0
+        learner.save()
+        xblock, _ = self.run_operation({
+            'action': 'reset',
+            'learners': ['5'],
+        })
+        self.assertEqual([], self.get_grades(xblock))
+        learner = self.make_block(5)
+        learner.student_view()
+        self.assertEqual(0, learner.count_attempts)
+        self.assertEqual([(None, 0.0)], self.get_grades(learner))
+
+    def test_unknown_operation(self):
+        """
+        Checks that resuming an unknown operation fails
+        """
+        xblock = self.make_block('staff', staff=True)
+        with self.assertRaises(JsonHandlerError):
+            # pylint: disable=protected-access
+            xblock._get_staff_operation('missing')
+
+    def get_operations(self):
+        """
+        Returns the operations of the block
+        """
+        return list(StaffOperation.objects.filter(
+            usage_key=str(self.usage.usage_id),
+        ))
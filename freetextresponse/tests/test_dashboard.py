@@ -0,0 +1,198 @@
+"""
+Tests for the staff dashboard
+"""
+import collections
+
+import ddt
+from django.test import TestCase
+from django.test import override_settings
+
+from freetextresponse.dashboard import FILTER_FIELDS
+from freetextresponse.dashboard import get_word_count_range
+from freetextresponse.records import LearnerRecord
+from freetextresponse.xblocks import FreeTextResponse
+
+from .tests_utils import LearnerBlocksMixin
+from .tests_utils import make_request
+
+
+@ddt.ddt
+@override_settings(FREETEXTRESPONSE_STAFF_TOOLS=True)
+class DashboardTestCase(LearnerBlocksMixin, TestCase):
+    """
+    Tests for listing and counting the learners' answers
+    """
+
+    xblock_cls = FreeTextResponse
+    attributes = {'fullcredit_keyphrases': ['light']}
+
+    def setUp(self):
+        """
+        Creates a block on which four learners submitted answers
+        """
+        self.create_usage()
+        self.submit(1, 'light')
+        self.submit(2, 'dark')
+        self.submit(3, 'the light of the sun')
+        self.submit(4, 'dark')
+
+    def query(self, data, staff=True):
+        """
+        Queries the dashboard; returns the response
+        """
+        xblock = self.make_block('staff', staff=staff)
+        return xblock.dashboard(make_request(data))
+
+    def get_student_ids(self, data):
+        """
+        Returns the student ids of a page of the dashboard
+        """
+        # pylint: disable=no-member
+        response = self.query(data)
+        return [answer['student_id'] for answer in response.json['answers']]
+
+    @ddt.data(
+        (0, '0'),
+        (1, '1-9'),
+        (9, '1-9'),
+        (10, '10-24'),
+        (999, '500-999'),
+        (5000, '1000+'),
+    )
+    @ddt.unpack
+    def test_word_count_range(self, words, label):
+        """
+        Checks the labels of the word count ranges
+        """
+        self.assertEqual(label, get_word_count_range(words))
+
+    def test_staff_only(self):
+        """
+        Checks that learners cannot see the dashboard, and that staff
+        need the staff tools
+        """
+        # pylint: disable=no-member
+        self.assertEqual(403, self.query({}, staff=False).status_code)
+        with override_settings(FREETEXTRESPONSE_STAFF_TOOLS=False):
+            self.assertEqual(404, self.query({}).status_code)
+
+    @ddt.data(
+        {'credit': 1, 'words': '1-9'},
+        {'attempts': 'many'},
+        {'cursor': 'next'},
+    )
+    def test_invalid_query(self, data):
+        """
+        Checks that malformed queries are rejected
+        """
+        # pylint: disable=no-member
+        self.assertEqual(400, self.query(data).status_code)
+
+    def test_pages(self):
+        """
+        Checks that the answers are listed newest first, page by page
+        """
+        # pylint: disable=no-member
+        response = self.query({'limit': 3}).json
+        self.assertEqual(4, response['total'])
+        cursor = response['cursor']
+        self.assertEqual(
+            ['4', '3', '2'],
+            [answer['student_id'] for answer in response['answers']],
+        )
+        self.assertEqual(
+            {
+                'student_id': '3',
+                'credit': 1.0,
+                'attempts': 1,
+                'words': 5,
+                'snippet': 'the light of the sun',
+            },
+            {
+                key: value
+                for key, value in response['answers'][1].items()
+                if key != 'time'
+            },
+        )
+        response = self.query({'limit': 3, 'cursor': cursor}).json
+        self.assertIsNone(response['cursor'])
+        self.assertEqual(['1'], self.get_student_ids({'cursor': cursor}))
+        # A learner resubmitting moves to the first page, and does not
+        # shift the later pages
+        self.submit(4, 'light')
+        self.assertEqual(['1'], self.get_student_ids({'cursor': cursor}))
+
+    def test_filters_and_counts(self):
+        """
+        Checks the filters and the counts, after a learner resubmits
+        """
+        # pylint: disable=no-member
+        self.submit(2, 'light')
+        self.assertEqual(['2', '3', '1'], self.get_student_ids({'credit': 1}))
+        self.assertEqual(['4'], self.get_student_ids({'credit': 0}))
+        self.assertEqual(['2'], self.get_student_ids({'attempts': 2}))
+        self.assertEqual([], self.get_student_ids({'words': '10-24'}))
+        self.assertEqual(3, self.query({'credit': '1'}).json['total'])
+        self.assertEqual(
+            {
+                'learners': 4,
+                'credit': {'1.0': 3, '0.0': 1},
+                'attempts': {'1': 3, '2': 1},
+                'words': {'1-9': 4},
+            },
+            self.query({}).json['counts'],
+        )
+
+    def test_bulk_reset(self):
+        """
+        Checks that a bulk reset updates the learners' records
+        """
+        # pylint: disable=no-member
+        staff = self.make_block('staff', staff=True)
+        staff.bulk_operation(make_request({
+            'action': 'reset',
+            'learners': ['1', '3'],
+        }))
+        staff.save()
+        self.assertEqual(['3', '1'], self.get_student_ids({'attempts': 0}))
+        self.assertEqual(
+            {'0.0': 4},
+            self.query({}).json['counts']['credit'],
+        )
+
+    def test_counts_match_records(self):
+        """
+        Checks that the counts kept as the records change match the
+        records, after submissions and bulk operations
+        """
+        # pylint: disable=no-member
+        self.submit(5, 'one two three four five six seven eight nine ten')
+        self.submit(2, 'light')
+        staff = self.make_block('staff', staff=True)
+        for request in (
+                {'action': 'reset', 'learners': ['1', '6']},
+                {'action': 'grant', 'attempts': 1, 'learners': ['2', '3']},
+        ):
+            staff.bulk_operation(make_request(request))
+        records = LearnerRecord.objects.filter(
+            usage_key=str(self.usage.usage_id),
+        )
+        expected = {'learners': records.count()}
+        for name, field in FILTER_FIELDS.items():
+            expected[name] = dict(collections.Counter(
+                str(float(value)) if name == 'credit' else str(value)
+                for value in records.values_list(field, flat=True)
+            ))
+        self.assertEqual(expected, self.query({}).json['counts'])
+
+    def test_backfill(self):
+        """
+        Checks that a learner who submitted before the staff tools were
+        enabled is listed once they load the block
+        """
+        with override_settings(FREETEXTRESPONSE_STAFF_TOOLS=False):
+            self.submit(5, 'light')
+        self.assertNotIn('5', self.get_student_ids({}))
+        self.make_block(5).student_view()
+        self.assertEqual('5', self.get_student_ids({})[0])
+        self.assertEqual(5, self.query({}).json['counts']['learners'])
@@ -0,0 +1,224 @@
+"""
+Tests for near-duplicate answer detection
+"""
+import unittest
+
+from django.test import TestCase
+from mock import MagicMock
+
+from freetextresponse.duplicates import BANDS
+from freetextresponse.duplicates import MAX_BUCKET_SIZE
+from freetextresponse.duplicates import estimate_similarity
+from freetextresponse.duplicates import find_clusters
+from freetextresponse.duplicates import minhash_signature
+from freetextresponse.records import AnswerBucket
+from freetextresponse.records import AnswerSignature
+from freetextresponse.signatures import find_similar
+from freetextresponse.signatures import get_clusters
+from freetextresponse.signatures import index_answer
+from freetextresponse.xblocks import FreeTextResponse
+
+from .tests_utils import make_request
+from .tests_utils import make_xblock
+
+
+ANSWER = (
+    'Photosynthesis converts light energy into chemical energy '
+    'stored in glucose molecules'
+)
+COPIED_ANSWER = (
+    'photosynthesis converts light energy into chemical energy '
+    'stored in glucose molecule'
+)
+OTHER_ANSWER = 'Mitochondria are the powerhouse of the cell and make ATP'
+
+
+class DuplicateIndexTestCase(unittest.TestCase):
+    """
+    Tests for MinHash signatures and LSH clusters
+    """
+
+    def test_signatures(self):
+        """
+        Tests that signatures estimate the similarity of answers
+        """
+        signature = minhash_signature(ANSWER)
+        self.assertEqual(signature, minhash_signature(ANSWER.upper()))
+        self.assertGreaterEqual(
+            estimate_similarity(signature, minhash_signature(COPIED_ANSWER)),
+            0.8,
+        )
+        self.assertLess(
+            estimate_similarity(signature, minhash_signature(OTHER_ANSWER)),
+            0.2,
+        )
+        self.assertIsNone(minhash_signature('  '))
+
+    def test_find_clusters(self):
+        """
+        Tests that students sharing buckets with similar signatures are
+        grouped
+        """
+        signatures = {
+            'a': minhash_signature(ANSWER),
+            'b': minhash_signature(COPIED_ANSWER),
+            'c': minhash_signature(OTHER_ANSWER),
+            'd': minhash_signature(ANSWER),
+        }
+        self.assertEqual(
+            [['a', 'b', 'd']],
+            find_clusters([['a', 'b', 'c'], ['b', 'd']], signatures),
+        )
+        self.assertEqual([], find_clusters([['a'], ['c', 'd']], signatures))
+
+
+class SignatureRecordsTestCase(TestCase):
+    """
+    Tests for the signature and bucket rows of the learners' answers
+    """
+
+    usage_key = 'block-v1:foo+bar+baz+type@freetextresponse+block@1'
+
+    def index(self, student_id, answer):
+        """
+        Indexes the student's answer
+        """
+        index_answer(self.usage_key, student_id, minhash_signature(answer))
+
+    def test_clusters(self):
+        """
+        Tests that near-identical answers are grouped
+        """
+        self.index('a', ANSWER)
+        self.index('b', COPIED_ANSWER)
+        self.index('c', OTHER_ANSWER)
+        self.index('d', ANSWER)
+        self.assertEqual([['a', 'b', 'd']], get_clusters(self.usage_key))
+        self.assertEqual(
+            {'a', 'b', 'd'},
+            find_similar(
+                self.usage_key,
+                minhash_signature(ANSWER),
+                {'a', 'b', 'c', 'd'},
+            ),
+        )
+        self.assertEqual(
+            {'b'},
+            find_similar(self.usage_key, minhash_signature(ANSWER), {'b'}),
+        )
+
+    def test_replace_and_remove(self):
+        """
+        Tests that a new answer replaces only the student's rows
+        """
+        self.index('a', ANSWER)
+        self.index('b', ANSWER)
+        # Five queries and the savepoint around them
+        with self.assertNumQueries(7):
+            self.index('b', OTHER_ANSWER)
+        self.assertEqual([], get_clusters(self.usage_key))
+        self.assertEqual(
+            BANDS,
+            AnswerBucket.objects.filter(student_id='b').count(),
+        )
+        with self.assertNumQueries(3):
+            self.index('b', OTHER_ANSWER)
+        self.index('a', '  ')
+        self.assertEqual(
+            ['b'],
+            list(AnswerSignature.objects.values_list(
+                'student_id',
+                flat=True,
+            )),
+        )
+        self.assertFalse(AnswerBucket.objects.filter(student_id='a'))
+
+    def test_bucket_size_is_capped(self):
+        """
+        Tests that a common answer fills its buckets up to the limit,
+        and that later copies of it are still found similar
+        """
+        for student_id in range(MAX_BUCKET_SIZE + 5):
+            self.index(str(student_id), ANSWER)
+        self.assertEqual(
+            BANDS * MAX_BUCKET_SIZE,
+            AnswerBucket.objects.count(),
+        )
+        self.assertEqual(
+            [sorted(str(student_id) for student_id in range(MAX_BUCKET_SIZE))],
+            get_clusters(self.usage_key),
+        )
+        self.assertEqual(
+            MAX_BUCKET_SIZE,
+            len(find_similar(
+                self.usage_key,
+                minhash_signature(COPIED_ANSWER),
+                {str(student_id) for student_id in range(MAX_BUCKET_SIZE + 5)},
+            )),
+        )
+
+
+class DuplicateDetectionTestCase(TestCase):
+    """
+    Tests for detecting duplicates in the XBlock
+    """
+
+    def setUp(self):
+        """
+        Creates an xblock with duplicate detection
+        """
+        self.xblock = make_xblock('freetextresponse', FreeTextResponse, {
+            'detect_duplicates': True,
+            'display_other_student_responses': True,
+        })
+        self.xblock.runtime.publish = MagicMock()
+
+    def submit_as(self, student_id, answer):
+        """
+        Submits an answer as another student
+        """
+        self.xblock.scope_ids = self.xblock.scope_ids._replace(
+            user_id=student_id,
+        )
+        self.xblock.reload_user_state()
+        self.xblock.submit(make_request({
+            'student_answer': answer,
+            'can_record_response': True,
+        }))
+
+    def test_duplicates_stay_out_of_pool(self):
+        """
+        Tests that near duplicates are indexed but not added to the pool
+        """
+        self.submit_as('a', ANSWER)
+        self.submit_as('b', COPIED_ANSWER)
+        self.submit_as('c', OTHER_ANSWER)
+        self.assertEqual(
+            ['a', 'c'],
+            [
+                response['student_id']
+                for response in self.xblock.displayable_answers
+            ],
+        )
+        self.xblock.runtime.user_is_staff = True
+        response = self.xblock.duplicate_clusters(make_request({}))
+        # pylint: disable=no-member
+        self.assertEqual([['a', 'b']], response.json_body['clusters'])
+
+    def test_duplicate_clusters_staff_only(self):
+        """
+        Tests that students cannot list duplicate answers
+        """
+        response = self.xblock.duplicate_clusters(make_request({}))
+        # pylint: disable=no-member
+        self.assertEqual(403, response.status_code)
+
+    def test_disabled(self):
+        """
+        Tests that nothing is indexed unless detection is enabled
+        """
+        self.xblock.detect_duplicates = False
+        self.submit_as('a', ANSWER)
+        self.submit_as('b', ANSWER)
+        self.assertFalse(AnswerSignature.objects.exists())
+        self.assertEqual(2, len(self.xblock.displayable_answers))
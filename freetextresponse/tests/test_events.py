@@ -0,0 +1,95 @@
+"""
+Tests for the analytics events of the FreeTextResponse XBlock
+"""
+import unittest
+
+from mock import MagicMock
+
+from freetextresponse.mixins.events import BATCH_EVENT_TYPE
+from freetextresponse.xblocks import FreeTextResponse
+
+from .tests_utils import make_request
+from .tests_utils import make_xblock
+
+
+class EventsTestCase(unittest.TestCase):
+    """
+    Tests for buffering events and publishing them in batches
+    """
+
+    def setUp(self):
+        """
+        Creates an xblock with a recording publish
+        """
+        self.xblock = make_xblock('freetextresponse', FreeTextResponse, {
+            'max_attempts': 1,
+            'min_word_count': 2,
+        })
+        self.xblock.runtime.publish = MagicMock()
+
+    def get_batches(self):
+        """
+        Returns the names of the events of each published batch
+        """
+        return [
+            [event['name'] for event in call[0][2]['events']]
+            for call in self.xblock.runtime.publish.call_args_list
+            if call[0][1] == BATCH_EVENT_TYPE
+        ]
+
+    def test_submit_events(self):
+        """
+        Tests that the events of a submission are published together
+        """
+        self.xblock.submit(make_request({'student_answer': 'short'}))
+        self.assertEqual(
+            [['submitted', 'invalid_word_count', 'max_attempts_reached']],
+            self.get_batches(),
+        )
+        self.assertEqual(2, self.xblock.runtime.publish.call_count)
+
+    def test_save_and_peer_view_events(self):
+        """
+        Tests that saves and peer response views are recorded
+        """
+        self.xblock.save_reponse(make_request({'student_answer': 'a b c'}))
+        self.xblock.get_other_responses(make_request({}))
+        self.assertEqual(
+            [['saved'], ['peer_responses_viewed']],
+            self.get_batches(),
+        )
+        event = self.xblock.runtime.publish.call_args_list[0][0][2]
+        self.assertEqual(3, event['events'][0]['word_count'])
+
+    def test_rejected_submit_events(self):
+        """
+        Tests that submissions refused by the client for their word
+        count are recorded when the draft is saved
+        """
+        self.xblock.save_reponse(make_request({
+            'student_answer': 'short',
+            'rejected_submit': True,
+        }))
+        self.xblock.save_reponse(make_request({
+            'student_answer': 'long enough',
+            'rejected_submit': True,
+        }))
+        self.assertEqual(
+            [['saved', 'invalid_word_count'], ['saved']],
+            self.get_batches(),
+        )
+
+    def test_nothing_to_publish(self):
+        """
+        Tests that requests without events publish nothing
+        """
+        self.xblock.count_attempts = 1
+        self.xblock.save_reponse(make_request({'student_answer': 'a b'}))
+        self.xblock.runtime.publish.assert_not_called()
+
+    def test_emit_outside_handler(self):
+        """
+        Tests that events emitted outside a handler are published at once
+        """
+        self.xblock.emit_event('custom', value=1)
+        self.assertEqual([['custom']], self.get_batches())
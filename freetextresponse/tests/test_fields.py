@@ -0,0 +1,77 @@
+"""
+Tests for the FreeTextResponse field types
+"""
+import random
+import string
+import unittest
+
+from xblock.runtime import DictKeyValueStore
+
+from freetextresponse.fields import CompressedString
+from freetextresponse.xblocks import FreeTextResponse
+
+from .tests_utils import make_xblock
+
+
+class CompressedStringTestCase(unittest.TestCase):
+    """
+    Tests for storing long strings compressed
+    """
+
+    def setUp(self):
+        """
+        Creates a field with a small threshold
+        """
+        self.field = CompressedString(threshold=100)
+
+    def test_short_values_stay_plain(self):
+        """
+        Tests that values below the threshold are stored as they are
+        """
+        self.assertEqual('short answer', self.field.to_json('short answer'))
+        self.assertIsNone(self.field.to_json(None))
+
+    def test_long_values_are_compressed(self):
+        """
+        Tests that long values are stored compressed and read back
+        """
+        answer = 'photosynthesis makes sugar ' * 100
+        stored = self.field.to_json(answer)
+        self.assertEqual(['zlib'], list(stored))
+        self.assertLess(len(stored['zlib']), len(answer) // 10)
+        self.assertEqual(answer, self.field.from_json(stored))
+
+    def test_incompressible_values_stay_plain(self):
+        """
+        Tests that values that do not shrink are stored as they are
+        """
+        randomizer = random.Random(0)
+        answer = ''.join(
+            randomizer.choice(string.ascii_letters + string.digits)
+            for _ in range(200)
+        )
+        self.assertEqual(answer, self.field.to_json(answer))
+
+    def test_student_answer_storage(self):
+        """
+        Tests that stored answers, compressed or plain, are read back
+        """
+        key_store = DictKeyValueStore()
+        xblock = make_xblock(
+            'freetextresponse', FreeTextResponse, {}, key_store=key_store,
+        )
+        answer = 'light energy becomes chemical energy ' * 200
+        xblock.student_answer = answer
+        xblock.save()
+        # pylint: disable=protected-access
+        stored = xblock._field_data.get(xblock, 'student_answer')
+        self.assertIn('zlib', stored)
+        reloaded = make_xblock(
+            'freetextresponse', FreeTextResponse, {},
+            key_store=key_store, scope_ids=xblock.scope_ids,
+        )
+        self.assertEqual(answer, reloaded.student_answer)
+        # Answers stored before compression are plain strings
+        xblock._field_data.set(xblock, 'student_answer', 'legacy answer')
+        reloaded.reload_user_state()
+        self.assertEqual('legacy answer', reloaded.student_answer)
@@ -0,0 +1,107 @@
+"""
+Tests for the student view fragment cache
+"""
+import datetime
+import unittest
+
+from django.utils.translation import override
+from mock import patch
+
+from freetextresponse import views
+from freetextresponse.views import _fragment_cache
+from freetextresponse.xblocks import FreeTextResponse
+
+from .tests_utils import make_request
+from .tests_utils import make_xblock
+
+
+class FragmentCacheTestCase(unittest.TestCase):
+    """
+    Tests for reusing rendered student views
+    """
+
+    def setUp(self):
+        """
+        Creates an xblock and empties the cache
+        """
+        _fragment_cache.clear()
+        self.xblock = make_xblock('freetextresponse', FreeTextResponse, {
+            'prompt': 'Describe photosynthesis',
+            'fullcredit_keyphrases': ['light'],
+        })
+
+    def render(self):
+        """
+        Renders the student view, counting template renders
+        """
+        with patch.object(
+                FreeTextResponse,
+                'build_fragment',
+                wraps=self.xblock.build_fragment,
+        ) as build_fragment:
+            fragment = self.xblock.student_view()
+        return fragment, build_fragment.call_count
+
+    def test_repeat_view_is_cached(self):
+        """
+        Tests that an unchanged student view is rendered once
+        """
+        first, renders = self.render()
+        self.assertEqual(1, renders)
+        second, renders = self.render()
+        self.assertEqual(0, renders)
+        self.assertEqual(first.content, second.content)
+        self.assertIsNot(first, second)
+        self.assertEqual(first.js_init_fn, second.js_init_fn)
+
+    def test_handlers_invalidate(self):
+        """
+        Tests that submit and save_reponse change the fragment
+        """
+        self.render()
+        self.xblock.save_reponse(make_request({'student_answer': 'draft'}))
+        fragment, renders = self.render()
+        self.assertEqual(1, renders)
+        self.assertIn('draft', fragment.content)
+        self.xblock.submit(make_request({'student_answer': 'light'}))
+        fragment, renders = self.render()
+        self.assertEqual(1, renders)
+        self.assertIn('light', fragment.content)
+
+    def test_settings_invalidate(self):
+        """
+        Tests that Studio edits change the fragment
+        """
+        self.render()
+        self.xblock.prompt = 'Describe respiration'
+        fragment, renders = self.render()
+        self.assertEqual(1, renders)
+        self.assertIn('Describe respiration', fragment.content)
+
+    def test_phrase_settings_hashed_once(self):
+        """
+        Tests that the views of an instance hash its phrase settings
+        once, and that replaced keyphrases change the fragment
+        """
+        with patch.object(
+                views,
+                'content_hash',
+                wraps=views.content_hash,
+        ) as content_hash:
+            self.render()
+            calls = content_hash.call_count
+            self.assertEqual(0, self.render()[1])
+            # The settings and the user state of the fragment key
+            self.assertEqual(calls + 2, content_hash.call_count)
+        self.xblock.fullcredit_keyphrases = ['sugar']
+        self.assertEqual(1, self.render()[1])
+
+    def test_language_and_due_date_invalidate(self):
+        """
+        Tests that the language and the due date are part of the key
+        """
+        self.render()
+        with override('fr'):
+            self.assertEqual(1, self.render()[1])
+        self.xblock.due = datetime.datetime(2000, 1, 1)
+        self.assertEqual(1, self.render()[1])
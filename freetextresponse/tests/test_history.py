@@ -0,0 +1,124 @@
+"""
+Tests for the attempt history
+"""
+import json
+import unittest
+
+from mock import MagicMock
+
+from freetextresponse.history import MAX_ATTEMPT_HISTORY
+from freetextresponse.history import MAX_ATTEMPT_HISTORY_BYTES
+from freetextresponse.history import apply_delta
+from freetextresponse.history import make_delta
+from freetextresponse.xblocks import FreeTextResponse
+
+from .tests_utils import make_request
+from .tests_utils import make_xblock
+
+
+class DeltaTestCase(unittest.TestCase):
+    """
+    Tests for the deltas between attempts
+    """
+
+    def test_round_trip(self):
+        """
+        Tests that a delta reproduces the target text exactly
+        """
+        cases = [
+            ('', 'new answer'),
+            ('the  cell\nwall', 'the cell membrane\n\nand wall'),
+            ('same text', 'same text'),
+            ('drop everything', ''),
+        ]
+        for source, target in cases:
+            self.assertEqual(
+                target,
+                apply_delta(source, make_delta(source, target)),
+            )
+
+    def test_delta_is_compact(self):
+        """
+        Tests that a small edit to a long answer gives a small delta
+        """
+        source = 'light energy is turned into chemical energy. ' * 100
+        target = source.replace('chemical', 'stored', 1)
+        self.assertLess(len(json.dumps(make_delta(source, target))), 50)
+
+
+class AttemptHistoryTestCase(unittest.TestCase):
+    """
+    Tests for recording attempts
+    """
+
+    def setUp(self):
+        """
+        Creates an xblock keeping an attempt history
+        """
+        self.xblock = make_xblock('freetextresponse', FreeTextResponse, {
+            'keep_attempt_history': True,
+            'fullcredit_keyphrases': ['light'],
+        })
+        self.xblock.runtime.publish = MagicMock()
+
+    def submit(self, answer):
+        """
+        Submits an answer
+        """
+        self.xblock.submit(make_request({'student_answer': answer}))
+
+    def test_attempts_are_reconstructed(self):
+        """
+        Tests that every attempt can be read back, across drafts
+        """
+        self.submit('plants need water')
+        self.submit('plants need light and water')
+        self.xblock.save_reponse(make_request({'student_answer': 'draft'}))
+        self.submit('plants turn light into sugar')
+        self.xblock.save_reponse(make_request({'student_answer': 'later'}))
+        response = self.xblock.get_attempt_history(make_request({}))
+        # pylint: disable=no-member
+        attempts = response.json_body['attempts']
+        self.assertEqual(
+            [
+                'plants need water',
+                'plants need light and water',
+                'plants turn light into sugar',
+            ],
+            [attempt['answer'] for attempt in attempts],
+        )
+        self.assertEqual([3, 5, 5], [attempt['words'] for attempt in attempts])
+        self.assertEqual(
+            [0.0, 1.0, 1.0],
+            [attempt['credit'] for attempt in attempts],
+        )
+
+    def test_history_is_bounded(self):
+        """
+        Tests that the history is capped by count and by size
+        """
+        for index in range(MAX_ATTEMPT_HISTORY + 5):
+            self.submit(f'answer {index} ' + f'word{index} ' * 100)
+        history = self.xblock.attempt_history
+        self.assertEqual(MAX_ATTEMPT_HISTORY, len(history))
+        self.assertLessEqual(
+            len(json.dumps(history, separators=(',', ':'))),
+            MAX_ATTEMPT_HISTORY_BYTES,
+        )
+        attempts = self.xblock.get_attempts()
+        # The oldest attempts lost their text to stay within the size
+        self.assertIsNone(attempts[0]['answer'])
+        self.assertEqual(self.xblock.student_answer, attempts[-1]['answer'])
+        self.assertEqual(
+            f'answer {MAX_ATTEMPT_HISTORY + 3} '
+            + f'word{MAX_ATTEMPT_HISTORY + 3} ' * 100,
+            attempts[-2]['answer'],
+        )
+
+    def test_disabled(self):
+        """
+        Tests that no history is kept unless enabled
+        """
+        self.xblock.keep_attempt_history = False
+        self.submit('plants need water')
+        self.assertEqual([], self.xblock.attempt_history)
@@ -0,0 +1,122 @@
+"""
+Import-time benchmark of the freetextresponse package
+"""
+import os
+import subprocess
+import sys
+import unittest
+
+
+# Total time spent in the package's own modules, in microseconds,
+# as reported by `python -X importtime`; about twice the current time
+IMPORT_TIME_BUDGET = 60000
+# Modules that only some features need, and that must load lazily
+LAZY_MODULES = (
+    'freetextresponse.bulk',
+    'freetextresponse.dashboard',
+    'freetextresponse.signatures',
+)
+
+
+def measure_import_time(module):
+    """
+    Imports the module in a fresh interpreter with Django set up, and
+    returns {module name: self time in microseconds}
+    """
+    code = f'import django; django.setup(); import {module}'
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'freetextresponse.settings')
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True,
+        check=True,
+        env=env,
+        text=True,
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_time, _, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(self_time)
+    return times
+
+
+class ImportTimeTestCase(unittest.TestCase):
+    """
+    Tests that importing the XBlock stays cheap
+    """
+
+    def test_import_time(self):
+        """
+        Tests the import time of the package against the budget
+        """
+        times = measure_import_time('freetextresponse.xblocks')
+        package_time = sum(
+            self_time
+            for name, self_time in times.items()
+            if name.split('.')[0] == 'freetextresponse'
+        )
+        self.assertLess(package_time, IMPORT_TIME_BUDGET)
+        for module in LAZY_MODULES:
+            self.assertNotIn(module, times)
+
+    def test_import_without_app(self):
+        """
+        Tests that the XBlock imports in a project without the app in
+        its INSTALLED_APPS, and its keyphrase module without settings
+        """
+        code = (
+            'import sys; '
+            'from freetextresponse.keyphrases import compile_keyphrases; '
+            'from django.conf import settings; '
+            'settings.configure(INSTALLED_APPS=['
+            '"django.contrib.contenttypes", "django.contrib.auth"]); '
+            'import django; django.setup(); '
+            'import freetextresponse.xblocks; '
+            'print(" ".join(sorted(sys.modules)))'
+        )
+        env = dict(os.environ)
+        env.pop('DJANGO_SETTINGS_MODULE', None)
+        process = subprocess.run(
+            [sys.executable, '-c', code],
+            capture_output=True,
+            check=True,
+            env=env,
+            text=True,
+        )
+        modules = process.stdout.split()
+        for module in LAZY_MODULES + ('freetextresponse.records',):
+            self.assertNotIn(module, modules)
+
+    def test_app_registers_records(self):
+        """
+        Tests that the installed app registers the records of the staff
+        tools, whose tables its migrations would otherwise drop
+        """
+        code = (
+            'import django; django.setup(); '
+            'from django.apps import apps; '
+            'config = apps.get_app_config("freetextresponse"); '
+            'print(" ".join(model.__name__ for model in config.get_models()))'
+        )
+        env = dict(os.environ)
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'freetextresponse.settings')
+        process = subprocess.run(
+            [sys.executable, '-c', code],
+            capture_output=True,
+            check=True,
+            env=env,
+            text=True,
+        )
+        self.assertEqual(
+            {
+                'AnswerBucket',
+                'AnswerSignature',
+                'LearnerCount',
+                'LearnerRecord',
+                'StaffChange',
+                'StaffOperation',
+            },
+            set(process.stdout.split()),
+        )
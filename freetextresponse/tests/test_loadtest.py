@@ -0,0 +1,57 @@
+"""
+Tests for the load test harness
+"""
+import unittest
+
+from . import loadtest
+
+
+class LoadTestTestCase(unittest.TestCase):
+    """
+    Tests for running the load test on a small scale
+    """
+
+    def assert_report(self, report, learners, blocks):
+        """
+        Asserts that every request of every learner was reported
+        """
+        for operation in loadtest.OPERATIONS:
+            stats = report['operations'][operation]
+            self.assertEqual(learners * blocks, stats['count'])
+            self.assertEqual(0, stats['errors'])
+            self.assertLessEqual(stats['p50'], stats['max'])
+        self.assertEqual(3 * learners * blocks, report['requests'])
+        contention = report['displayable_answers']
+        self.assertLessEqual(contention['entries'], contention['expected'])
+        self.assertEqual(
+            contention['expected'] - contention['entries'],
+            contention['lost'],
+        )
+        self.assertIn('requests/s', loadtest.format_report(report))
+
+    def test_thread_pool(self):
+        """
+        Tests a run with thread workers sharing a key store
+        """
+        report = loadtest.run(learners=6, blocks=2, workers=3)
+        self.assert_report(report, 6, 2)
+
+    def test_process_pool(self):
+        """
+        Tests a run with process workers owning a shard of the blocks
+        """
+        report = loadtest.run(learners=3, blocks=2, workers=2, pool='process')
+        self.assert_report(report, 3, 2)
+        # Each process runs its shard on a single thread
+        self.assertEqual(0, report['displayable_answers']['lost'])
+
+    def test_percentile(self):
+        """
+        Tests the nearest-rank percentiles
+        """
+        # pylint: disable=protected-access
+        values = list(range(1, 101))
+        self.assertEqual(50, loadtest._percentile(values, 50))
+        self.assertEqual(99, loadtest._percentile(values, 99))
+        self.assertEqual(1, loadtest._percentile(values, 0))
+        self.assertEqual(0.0, loadtest._percentile([], 50))
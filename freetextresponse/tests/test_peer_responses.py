@@ -0,0 +1,132 @@
+"""
+Tests for the peer responses of the FreeTextResponse XBlock
+"""
+import unittest
+
+from mock import MagicMock
+
+from freetextresponse.models import Credit
+from freetextresponse.models import MAX_RESPONSE_POOL
+from freetextresponse.models import MAX_SNIPPET_LENGTH
+from freetextresponse.xblocks import FreeTextResponse
+
+from .tests_utils import make_request
+from .tests_utils import make_xblock
+
+
+class PeerResponsesTestCase(unittest.TestCase):
+    """
+    Tests for showing other students' responses
+    """
+
+    def setUp(self):
+        """
+        Creates an xblock
+        """
+        self.xblock = make_xblock('freetextresponse', FreeTextResponse, {})
+
+    def test_get_other_responses_pages(self):
+        """
+        Tests that get_other_responses pages through the pool,
+        newest first, without the student's own answer
+        """
+        self.xblock.display_other_student_responses = True
+        self.xblock.student_answer = 'my answer'
+        self.xblock.displayable_answers = [
+            {'student_id': str(index), 'snippet': f'answer {index}'}
+            for index in range(5)
+        ] + [{'student_id': self.xblock.get_student_id(), 'snippet': 'mine'}]
+        response = self.xblock.get_other_responses(make_request({}))
+        # pylint: disable=no-member
+        self.assertEqual(
+            [
+                {'snippet': 'answer 4'},
+                {'snippet': 'answer 3'},
+                {'snippet': 'answer 2'},
+            ],
+            response.json_body['responses'],
+        )
+        response = self.xblock.get_other_responses(
+            make_request({'cursor': response.json_body['cursor']})
+        )
+        self.assertEqual(
+            [{'snippet': 'answer 1'}, {'snippet': 'answer 0'}],
+            response.json_body['responses'],
+        )
+        self.assertIsNone(response.json_body['cursor'])
+
+    def test_get_other_responses_incorrect_answer(self):
+        """
+        Tests that students without credit see no other responses
+        """
+        self.xblock.display_other_student_responses = True
+        self.xblock.fullcredit_keyphrases = ['right']
+        self.xblock.student_answer = 'wrong'
+        self.xblock.displayable_answers = [
+            {'student_id': 'other', 'snippet': 'right'},
+        ]
+        response = self.xblock.get_other_responses(
+            make_request({'cursor': 'bogus'})
+        )
+        # pylint: disable=no-member
+        self.assertEqual([], response.json_body['responses'])
+
+    def test_student_view_does_not_read_responses(self):
+        """
+        Tests that rendering and submitting leave the response pool alone
+        """
+        self.xblock.display_other_student_responses = True
+        self.xblock.get_other_answers = MagicMock(return_value=[])
+        self.xblock.student_view()
+        self.xblock.submit(make_request({'student_answer': 'a'}))
+        self.xblock.get_other_answers.assert_not_called()
+
+    def test_store_student_response_pool_size(self):
+        """
+        Tests that the response pool keeps more than one page of answers
+        """
+        self.xblock.student_answer = 'answer'
+        self.xblock.score = Credit.full.value
+        self.xblock.displayable_answers = [
+            {'student_id': str(index), 'snippet': 'answer'}
+            for index in range(2 * MAX_RESPONSE_POOL)
+        ]
+        self.xblock.store_student_response()
+        self.assertEqual(
+            MAX_RESPONSE_POOL + 1,
+            len(self.xblock.displayable_answers),
+        )
+        self.assertEqual(
+            self.xblock.get_student_id(),
+            self.xblock.displayable_answers[-1]['student_id'],
+        )
+
+    def test_store_student_response_snippet(self):
+        """
+        Tests that answers are stored escaped and shortened
+        """
+        self.xblock.student_answer = '  <b>x</b> & y\x00' + 'z' * (
+            MAX_SNIPPET_LENGTH
+        )
+        self.xblock.score = Credit.full.value
+        self.xblock.store_student_response()
+        snippet = self.xblock.displayable_answers[-1]['snippet']
+        self.assertTrue(snippet.startswith('&lt;b&gt;x&lt;/b&gt; &amp; yz'))
+        self.assertTrue(snippet.endswith('z\u2026'))
+        self.assertNotIn('answer', self.xblock.displayable_answers[-1])
+
+    def test_get_other_responses_legacy_entries(self):
+        """
+        Tests that entries stored with raw answers are escaped on read
+        """
+        self.xblock.display_other_student_responses = True
+        self.xblock.student_answer = 'my answer'
+        self.xblock.displayable_answers = [
+            {'student_id': 'other', 'answer': '<script>alert(1)</script>'},
+        ]
+        response = self.xblock.get_other_responses(make_request({}))
+        # pylint: disable=no-member
+        self.assertEqual(
+            [{'snippet': '&lt;script&gt;alert(1)&lt;/script&gt;'}],
+            response.json_body['responses'],
+        )
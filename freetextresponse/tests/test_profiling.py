@@ -0,0 +1,97 @@
+"""
+Tests for profiling a sample of handler and view calls
+"""
+import os
+import pstats
+import shutil
+import tempfile
+import tracemalloc
+import unittest
+
+from django.test import override_settings
+
+from freetextresponse.xblocks import FreeTextResponse
+
+from .tests_utils import make_request
+from .tests_utils import make_xblock
+
+
+class ProfilingTestCase(unittest.TestCase):
+    """
+    Tests for writing and rotating profiles
+    """
+
+    def setUp(self):
+        """
+        Creates an xblock and an empty profile directory
+        """
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.xblock = make_xblock('freetextresponse', FreeTextResponse, {})
+
+    def list_profiles(self):
+        """
+        Returns the names of the files in the profile directory
+        """
+        return sorted(os.listdir(self.directory))
+
+    def submit(self):
+        """
+        Submits an answer
+        """
+        return self.xblock.submit(make_request({'student_answer': 'a b'}))
+
+    def test_disabled_by_default(self):
+        """
+        Checks that nothing is profiled without a sample rate
+        """
+        with override_settings(FREETEXTRESPONSE_PROFILE_DIR=self.directory):
+            self.submit()
+        self.assertEqual([], self.list_profiles())
+
+    def test_profile_written(self):
+        """
+        Checks that a sampled call writes a readable profile
+        and allocation snapshot
+        """
+        with override_settings(
+                FREETEXTRESPONSE_PROFILE_DIR=self.directory,
+                FREETEXTRESPONSE_PROFILE_SAMPLE_RATE=1,
+        ):
+            response = self.submit()
+        self.assertEqual(200, response.status_code)
+        profiles = self.list_profiles()
+        self.assertEqual(
+            ['.prof', '.tracemalloc'],
+            [os.path.splitext(name)[1] for name in profiles],
+        )
+        self.assertTrue(profiles[0].endswith('-submit.prof'))
+        stats = pstats.Stats(os.path.join(self.directory, profiles[0]))
+        self.assertIn(
+            '_determine_credit',
+            {function for _, _, function in stats.stats},
+        )
+        snapshot = tracemalloc.Snapshot.load(
+            os.path.join(self.directory, profiles[1]),
+        )
+        self.assertTrue(snapshot.traces)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_rotation(self):
+        """
+        Checks that only the newest profiles are kept
+        """
+        with override_settings(
+                FREETEXTRESPONSE_PROFILE_DIR=self.directory,
+                FREETEXTRESPONSE_PROFILE_SAMPLE_RATE=1,
+                FREETEXTRESPONSE_PROFILE_MEMORY=False,
+                FREETEXTRESPONSE_PROFILE_MAX_FILES=3,
+        ):
+            for _ in range(5):
+                self.xblock.student_view()
+        profiles = self.list_profiles()
+        self.assertEqual(3, len(profiles))
+        self.assertTrue(all(
+            name.endswith('-student_view.prof')
+            for name in profiles
+        ))
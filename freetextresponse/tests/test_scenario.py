@@ -0,0 +1,76 @@
+"""
+Tests for the workbench scenarios
+"""
+import unittest
+from xml.etree import ElementTree
+
+from django.test import override_settings
+from mock import patch
+
+from freetextresponse.mixins import scenario
+from freetextresponse.xblocks import FreeTextResponse
+
+from .tests_utils import make_xblock
+
+
+class ScenarioTestCase(unittest.TestCase):
+    """
+    Tests for loading and generating workbench scenarios
+    """
+
+    def setUp(self):
+        """
+        Empties the scenario registry
+        """
+        scenario.get_scenarios.cache_clear()
+        self.addCleanup(scenario.get_scenarios.cache_clear)
+
+    def test_scenarios_loaded_once(self):
+        """
+        Checks that the scenario files are read only once
+        """
+        loader = scenario._get_loader()  # pylint: disable=protected-access
+        with patch.object(
+                loader,
+                'load_scenarios_from_path',
+                wraps=loader.load_scenarios_from_path,
+        ) as load_scenarios:
+            first = FreeTextResponse.workbench_scenarios()
+            second = FreeTextResponse.workbench_scenarios()
+        self.assertEqual(first, second)
+        self.assertEqual(load_scenarios.call_count, 1)
+
+    def test_synthetic_scenario_setting(self):
+        """
+        Checks that the setting adds a synthetic scenario
+        """
+        with override_settings(FREETEXTRESPONSE_SYNTHETIC_SCENARIO_BLOCKS=7):
+            scenarios = dict(FreeTextResponse.workbench_scenarios())
+        self.assertIn('Free Text Response Synthetic 7', scenarios)
+        scenario.get_scenarios.cache_clear()
+        self.assertEqual(len(FreeTextResponse.workbench_scenarios()), 2)
+
+    def test_synthetic_scenario(self):
+        """
+        Checks that the synthetic scenario builds and renders its blocks
+        """
+        xml = scenario.make_synthetic_scenario(12, units=2)
+        root = ElementTree.fromstring(xml)
+        self.assertEqual(len(root.findall('vertical_demo')), 2)
+        blocks = [
+            make_xblock('freetextresponse', FreeTextResponse, {
+                # pylint: disable=unsubscriptable-object
+                name: FreeTextResponse.fields[name].from_string(value)
+                for name, value in node.attrib.items()
+            })
+            for node in root.iter('freetextresponse')
+        ]
+        self.assertEqual(
+            [block.display_name for block in blocks],
+            [f'Synthetic block {number}' for number in range(1, 25)],
+        )
+        self.assertEqual(blocks[1].fullcredit_keyphrases, ['asdf'])
+        self.assertEqual(blocks[2].min_word_count, 2)
+        self.assertIs(blocks[4].display_correctness, False)
+        for block in blocks:
+            self.assertIn('Synthetic block', block.student_view().content)
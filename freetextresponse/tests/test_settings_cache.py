@@ -0,0 +1,145 @@
+"""
+Tests for the cache of settings-derived data
+"""
+import unittest
+
+from django.utils.translation import override
+from mock import patch
+
+from freetextresponse import views
+from freetextresponse.views import _settings_cache
+from freetextresponse.xblocks import FreeTextResponse
+
+from .tests_utils import LearnerBlocksMixin
+
+
+class SettingsCacheTestCase(LearnerBlocksMixin, unittest.TestCase):
+    """
+    Tests for sharing settings-derived data between block instances
+    """
+
+    xblock_cls = FreeTextResponse
+    attributes = {
+        'min_word_count': 2,
+        'max_word_count': 5,
+        'fullcredit_keyphrases': ['light'],
+    }
+
+    def setUp(self):
+        """
+        Creates the block's usage and empties the cache
+        """
+        _settings_cache.clear()
+        self.create_usage()
+
+    def test_shared_between_learners(self):
+        """
+        Tests that the learners of a block compile its keyphrases once
+        """
+        with patch.object(
+                views,
+                'compile_phrase_source',
+                wraps=views.compile_phrase_source,
+        ) as compile_phrase_source:
+            for learner in (1, 2, 3):
+                # pylint: disable=protected-access
+                xblock = self.make_block(learner)
+                xblock._get_keyphrase_artifact()
+                self.assertEqual(
+                    'Your response must be between 2 and 5 words.',
+                    xblock._get_word_count_message(),
+                )
+                self.assertEqual(
+                    '',
+                    xblock._get_indicator_visibility_class(),
+                )
+        self.assertEqual(1, compile_phrase_source.call_count)
+
+    def test_settings_invalidate(self):
+        """
+        Tests that changed settings and languages are derived again
+        """
+        # pylint: disable=protected-access
+        xblock = self.make_block(1)
+        first = xblock._get_derived_settings()
+        xblock.max_word_count = 8
+        second = xblock._get_derived_settings()
+        self.assertIsNot(first, second)
+        self.assertEqual(
+            'Your response must be between 2 and 8 words.',
+            second['word_count_message'],
+        )
+        xblock.fullcredit_keyphrases = ['dark']
+        self.assertIsNot(second, xblock._get_derived_settings())
+        with override('fr'):
+            self.assertIsNot(second, xblock._get_derived_settings())
+
+    def test_source_hashed_once(self):
+        """
+        Tests that an instance hashes its phrase source once, unless
+        its phrase settings are replaced
+        """
+        # pylint: disable=protected-access
+        xblock = self.make_block(1)
+        with patch.object(
+                views,
+                '_get_phrase_source',
+                wraps=views._get_phrase_source,
+        ) as get_phrase_source:
+            for _ in range(3):
+                xblock._get_derived_settings()
+            self.assertEqual(1, get_phrase_source.call_count)
+            xblock.fullcredit_keyphrases = ['dark']
+            artifact = xblock._get_keyphrase_artifact()
+            self.assertEqual(2, get_phrase_source.call_count)
+        self.assertEqual(['dark'], [
+            phrase for phrase, _ in artifact['entries']
+        ])
+
+    def test_reference_artifact_shared(self):
+        """
+        Tests that reference answers missing their precomputed artifact
+        are compiled once for the learners of a block
+        """
+        with patch.object(
+                views,
+                'compile_reference_answers',
+                wraps=views.compile_reference_answers,
+        ) as compile_reference_answers:
+            for learner in (1, 2):
+                # pylint: disable=protected-access
+                xblock = self.make_block(learner)
+                xblock.grading_mode = 'similarity'
+                xblock.reference_answers = ['light makes sugar']
+                xblock.student_answer = 'light makes sugar'
+                for _ in range(3):
+                    self.assertEqual(
+                        1.0,
+                        xblock._determine_credit().value,
+                    )
+        self.assertEqual(1, compile_reference_answers.call_count)
+
+    def test_problem_progress_table(self):
+        """
+        Tests that the progress of every possible score is formatted
+        once, and that other scores are formatted when needed
+        """
+        # pylint: disable=protected-access
+        xblock = self.make_block(1)
+        xblock.weight = 4
+        xblock.grading_mode = 'tiers'
+        xblock.credit_tiers = [{'credit': 0.25, 'phrases': ['light']}]
+        progress = xblock._get_derived_settings()['problem_progress']
+        self.assertEqual(
+            {
+                0.0: '(4 points possible)',
+                0.25: '(1/4 points)',
+                0.5: '(2/4 points)',
+                1.0: '(4/4 points)',
+            },
+            progress,
+        )
+        xblock.score = 0.25
+        self.assertEqual('(1/4 points)', xblock._get_problem_progress())
+        xblock.score = 0.3
+        self.assertEqual('(1.2/4 points)', xblock._get_problem_progress())
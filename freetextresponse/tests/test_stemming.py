@@ -0,0 +1,160 @@
+"""
+Tests for matching phrases by word stems
+"""
+import unittest
+
+import ddt
+
+from freetextresponse.keyphrases import compile_keyphrases
+from freetextresponse.models import Credit
+from freetextresponse.stemming import stem
+from freetextresponse.stemming import stem_words
+from freetextresponse.xblocks import FreeTextResponse
+
+from .tests_utils import make_xblock
+
+
+@ddt.ddt
+class StemmingTestCase(unittest.TestCase):
+    """
+    Tests for the Porter stemmer
+    """
+
+    @ddt.data(
+        ('caresses', 'caress'),
+        ('ponies', 'poni'),
+        ('cats', 'cat'),
+        ('agreed', 'agre'),
+        ('motoring', 'motor'),
+        ('hopping', 'hop'),
+        ('filing', 'file'),
+        ('happy', 'happi'),
+        ('relational', 'relat'),
+        ('generalization', 'gener'),
+        ('electrical', 'electr'),
+        ('adjustment', 'adjust'),
+        ('adoption', 'adopt'),
+        ('controll', 'control'),
+        ('connections', 'connect'),
+        ('is', 'is'),
+    )
+    @ddt.unpack
+    def test_stem(self, word, result):
+        """
+        Checks the stems of words from the Porter vocabulary
+        """
+        self.assertEqual(result, stem(word))
+
+    def test_stem_words(self):
+        """
+        Checks that stop words are left out
+        """
+        self.assertEqual(
+            ['plant', 'absorb', 'light'],
+            stem_words('The plants are absorbing the light'),
+        )
+
+
+class StemmedMatchingTestCase(unittest.TestCase):
+    """
+    Tests for grading with phrases matched by word stems
+    """
+
+    def setUp(self):
+        """
+        Creates an xblock matching phrases by word stems
+        """
+        self.xblock = make_xblock('freetextresponse', FreeTextResponse, {
+            'phrase_match_mode': 'stemmed',
+            'fullcredit_keyphrases': ['connected to the cell walls'],
+            'halfcredit_keyphrases': ['cat'],
+        })
+
+    def get_credit(self, answer):
+        """
+        Returns the credit the answer receives
+        """
+        # pylint: disable=protected-access
+        self.xblock.student_answer = answer
+        return self.xblock._determine_credit()
+
+    def test_word_forms(self):
+        """
+        Checks that other forms of the words and stop words are matched
+        """
+        self.assertEqual(
+            Credit.full,
+            self.get_credit('It connects with a cell wall'),
+        )
+        self.assertEqual(Credit.half, self.get_credit('Two cats'))
+
+    def test_whole_words(self):
+        """
+        Checks that stems only match whole words
+        """
+        self.assertEqual(Credit.zero, self.get_credit('Concatenate them'))
+        self.assertEqual(Credit.zero, self.get_credit('cell connected wall'))
+
+    def test_exact_mode(self):
+        """
+        Checks that exact matching is unchanged
+        """
+        self.xblock.phrase_match_mode = 'exact'
+        self.assertEqual(Credit.half, self.get_credit('Concatenate them'))
+        self.assertEqual(
+            Credit.zero,
+            self.get_credit('It connects with a cell wall'),
+        )
+
+    def test_compiled_on_save(self):
+        """
+        Checks that saving in Studio stores the stemmed phrase index
+        """
+        data = {'phrase_match_mode': 'stemmed'}
+        self.xblock.clean_studio_edits(data)
+        artifact = data['keyphrase_matcher']
+        self.assertTrue(artifact['stemmed'])
+        self.assertEqual([' connect cell wall '], artifact['full'])
+        self.assertEqual(
+            artifact['key'],
+            compile_keyphrases(
+                ['Connecting cell walls'],
+                ['cats'],
+                stemmed=True,
+            )['key'],
+        )
+
+    def test_stop_word_phrases(self):
+        """
+        Checks that phrases made only of stop words match those words
+        """
+        artifact = compile_keyphrases(['the', 'of it'], [], stemmed=True)
+        self.assertEqual([' the ', ' of it '], artifact['full'])
+        self.xblock.fullcredit_keyphrases = ['all']
+        self.assertEqual(Credit.zero, self.get_credit('yes definitely'))
+        self.assertEqual(Credit.full, self.get_credit('All of them'))
+        self.assertEqual(Credit.zero, self.get_credit('Tall walls'))
+
+    def test_negations(self):
+        """
+        Checks that negations are not ignored
+        """
+        self.xblock.fullcredit_keyphrases = ['does not need light']
+        self.assertEqual(Credit.zero, self.get_credit('Plants need light'))
+        self.assertEqual(
+            Credit.full,
+            self.get_credit('Plants do not need lights'),
+        )
+
+    def test_tiers_and_weights(self):
+        """
+        Checks that credit tiers and weighted phrases match stems
+        """
+        self.xblock.grading_mode = 'tiers'
+        self.xblock.credit_tiers = [
+            {'credit': 0.75, 'phrases': ['absorbed light']},
+        ]
+        self.assertEqual(0.75, self.get_credit('It absorbs the light').value)
+        self.xblock.grading_mode = 'weighted'
+        self.xblock.phrase_weights = {'absorbing': 0.5, 'lights': 0.25}
+        self.assertEqual(0.75, self.get_credit('It absorbs the light').value)
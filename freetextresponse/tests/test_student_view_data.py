@@ -0,0 +1,85 @@
+"""
+Tests for the student view data of the FreeTextResponse XBlock
+"""
+import unittest
+
+from webob import Request
+
+from freetextresponse.xblocks import FreeTextResponse
+
+from .tests_utils import make_request
+from .tests_utils import make_xblock
+
+
+class StudentViewDataTestCase(unittest.TestCase):
+    """
+    Tests for the JSON data and state served to mobile and headless
+    clients
+    """
+
+    def setUp(self):
+        """
+        Creates an xblock
+        """
+        self.xblock = make_xblock('freetextresponse', FreeTextResponse, {
+            'prompt': 'Describe photosynthesis',
+            'fullcredit_keyphrases': ['light'],
+            'max_attempts': 2,
+        })
+
+    def get_state(self, etag=None):
+        """
+        Requests the state, optionally revalidating an ETag
+        """
+        request = Request.blank('/')
+        if etag:
+            request.if_none_match = etag
+        return self.xblock.student_view_state(request)
+
+    def test_student_view_data(self):
+        """
+        Tests that the student view data holds only the settings, which
+        are shared by every learner
+        """
+        self.xblock.submit(make_request({'student_answer': 'light'}))
+        data = self.xblock.student_view_data()
+        self.assertEqual('Describe photosynthesis', data['prompt'])
+        self.assertEqual(2, data['max_attempts'])
+        for name in ('student_answer', 'count_attempts', 'can_submit'):
+            self.assertNotIn(name, data)
+
+    def test_student_view_state(self):
+        """
+        Tests the learner's state served with the settings
+        """
+        self.xblock.submit(make_request({'student_answer': 'light'}))
+        # pylint: disable=no-member
+        data = self.get_state().json_body
+        self.assertEqual('Describe photosynthesis', data['prompt'])
+        self.assertEqual('light', data['student_answer'])
+        self.assertEqual(1, data['count_attempts'])
+        self.assertEqual(2, data['max_attempts'])
+        self.assertEqual('correct', data['indicator_class'])
+        self.assertTrue(data['can_submit'])
+
+    def test_student_view_state_etag(self):
+        """
+        Tests that unchanged state is answered with 304 Not Modified
+        """
+        response = self.get_state()
+        self.assertEqual(200, response.status_code)
+        etag = response.etag
+        self.assertEqual(etag, response.json_body['version'])
+        self.assertEqual(304, self.get_state(etag).status_code)
+        self.assertEqual(b'', self.get_state(etag).body)
+
+    def test_student_view_state_changed(self):
+        """
+        Tests that changed state is served again with a new ETag
+        """
+        etag = self.get_state().etag
+        self.xblock.submit(make_request({'student_answer': 'dark'}))
+        response = self.get_state(etag)
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response.etag)
+        self.assertEqual('dark', response.json_body['student_answer'])
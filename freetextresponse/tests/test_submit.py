@@ -0,0 +1,210 @@
+"""
+Tests for submitting answers to the FreeTextResponse XBlock
+"""
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+import unittest
+
+from django.core.cache import cache
+from mock import MagicMock
+from mock import patch
+from workbench.runtime import WorkbenchRuntime  # pylint: disable=all
+from xblock.runtime import DictKeyValueStore
+
+from freetextresponse.models import MAX_SUBMISSION_NONCES
+from freetextresponse.xblocks import FreeTextResponse
+
+from .tests_utils import generate_scope_ids
+from .tests_utils import make_request
+from .tests_utils import make_xblock
+
+
+class SubmitTestCase(unittest.TestCase):
+    """
+    Tests for the submit handler
+    """
+
+    def setUp(self):
+        """
+        Creates an xblock
+        """
+        self.xblock = make_xblock('freetextresponse', FreeTextResponse, {})
+        self.xblock.max_attempts = 2 * MAX_SUBMISSION_NONCES
+        self.xblock.runtime.publish = MagicMock()
+
+    def test_duplicate_nonce_is_not_graded_again(self):
+        """
+        Tests that a retried submission returns the result of the first one
+        """
+        request = {'student_answer': 'one two three', 'nonce': 'abc'}
+        first = self.xblock.submit(make_request(request))
+        second = self.xblock.submit(make_request(request))
+        self.assertEqual(1, self.xblock.count_attempts)
+        grades = [
+            call for call in self.xblock.runtime.publish.call_args_list
+            if call[0][1] == 'grade'
+        ]
+        self.assertEqual(1, len(grades))
+        # pylint: disable=no-member
+        self.assertEqual(first.json_body, second.json_body)
+
+    def test_submissions_without_nonce_are_graded(self):
+        """
+        Tests that submissions without a nonce are always processed
+        """
+        request = {'student_answer': 'one two three'}
+        self.xblock.submit(make_request(request))
+        self.xblock.submit(make_request(request))
+        self.assertEqual(2, self.xblock.count_attempts)
+
+    def test_recent_nonces_are_bounded(self):
+        """
+        Tests that only the most recent nonces are kept
+        """
+        for index in range(MAX_SUBMISSION_NONCES + 2):
+            self.xblock.submit(make_request({
+                'student_answer': 'one two three',
+                'nonce': str(index),
+            }))
+        self.assertEqual(
+            [str(index + 2) for index in range(MAX_SUBMISSION_NONCES)],
+            self.xblock.recent_submission_nonces,
+        )
+
+
+class ConcurrentSubmitTestCase(unittest.TestCase):
+    """
+    Tests for submissions racing each other on the same user state
+    """
+
+    def setUp(self):
+        """
+        Creates a key store and scope ids shared by the requests,
+        checking for conflicts
+        """
+        patcher = patch('freetextresponse.views.STATE_CONFLICT_CHECK', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.key_store = DictKeyValueStore()
+        self.scope_ids = generate_scope_ids(
+            WorkbenchRuntime(),
+            'freetextresponse',
+        )
+        self.published = []
+
+    def make_request_xblock(self, key_store=None):
+        """
+        Creates the xblock of one request
+        """
+        xblock = make_xblock(
+            'freetextresponse',
+            FreeTextResponse,
+            {'max_attempts': 3},
+            key_store=key_store or self.key_store,
+            scope_ids=self.scope_ids,
+        )
+        xblock.runtime.publish = MagicMock(
+            side_effect=lambda block, event_type, event: (
+                event_type == 'grade' and self.published.append(event)
+            ),
+        )
+        return xblock
+
+    def test_stale_state_is_reloaded(self):
+        """
+        Tests that a submission based on outdated state is applied
+        again to the saved state
+        """
+        stale = self.make_request_xblock()
+        self.assertEqual(0, stale.count_attempts)
+        self.assertEqual(0, stale.state_version)
+        other = self.make_request_xblock()
+        other.submit(make_request({'student_answer': 'one'}))
+        stale.submit(make_request({'student_answer': 'two'}))
+        self.assertEqual(2, stale.count_attempts)
+        self.assertEqual(2, self.make_request_xblock().count_attempts)
+
+    def test_stale_request_cache_is_rejected(self):
+        """
+        Tests that a submission whose runtime keeps serving the state it
+        read before another request saved is rejected
+        """
+        # A copy of the store stands for a per-request field data cache
+        stale = self.make_request_xblock(
+            DictKeyValueStore(dict(self.key_store.db_dict)),
+        )
+        self.assertEqual(0, stale.count_attempts)
+        self.make_request_xblock().submit(
+            make_request({'student_answer': 'one'}),
+        )
+        response = stale.submit(make_request({'student_answer': 'two'}))
+        self.assertEqual(409, response.status_code)
+        self.assertEqual(1, self.make_request_xblock().count_attempts)
+        self.assertEqual(1, len(self.published))
+
+    def test_locked_state_is_rejected(self):
+        """
+        Tests that a submission waits for the state lock of another
+        request, and is rejected if it is not released
+        """
+        # pylint: disable=protected-access
+        xblock = self.make_request_xblock()
+        cache.add(xblock._get_state_cache_key('lock'), 'other')
+        with patch('freetextresponse.models.time.sleep') as sleep:
+            response = xblock.submit(make_request({'student_answer': 'one'}))
+        self.assertEqual(409, response.status_code)
+        self.assertEqual(2, sleep.call_count)
+        cache.delete(xblock._get_state_cache_key('lock'))
+        xblock.submit(make_request({'student_answer': 'one'}))
+        self.assertEqual(1, self.make_request_xblock().count_attempts)
+
+    def test_unchanged_state_is_not_saved(self):
+        """
+        Tests that retried submissions and unchanged drafts neither
+        save the state nor change its version
+        """
+        xblock = self.make_request_xblock()
+        request = {'student_answer': 'one', 'nonce': 'abc'}
+        xblock.submit(make_request(request))
+        self.assertEqual(1, xblock.state_version)
+        with patch.object(xblock, 'save') as save:
+            xblock.submit(make_request(request))
+            xblock.save_reponse(make_request({'student_answer': 'one'}))
+        self.assertFalse(save.called)
+        self.assertEqual(1, self.make_request_xblock().state_version)
+
+    def test_concurrent_submissions(self):
+        """
+        Tests that simultaneous submissions neither exceed max_attempts
+        nor publish a grade for a lost attempt
+        """
+        # pylint: disable=protected-access
+        threads = 16
+        barrier = threading.Barrier(threads)
+
+        def submit(index):
+            """
+            Submits an answer once every request is ready
+            """
+            xblock = self.make_request_xblock()
+            determine_credit = xblock._determine_credit
+
+            def slow_determine_credit():
+                """
+                Grades slowly enough for the requests to overlap
+                """
+                time.sleep(0.01)
+                return determine_credit()
+
+            xblock._determine_credit = slow_determine_credit
+            barrier.wait()
+            request = make_request({'student_answer': f'answer {index}'})
+            return xblock.submit(request).status_code
+
+        with ThreadPoolExecutor(threads) as executor:
+            statuses = list(executor.map(submit, range(threads)))
+        self.assertLessEqual(set(statuses), {200, 409})
+        count_attempts = self.make_request_xblock().count_attempts
+        self.assertEqual(3, count_attempts)
+        self.assertEqual(count_attempts, len(self.published))
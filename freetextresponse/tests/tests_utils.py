@@ -1,22 +1,28 @@
 """
 Test utilities for the FreeTextResponse XBlock tests.
 """
+import json
 
 from mock import Mock
+from webob import Request
 
 from xblock.runtime import DictKeyValueStore, KvsFieldData
 from xblock.fields import ScopeIds
 from workbench.runtime import WorkbenchRuntime  # pylint: disable=all
 
 
-def make_xblock(xblock_name, xblock_cls, attributes):
+def make_xblock(xblock_name, xblock_cls, attributes,
+                key_store=None, scope_ids=None):
     """
     Helper to construct XBlock objects
+
+    Blocks built with the same key store and scope ids share their state,
+    like the blocks of concurrent requests.
     """
     runtime = WorkbenchRuntime()
-    key_store = DictKeyValueStore()
+    key_store = key_store or DictKeyValueStore()
     db_model = KvsFieldData(key_store)
-    ids = generate_scope_ids(runtime, xblock_name)
+    ids = scope_ids or generate_scope_ids(runtime, xblock_name)
     xblock = xblock_cls(runtime, db_model, scope_ids=ids)
     xblock.category = Mock()
     xblock.location = Mock(
@@ -29,6 +35,53 @@ def make_xblock(xblock_name, xblock_cls, attributes):
     return xblock
 
 
+class LearnerBlocksMixin(object):
+    """
+    Helpers for tests of blocks seen by several learners, and staff,
+    sharing a key store; set `xblock_cls` and `attributes`
+    """
+
+    xblock_cls = None
+    attributes = {}
+
+    def create_usage(self):
+        """
+        Creates the key store and scope ids the learners share
+        """
+        # pylint: disable=attribute-defined-outside-init
+        self.key_store = DictKeyValueStore()
+        self.usage = generate_scope_ids(WorkbenchRuntime(), 'freetextresponse')
+
+    def make_block(self, learner, staff=False):
+        """
+        Returns the block as seen by a learner, or by staff
+        """
+        xblock = make_xblock(
+            'freetextresponse',
+            self.xblock_cls,
+            self.attributes,
+            key_store=self.key_store,
+            scope_ids=ScopeIds(
+                learner,
+                self.usage.block_type,
+                self.usage.def_id,
+                self.usage.usage_id,
+            ),
+        )
+        xblock.runtime.publish = Mock()
+        xblock.runtime.user_is_staff = staff
+        return xblock
+
+    def submit(self, learner, answer):
+        """
+        Submits an answer as a learner; returns the block
+        """
+        xblock = self.make_block(learner)
+        xblock.submit(make_request({'student_answer': answer}))
+        xblock.save()
+        return xblock
+
+
 def generate_scope_ids(runtime, block_type):
     """
     Helper to generate scope IDs for an XBlock
@@ -36,3 +89,14 @@ def generate_scope_ids(runtime, block_type):
     def_id = runtime.id_generator.create_definition(block_type)
     usage_id = runtime.id_generator.create_usage(def_id)
     return ScopeIds('user', block_type, def_id, usage_id)
+
+
+def make_request(data):
+    """
+    Helper to build a POST request for an XBlock JSON handler
+    """
+    return Request.blank(
+        '/',
+        method='POST',
+        body=json.dumps(data).encode('utf-8'),
+    )
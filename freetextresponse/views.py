@@ -1,28 +1,68 @@
 """
 Handle view logic for the XBlock
 """
-from six import text_type
+from django.utils.translation import get_language
+from web_fragments.fragment import Fragment
+from webob import Response
 from xblock.core import XBlock
+from xblock.exceptions import JsonHandlerError
+from xblock.fields import Scope
 from xblock.validation import ValidationMessage
 try:
     from xblock.utils.resources import ResourceLoader
+    from xblock.utils.studio_editable import FutureFields
     from xblock.utils.studio_editable import StudioEditableXBlockMixin
 except ModuleNotFoundError:  # pragma: no cover
     # For backward compatibility with releases older than Quince.
     from xblockutils.resources import ResourceLoader
+    from xblockutils.studio_editable import FutureFields
     from xblockutils.studio_editable import StudioEditableXBlockMixin
 
+from . import __version__
+from .caching import LRUCache
+from .caching import content_hash
+from .caching import get_setting
 from .mixins.dates import EnforceDueDates
+from .mixins.events import EventBufferMixin
+from .mixins.events import buffered_events
 from .mixins.fragment import XBlockFragmentBuilderMixin
 from .mixins.i18n import I18nXBlockMixin
+from .mixins.staff import StaffToolsMixin
+from .keyphrases import KEYPHRASE_WARNING_THRESHOLD
+from .keyphrases import MAX_KEYPHRASES
+from .keyphrases import clean_keyphrases
+from .keyphrases import compile_phrase_source
+from .keyphrases import count_source_phrases
+from .keyphrases import credit_tiers_source
+from .keyphrases import get_credit_tiers_error
+from .keyphrases import get_matcher
+from .keyphrases import get_phrase_weights_error
+from .keyphrases import is_artifact_current
+from .keyphrases import keyphrases_source
+from .keyphrases import phrase_weights_source
 from .models import Credit
+from .models import credit_for_value
+from .models import get_answer_snippet
+from .profiling import profiled
+from .rules import AnswerIndex
+from .rules import RuleSyntaxError
+from .rules import compile_rule
+from .rules import get_rule_plan
+from .similarity import compile_reference_answers
+from .similarity import get_reference_model
+from .similarity import is_artifact_current as is_reference_artifact_current
+from .models import MAX_NONCE_LENGTH
 from .models import MAX_RESPONSES
+from .models import STATE_CONFLICT_CHECK
+from .models import STATE_CONFLICT_RETRIES
 
 
 #  pylint: disable=no-member
 class FreeTextResponseViewMixin(
         I18nXBlockMixin,
         EnforceDueDates,
+        EventBufferMixin,
+        StaffToolsMixin,
         XBlockFragmentBuilderMixin,
         StudioEditableXBlockMixin,
 ):
@@ -32,6 +72,10 @@ class FreeTextResponseViewMixin(
 
     loader = ResourceLoader(__name__)
     static_js_init = 'FreeTextResponseView'
+    # The phrase settings, source and source hash of this instance
+    _phrase_source_memo = None
+    # The reference answers of this instance and their hash
+    _reference_source_memo = None
 
     def provide_context(self, context=None):
         """
@@ -50,13 +94,118 @@ class FreeTextResponseViewMixin(
             'used_attempts_feedback': self._get_used_attempts_feedback(),
             'visibility_class': self._get_indicator_visibility_class(),
             'word_count_message': self._get_word_count_message(),
+            'min_word_count': self.min_word_count,
+            'max_word_count': self.max_word_count,
+            'invalid_word_count_message': (
+                self._format_invalid_word_count_message()
+            ),
+            'saved_message': self.saved_message,
             'display_other_responses': self.display_other_student_responses,
-            'other_responses': self.get_other_answers(),
             'user_alert': '',
             'submitted_message': '',
         })
         return context
 
+    @XBlock.supports('multi_device')
+    @profiled
+    def student_view(self, context=None):
+        """
+        Build the fragment for the default student view, reusing the
+        rendering of identical inputs
+        """
+        self.apply_staff_changes()
+        self.backfill_learner_record()
+        render = super().student_view
+        fragment = _fragment_cache.get_or_create(
+            self._get_fragment_key(context),
+            lambda: render(context).to_dict(),
+        )
+        return Fragment.from_dict(fragment)
+
+    def _get_fragment_key(self, context):
+        """
+        Returns a key that changes whenever the student view would
+        render differently: the package version, the settings, the
+        user state, the language, the due date and the context
+        """
+        settings = {}
+        user_state = {}
+        for name, field in self.fields.items():
+            if field.scope == Scope.settings and name not in _HASHED_SETTINGS:
+                settings[name] = getattr(self, name)
+            elif field.scope == Scope.user_state:
+                user_state[name] = getattr(self, name)
+        return (
+            __version__,
+            str(self.scope_ids.usage_id),
+            self._get_phrase_source_hash()[1],
+            self._get_reference_answers_hash(),
+            content_hash(settings),
+            content_hash(user_state),
+            get_language(),
+            self.is_past_due(),
+            repr(sorted((context or {}).items())),
+        )
+
+    def student_view_data(self, context=None):
+        # pylint: disable=unused-argument
+        """
+        Returns the settings of the student view for mobile and
+        headless clients
+
+        The Course Blocks API collects this once per block, without a
+        learner, and serves it to every learner; the learner's state is
+        served by the student_view_state handler.
+        """
+        data = {
+            'display_name': self.display_name,
+            'prompt': self.prompt,
+            'min_word_count': self.min_word_count,
+            'max_word_count': self.max_word_count,
+            'word_count_message': self._get_word_count_message(),
+            'max_attempts': self.max_attempts,
+            'display_correctness': self.display_correctness,
+            'display_other_responses': self.display_other_student_responses,
+        }
+        return data
+
+    @XBlock.handler
+    @profiled
+    def student_view_state(self, request, suffix=''):
+        # pylint: disable=unused-argument
+        """
+        Serves the student view settings and the learner's state,
+        answering 304 Not Modified when the client already has this
+        version (If-None-Match)
+        """
+        data = self._get_student_view_state()
+        if data['version'] in request.if_none_match:
+            response = Response(status=304)
+        else:
+            response = Response(json_body=data)
+        response.etag = data['version']
+        response.cache_control = 'private, no-cache'
+        return response
+
+    def _get_student_view_state(self):
+        """
+        Returns the student view settings and the learner's state;
+        `version` changes whenever anything else in it does
+        """
+        self.apply_staff_changes()
+        data = self.student_view_data()
+        data.update({
+            'student_answer': self.student_answer,
+            'count_attempts': self.count_attempts,
+            'used_attempts_feedback': self._get_used_attempts_feedback(),
+            'problem_progress': self._get_problem_progress(),
+            'indicator_class': self._get_indicator_class(),
+            'is_past_due': self.is_past_due(),
+            'can_submit': self._can_submit(),
+        })
+        data['version'] = content_hash(data)
+        return data
+
     def _get_indicator_class(self):
         """
         Returns the class of the correctness indicator element
@@ -97,37 +246,210 @@ class FreeTextResponseViewMixin(
         result = None
         if self.student_answer == '' or not self._word_count_valid():
             result = Credit.zero
-        elif not self.fullcredit_keyphrases \
-                and not self.halfcredit_keyphrases:
-            result = Credit.full
-        elif _is_at_least_one_phrase_present(
-                self.fullcredit_keyphrases,
-                self.student_answer
-        ):
-            result = Credit.full
-        elif _is_at_least_one_phrase_present(
-                self.halfcredit_keyphrases,
-                self.student_answer
-        ):
-            result = Credit.half
+        elif self.grading_mode == 'rules':
+            result = self._determine_rule_credit()
+        elif self.grading_mode == 'similarity':
+            result = self._determine_similarity_credit()
         else:
-            result = Credit.zero
+            result = self._determine_phrase_credit()
         return result
 
+    def _determine_phrase_credit(self):
+        """
+        Determines the level of credit from the phrases present in the
+        answer, found in a single pass whatever the number of tiers
+        """
+        artifact = self._get_keyphrase_artifact()
+        if not artifact['entries']:
+            return Credit.full
+        matcher = get_matcher(artifact)
+        if self.grading_mode == 'weighted':
+            value = matcher.total_value(self.student_answer)
+            value = round(min(max(value, 0.0), Credit.full.value), 6)
+        else:
+            value = matcher.best_value(self.student_answer)
+        return credit_for_value(value)
+
+    def _determine_rule_credit(self):
+        """
+        Determines the level of credit from the full and half credit
+        rules, tokenizing the answer once for both
+        """
+        tiers = [
+            (Credit.full, self.fullcredit_rule.strip()),
+            (Credit.half, self.halfcredit_rule.strip()),
+        ]
+        if not any(rule for _, rule in tiers):
+            return Credit.full
+        index = AnswerIndex(self.student_answer)
+        for credit, rule in tiers:
+            if rule and _is_rule_satisfied(rule, index):
+                return credit
+        return Credit.zero
+
+    def _determine_similarity_credit(self):
+        """
+        Determines the level of credit from the similarity of the answer
+        to the closest reference answer
+        """
+        artifact = self._get_reference_artifact()
+        if not artifact['references']:
+            return Credit.full
+        model = get_reference_model(artifact)
+        similarity = model.similarity(self.student_answer)
+        if similarity >= self.fullcredit_similarity:
+            return Credit.full
+        if similarity >= self.halfcredit_similarity:
+            return Credit.half
+        return Credit.zero
+
+    def _get_reference_artifact(self):
+        """
+        Returns the reference answers precomputed on the last Studio
+        save, computed once per block and reference answers if they are
+        missing or out of date
+        """
+        key = (
+            str(self.scope_ids.usage_id),
+            'reference_artifact',
+            self._get_reference_answers_hash(),
+            self.reference_vectors.get('key'),
+        )
+        return _settings_cache.get_or_create(
+            key,
+            self._derive_reference_artifact,
+        )
+
+    def _get_reference_answers_hash(self):
+        """
+        Returns the hash of the reference answers, computed once per
+        instance unless they are replaced
+        """
+        answers = self.reference_answers
+        memo = self._reference_source_memo
+        if memo is None or memo[0] is not answers:
+            memo = (answers, content_hash(list(answers or [])))
+            self._reference_source_memo = memo
+        return memo[1]
+
+    def _derive_reference_artifact(self):
+        """
+        Returns the stored reference artifact if it is current, or
+        compiles the reference answers
+        """
+        artifact = self.reference_vectors
+        if not is_reference_artifact_current(
+                artifact,
+                self.reference_answers,
+        ):
+            artifact = compile_reference_answers(self.reference_answers)
+        return artifact
+
+    def _get_keyphrase_artifact(self):
+        """
+        Returns the phrases compiled on the last Studio save,
+        compiling them now if they are missing or out of date
+        """
+        return self._get_derived_settings()['keyphrase_artifact']
+
+    def _get_derived_settings(self):
+        """
+        Returns the data derived from the settings, computed once per
+        block, settings and language, and shared by the instances of
+        every learner's requests
+        """
+        source, source_hash = self._get_phrase_source_hash()
+        key = (
+            str(self.scope_ids.usage_id),
+            source_hash,
+            self.keyphrase_matcher.get('key'),
+            self.min_word_count,
+            self.max_word_count,
+            self.grading_mode,
+            self.weight,
+            get_language(),
+        )
+        return _settings_cache.get_or_create(
+            key,
+            lambda: self._derive_settings(source),
+        )
+
+    def _get_phrase_source_hash(self):
+        """
+        Returns the phrase source and its hash, computed once per
+        instance unless its phrase settings are replaced
+        """
+        settings = (
+            self.grading_mode,
+            self.phrase_match_mode,
+            self.fullcredit_keyphrases,
+            self.halfcredit_keyphrases,
+            self.credit_tiers,
+            self.phrase_weights,
+        )
+        memo = self._phrase_source_memo
+        if memo is None or any(
+                old is not new for old, new in zip(memo[0], settings)
+        ):
+            source = _get_phrase_source(self)
+            memo = (settings, source, content_hash(source))
+            self._phrase_source_memo = memo
+        return memo[1], memo[2]
+
+    def _derive_settings(self, source):
+        """
+        Computes the data derived from the settings
+        """
+        artifact = self.keyphrase_matcher
+        if not is_artifact_current(artifact, source):
+            artifact = compile_phrase_source(source)
+        # Scores are one of the credit levels or, unless weighted or
+        # graded by similarity, one of the phrases' values; others are
+        # formatted when needed
+        scores = {credit.value for credit in Credit}
+        if self.grading_mode in ('keyphrases', 'tiers'):
+            scores.update(value for _, value in artifact['entries'])
+        return {
+            'keyphrase_artifact': artifact,
+            'problem_progress': {
+                score: self._format_problem_progress(score)
+                for score in scores
+            },
+            'word_count_message': self.ngettext(
+                "Your response must be "
+                "between {min} and {max} word.",
+                "Your response must be "
+                "between {min} and {max} words.",
+                self.max_word_count,
+            ).format(
+                min=self.min_word_count,
+                max=self.max_word_count,
+            ),
+        }
+
     def _get_problem_progress(self):
         """
         Returns a statement of progress for the XBlock, which depends
         on the user's current score
         """
+        progress = self._get_derived_settings()['problem_progress']
+        if self.score in progress:
+            return progress[self.score]
+        return self._format_problem_progress(self.score)
+
+    def _format_problem_progress(self, score):
+        """
+        Returns the statement of progress for a score
+        """
         if self.weight == 0:
             result = ''
-        elif self.score == 0.0:
+        elif score == 0.0:
             weight = self.weight
             temp = self.ngettext(f'{weight} point possible',
                                  f'{weight} points possible', weight)
             result = f"({temp})"
         else:
-            scaled_score = self.score * self.weight
+            scaled_score = score * self.weight
             # No trailing zero and no scientific notation
             score_string = f'{scaled_score:.15f}'.rstrip('0').rstrip('.')
             weight = self.weight
@@ -167,52 +489,103 @@ class FreeTextResponseViewMixin(
         """
         Returns the word count message
         """
-        result = self.ngettext(
-            "Your response must be "
-            "between {min} and {max} word.",
-            "Your response must be "
-            "between {min} and {max} words.",
-            self.max_word_count,
-        ).format(
-            min=self.min_word_count,
-            max=self.max_word_count,
-        )
-        return result
+        return self._get_derived_settings()['word_count_message']
 
-    def get_other_answers(self):
+    def get_other_answers(self, cursor=0, limit=MAX_RESPONSES):
         """
-        Returns at most MAX_RESPONSES answers from the pool.
+        Returns at most `limit` answers from the pool, newest first,
+        skipping the `cursor` newest ones.
 
         Does not return answers the student had submitted.
         """
         student_id = self.get_student_id()
         display_other_responses = self.display_other_student_responses
         shouldnt_show_other_responses = not display_other_responses
+        if shouldnt_show_other_responses:
+            return []
         student_answer_incorrect = self._determine_credit() == Credit.zero
-        if student_answer_incorrect or shouldnt_show_other_responses:
+        if student_answer_incorrect:
             return []
         return_list = [
             response
-            for response in self.displayable_answers
+            for response in reversed(self.displayable_answers)
             if response['student_id'] != student_id
         ]
-        return_list = return_list[-(MAX_RESPONSES):]
+        return_list = return_list[cursor:cursor + limit]
         return return_list
 
     @XBlock.json_handler
+    @profiled
+    @buffered_events
+    def get_other_responses(self, data, suffix=''):
+        # pylint: disable=unused-argument
+        """
+        Returns a page of other students' responses, fetched only
+        when the student opens the peer responses box
+        """
+        try:
+            cursor = max(int(data.get('cursor') or 0), 0)
+        except (TypeError, ValueError):
+            cursor = 0
+        responses = self.get_other_answers(
+            cursor=cursor,
+            limit=MAX_RESPONSES + 1,
+        )
+        next_cursor = None
+        if len(responses) > MAX_RESPONSES:
+            responses = responses[:MAX_RESPONSES]
+            next_cursor = str(cursor + MAX_RESPONSES)
+        self.emit_event(
+            'peer_responses_viewed',
+            cursor=cursor,
+            count=len(responses),
+        )
+        result = {
+            'status': 'success',
+            'responses': [
+                {'snippet': get_answer_snippet(response)}
+                for response in responses
+            ],
+            'cursor': next_cursor,
+        }
+        return result
+
+    @XBlock.json_handler
+    @profiled
+    def get_attempt_history(self, data, suffix=''):
+        # pylint: disable=unused-argument
+        """
+        Returns the learner's previous attempts, oldest first
+        """
+        self.apply_staff_changes()
+        result = {
+            'status': 'success',
+            'attempts': self.get_attempts(),
+        }
+        return result
+
+    @XBlock.json_handler
+    @profiled
+    @buffered_events
     def submit(self, data, suffix=''):
         # pylint: disable=unused-argument
         """
         Processes the user's submission
+
+        Retried and double-clicked submissions repeat the nonce of the
+        first one; they get the current result without being graded again.
         """
-        # Fails if the UI submit/save buttons were shut
-        # down on the previous submission
-        if self._can_submit():
-            self.student_answer = data['student_answer']
-            # Counting the attempts and publishing a score
-            # even if word count is invalid.
-            self.count_attempts += 1
-            self._compute_score()
+        nonce = str(data.get('nonce') or '')[:MAX_NONCE_LENGTH]
+        graded = self._change_user_state(
+            lambda: self._apply_submission(data, nonce),
+        )
+        if graded:
+            # Published only once the attempt is saved, so a request
+            # that lost a conflict does not publish a grade
+            self._publish_score()
+            self._emit_submission_events()
+            self.index_student_answer()
+            self.index_learner()
             display_other_responses = self.display_other_student_responses
             if display_other_responses and data.get('can_record_response'):
                 self.store_student_response()
@@ -226,22 +599,113 @@ class FreeTextResponseViewMixin(
             'user_alert': self._get_user_alert(
                 ignore_attempts=True,
             ),
-            'other_responses': self.get_other_answers(),
             'display_other_responses': self.display_other_student_responses,
             'visibility_class': self._get_indicator_visibility_class(),
         }
         return result
 
+    def _emit_submission_events(self):
+        """
+        Records the analytics events of a graded submission
+        """
+        word_count = len(self.student_answer.split())
+        self.emit_event(
+            'submitted',
+            attempt=self.count_attempts,
+            credit=self.score,
+            word_count=word_count,
+        )
+        self._emit_invalid_word_count()
+        if self.max_attempts and self.count_attempts >= self.max_attempts:
+            self.emit_event(
+                'max_attempts_reached',
+                max_attempts=self.max_attempts,
+            )
+
+    def _emit_invalid_word_count(self):
+        """
+        Records the analytics event of an answer submitted with an
+        invalid word count, if it is one
+        """
+        if not self._word_count_valid():
+            self.emit_event(
+                'invalid_word_count',
+                word_count=len(self.student_answer.split()),
+                min_word_count=self.min_word_count,
+                max_word_count=self.max_word_count,
+            )
+
+    def _apply_submission(self, data, nonce):
+        """
+        Records the submission in the user state, unless it repeats
+        a processed one or the attempts are used up;
+        returns whether it was graded
+        """
+        self.apply_staff_changes()
+        # Fails if the UI submit/save buttons were shut
+        # down on the previous submission
+        if self.is_duplicate_submission(nonce) or not self._can_submit():
+            return False
+        self.record_submission_nonce(nonce)
+        previous_answer = self.student_answer
+        self.student_answer = data['student_answer']
+        # Counting the attempts and publishing a score
+        # even if word count is invalid.
+        self.count_attempts += 1
+        self.score = self._determine_credit().value
+        self.record_attempt(previous_answer)
+        return True
+
+    def _change_user_state(self, change):
+        """
+        Applies change() to the user state; returns its result
+
+        With STATE_CONFLICT_CHECK, the change is applied and saved while
+        holding the learner's state lock, which the Django cache shares
+        between processes. State that another request saved since this
+        one read it is read again, up to STATE_CONFLICT_RETRIES times;
+        when the runtime keeps serving the old state, as the LMS's
+        per-request field data cache does, the request is rejected.
+        Changes that leave the state as it was are not saved.
+        """
+        if not STATE_CONFLICT_CHECK:
+            return change()
+        with self.lock_user_state() as locked:
+            if locked:
+                for retry in range(STATE_CONFLICT_RETRIES + 1):
+                    if retry:
+                        self.reload_user_state()
+                    if not self.is_user_state_stale():
+                        result = change()
+                        if self.has_unsaved_user_state():
+                            self.commit_user_state()
+                        return result
+        self.reload_user_state()
+        raise JsonHandlerError(
+            409,
+            self.gettext('Your answer changed in another window. '
+                         'Please reload the page.'),
+        )
+
     @XBlock.json_handler
+    @profiled
+    @buffered_events
     def save_reponse(self, data, suffix=''):
         # pylint: disable=unused-argument
         """
         Processes the user's save
-        """
-        # Fails if the UI submit/save buttons were shut
-        # down on the previous submission
-        if not self.max_attempts or self.count_attempts < self.max_attempts:
-            self.student_answer = data['student_answer']
+
+        view.js refuses to submit answers with an invalid word count;
+        the next save of the draft carries `rejected_submit`, which
+        records the refused submission.
+        """
+        if self._change_user_state(lambda: self._apply_save(data)):
+            self.emit_event(
+                'saved',
+                word_count=len(self.student_answer.split()),
+            )
+        if data.get('rejected_submit'):
+            self._emit_invalid_word_count()
         result = {
             'status': 'success',
             'problem_progress': self._get_problem_progress(),
@@ -253,6 +717,21 @@ class FreeTextResponseViewMixin(
         }
         return result
 
+    def _apply_save(self, data):
+        """
+        Records the draft answer in the user state;
+        returns whether it was recorded
+        """
+        self.apply_staff_changes()
+        # Fails if the UI submit/save buttons were shut
+        # down on the previous submission
+        if self.max_attempts and self.count_attempts >= self.max_attempts:
+            return False
+        previous_answer = self.student_answer
+        self.student_answer = data['student_answer']
+        self.rebase_attempt_history(previous_answer)
+        return True
+
     def _get_invalid_word_count_message(self, ignore_attempts=False):
         """
         Returns the invalid word count message
@@ -262,12 +741,20 @@ class FreeTextResponseViewMixin(
                 (ignore_attempts or self.count_attempts > 0) and
                 (not self._word_count_valid())
         ):
-            word_count_message = self._get_word_count_message()
-            result = self.gettext(
-                "Invalid Word Count. {word_count_message}"
-            ).format(
-                word_count_message=word_count_message,
-            )
+            result = self._format_invalid_word_count_message()
+        return result
+
+    def _format_invalid_word_count_message(self):
+        """
+        Formats the invalid word count message, which view.js also
+        shows when it rejects an answer before submitting it
+        """
+        word_count_message = self._get_word_count_message()
+        result = self.gettext(
+            "Invalid Word Count. {word_count_message}"
+        ).format(
+            word_count_message=word_count_message,
+        )
         return result
 
     def _get_submitted_message(self):
@@ -308,7 +795,7 @@ class FreeTextResponseViewMixin(
         """
         result = ValidationMessage(
             ValidationMessage.ERROR,
-            self.gettext(text_type(text))
+            self.gettext(str(text))
         )
         return result
 
@@ -341,16 +828,151 @@ class FreeTextResponseViewMixin(
                 'Submission Received Message cannot be blank'
             )
             validation.add(msg)
+        self._validate_grading_fields(validation, data)
+
+    def _validate_grading_fields(self, validation, data):
+        """
+        Validates the keyphrases, rules, credit tiers and phrase weights
+        entered by the instructor.
+        """
+        for rule, label in (
+                (data.fullcredit_rule, self.gettext('Full-Credit Rule')),
+                (data.halfcredit_rule, self.gettext('Half-Credit Rule')),
+        ):
+            if rule and rule.strip():
+                try:
+                    compile_rule(rule)
+                except RuleSyntaxError as error:
+                    msg = self._generate_validation_message(
+                        self.gettext('{label} is invalid: {error}').format(
+                            label=label,
+                            error=error,
+                        )
+                    )
+                    validation.add(msg)
+        if len(data.fullcredit_keyphrases or []) > MAX_KEYPHRASES:
+            msg = self._generate_validation_message(
+                self.gettext(
+                    'Full-Credit Key Phrases cannot have more than '
+                    '{max} entries'
+                ).format(max=MAX_KEYPHRASES)
+            )
+            validation.add(msg)
+        if len(data.halfcredit_keyphrases or []) > MAX_KEYPHRASES:
+            msg = self._generate_validation_message(
+                self.gettext(
+                    'Half-Credit Key Phrases cannot have more than '
+                    '{max} entries'
+                ).format(max=MAX_KEYPHRASES)
+            )
+            validation.add(msg)
+        credit_tiers_error = get_credit_tiers_error(data.credit_tiers)
+        if credit_tiers_error:
+            msg = self._generate_validation_message(credit_tiers_error)
+            validation.add(msg)
+        phrase_weights_error = get_phrase_weights_error(data.phrase_weights)
+        if phrase_weights_error:
+            msg = self._generate_validation_message(phrase_weights_error)
+            validation.add(msg)
+        if count_source_phrases(
+                credit_tiers_source(data.credit_tiers)
+        ) > MAX_KEYPHRASES:
+            msg = self._generate_validation_message(
+                self.gettext(
+                    'Credit Tiers cannot have more than {max} phrases'
+                ).format(max=MAX_KEYPHRASES)
+            )
+            validation.add(msg)
+        if len(data.phrase_weights or {}) > MAX_KEYPHRASES:
+            msg = self._generate_validation_message(
+                self.gettext(
+                    'Phrase Weights cannot have more than {max} phrases'
+                ).format(max=MAX_KEYPHRASES)
+            )
+            validation.add(msg)
+        if data.halfcredit_similarity > data.fullcredit_similarity:
+            msg = self._generate_validation_message(
+                'Half-Credit Similarity cannot be greater than '
+                'Full-Credit Similarity'
+            )
+            validation.add(msg)
 
+    def validate(self):
+        """
+        Validates the block, warning about very large keyphrase sets
+        """
+        validation = super().validate()
+        artifact = self._get_keyphrase_artifact()
+        if len(artifact['entries']) > KEYPHRASE_WARNING_THRESHOLD:
+            validation.add(ValidationMessage(
+                ValidationMessage.WARNING,
+                self.gettext(
+                    'This problem has a very large number of '
+                    'key phrases, which slows down grading'
+                ),
+            ))
+        return validation
 
-def _is_at_least_one_phrase_present(phrases, answer):
+    def clean_studio_edits(self, data):
+        """
+        Cleans the keyphrases entered in Studio and stores
+        them precompiled, so that grading never compiles them
+        """
+        for name in ('fullcredit_keyphrases', 'halfcredit_keyphrases'):
+            if name in data:
+                data[name] = clean_keyphrases(data[name])
+        future = FutureFields(
+            new_fields_dict=data,
+            newly_removed_fields=[],
+            fallback_obj=self,
+        )
+        source = _get_phrase_source(future)
+        if count_source_phrases(source) <= MAX_KEYPHRASES:
+            data['keyphrase_matcher'] = compile_phrase_source(source)
+        data['reference_vectors'] = compile_reference_answers(
+            future.reference_answers,
+        )
+
+
+# Settings the fragment key covers through the phrase source and
+# reference answer hashes of the instance, or derived from them
+_HASHED_SETTINGS = frozenset((
+    'fullcredit_keyphrases',
+    'halfcredit_keyphrases',
+    'credit_tiers',
+    'phrase_weights',
+    'reference_answers',
+    'keyphrase_matcher',
+    'reference_vectors',
+))
+_fragment_cache = LRUCache(get_setting('FRAGMENT_CACHE_SIZE', 1024))
+_settings_cache = LRUCache(get_setting('SETTINGS_CACHE_SIZE', 1024))
+
+
+def _get_phrase_source(data):
     """
-    Determines if at least one of the supplied phrases is
-    present in the given answer
+    Returns the settings the phrase matcher is compiled from
+    for the selected grading mode
     """
-    answer = answer.lower()
-    matches = [
-        phrase.lower() in answer
-        for phrase in phrases
-    ]
-    return any(matches)
+    stemmed = data.phrase_match_mode == 'stemmed'
+    if data.grading_mode == 'tiers':
+        return credit_tiers_source(data.credit_tiers, stemmed)
+    if data.grading_mode == 'weighted':
+        return phrase_weights_source(data.phrase_weights, stemmed)
+    return keyphrases_source(
+        data.fullcredit_keyphrases,
+        data.halfcredit_keyphrases,
+        stemmed,
+    )
+
+
+def _is_rule_satisfied(rule, index):
+    """
+    Determines if the tokenized answer satisfies the rule;
+    rules that do not compile are never satisfied
+    """
+    try:
+        plan = get_rule_plan(rule)
+    except RuleSyntaxError:
+        return False
+    return plan.evaluate(index)
@@ -131,6 +131,7 @@ setup(
     },
     package_data=package_data(
         'freetextresponse', [
+            'migrations',
             'mixins',
             'public',
             'scenarios',